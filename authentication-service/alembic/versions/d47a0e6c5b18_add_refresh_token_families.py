@@ -0,0 +1,46 @@
+"""Add refresh token families
+
+Revision ID: d47a0e6c5b18
+Revises: 8c1f4b2d9e3a
+Create Date: 2025-03-10 14:27:05.402917
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d47a0e6c5b18"
+down_revision: Union[str, None] = "8c1f4b2d9e3a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_token_families",
+        sa.Column("family_id", sa.String(length=32), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("generation", sa.Integer(), nullable=False),
+        sa.Column("revoked", sa.Boolean(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("family_id"),
+    )
+    op.create_index(
+        op.f("ix_refresh_token_families_expires_at"),
+        "refresh_token_families",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_refresh_token_families_expires_at"),
+        table_name="refresh_token_families",
+    )
+    op.drop_table("refresh_token_families")
@@ -0,0 +1,32 @@
+"""Add user token version
+
+Revision ID: e3a9f61c7b42
+Revises: d47a0e6c5b18
+Create Date: 2025-03-24 09:41:17.530662
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9f61c7b42"
+down_revision: Union[str, None] = "d47a0e6c5b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index("ix_users_updated_at", "users", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_updated_at", table_name="users")
+    op.drop_column("users", "token_version")
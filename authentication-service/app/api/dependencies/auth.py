@@ -1,23 +1,67 @@
-from fastapi import Depends
+from typing import Dict
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.exceptions import AuthenticationException
+from app.core.logger import logger
 from app.schemas.user import UserLogin
 from app.services.auth_service import AuthService
 from app.services.token_service import TokenService
 from app.services.user_service import UserService
 
 
-def get_user_service() -> UserService:
-    return UserService()
+def init_services(state) -> None:
+    """Build the long-lived service instances shared by every request"""
+    state.user_service = UserService()
+    state.token_service = TokenService()
+    state.auth_service = AuthService(state.user_service, state.token_service)
+
+
+# Services are built once by the application lifespan; without it (e.g. a
+# test client that skips startup) they are built per request.
+def get_user_service(request: Request) -> UserService:
+    return getattr(request.app.state, "user_service", None) or UserService()
 
 
-def get_token_service() -> TokenService:
-    return TokenService()
+def get_token_service(request: Request) -> TokenService:
+    return getattr(request.app.state, "token_service", None) or TokenService()
 
 
 def get_auth_service(
+    request: Request,
     user_service: UserService = Depends(get_user_service),
     token_service: TokenService = Depends(get_token_service),
 ) -> AuthService:
-    return AuthService(user_service, token_service)
+    return getattr(request.app.state, "auth_service", None) or AuthService(
+        user_service, token_service
+    )
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
+
+
+async def get_current_user(
+    access_token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service),
+) -> Dict:
+    try:
+        return await auth_service.validate_access_token(db, access_token)
+    except AuthenticationException as e:
+        raise HTTPException(
+            status_code=401,
+            detail=str(e.detail),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def get_current_superuser(
+    current_user: Dict = Depends(get_current_user),
+) -> Dict:
+    if not current_user["is_superuser"]:
+        logger.warning(f"Admin access denied for user: {current_user['email']}")
+        raise HTTPException(status_code=403, detail="Superuser privileges required")
+    return current_user
@@ -0,0 +1,111 @@
+# app/api/v1/endpoints/admin.py
+import io
+from typing import Awaitable, Dict, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.dependencies.auth import get_current_superuser, get_user_service
+from app.core.config import settings
+from app.core.database import async_engine, get_db
+from app.core.exceptions import UserUpdateException
+from app.core.logger import logger
+from app.schemas.user import PasswordChange, RoleChange
+from app.services.user_import import (
+    IMPORT_FORMATS,
+    UserImporter,
+    detect_format,
+    get_import_executor,
+    hashing_workers,
+    iter_records,
+)
+from app.services.user_service import UserService
+
+router = APIRouter()
+
+import_log = logger.bind(category="user.import")
+admin_log = logger.bind(category="user.admin")
+
+
+async def _apply_change(change: Awaitable[bool], email: str) -> None:
+    try:
+        changed = await change
+    except UserUpdateException as e:
+        raise HTTPException(status_code=500, detail=str(e.detail))
+    if not changed:
+        raise HTTPException(status_code=404, detail=f"User not found: {email}")
+
+
+@router.post("/users/import")
+async def import_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="ndjson or csv"),
+    current_user: Dict = Depends(get_current_superuser),
+):
+    """
+    Bulk import users from an NDJSON or CSV upload. Each record carries
+    either a plaintext ``password`` or a bcrypt ``hashed_password``.
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+
+    import_log.info(f"User import started by {current_user['email']}: {file.filename}")
+    importer = UserImporter(
+        async_engine,
+        batch_size=settings.USER_IMPORT_BATCH_SIZE,
+        hashing_workers=hashing_workers(),
+        executor=get_import_executor(),
+    )
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    report = await importer.run(iter_records(lines, fmt))
+    import_log.info(
+        f"User import finished: {report.inserted} inserted, "
+        f"{report.duplicates} duplicates, {report.invalid} invalid"
+    )
+    return report.snapshot()
+
+
+@router.post("/users/{email}/deactivate")
+async def deactivate_user(
+    email: str,
+    db: AsyncSession = Depends(get_db),
+    user_service: UserService = Depends(get_user_service),
+    current_user: Dict = Depends(get_current_superuser),
+):
+    """Deactivate a user and end all of their sessions"""
+    await _apply_change(user_service.deactivate_user(db, email), email)
+    admin_log.info(f"User {email} deactivated by {current_user['email']}")
+    return {"email": email, "is_active": False}
+
+
+@router.put("/users/{email}/password")
+async def change_password(
+    email: str,
+    change: PasswordChange,
+    db: AsyncSession = Depends(get_db),
+    user_service: UserService = Depends(get_user_service),
+    current_user: Dict = Depends(get_current_superuser),
+):
+    """Set a user's password and end all of their sessions"""
+    await _apply_change(user_service.change_password(db, email, change.password), email)
+    admin_log.info(f"Password of {email} changed by {current_user['email']}")
+    return {"email": email}
+
+
+@router.put("/users/{email}/role")
+async def set_role(
+    email: str,
+    change: RoleChange,
+    db: AsyncSession = Depends(get_db),
+    user_service: UserService = Depends(get_user_service),
+    current_user: Dict = Depends(get_current_superuser),
+):
+    """Grant or revoke superuser privileges, ending the user's sessions"""
+    await _apply_change(
+        user_service.set_superuser(db, email, change.is_superuser), email
+    )
+    admin_log.info(
+        f"Superuser of {email} set to {change.is_superuser} by {current_user['email']}"
+    )
+    return {"email": email, "is_superuser": change.is_superuser}
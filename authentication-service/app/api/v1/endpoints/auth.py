@@ -1,30 +1,53 @@
 # app/api/v1/endpoints/auth.py
-from datetime import timedelta
 from typing import Dict
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies.auth import (
     get_auth_service,
+    get_current_superuser,
     get_token_service,
     get_user_service,
 )
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import async_engine, get_db, pool_status, replica_set
 from app.core.exceptions import (
     AuthenticationException,
     DuplicateEntityException,
+    RateLimitException,
     RegistrationException,
+    ServiceUnavailableException,
+)
+from app.core.logger import log_sampler, logger
+from app.core.responses import json_response, model_response
+from app.core.security import get_password_hasher
+from app.core.shared_memory import shared_tables_status
+from app.core.singleflight import get_single_flight
+from app.schemas.user import (
+    TokenBatchValidationRequest,
+    UserCreate,
+    UserLogin,
+    UserResponse,
 )
-from app.core.logger import logger
-from app.schemas.user import UserCreate, UserLogin, UserResponse
 from app.services.auth_service import AuthService
+from app.services.outbox import get_outbox
+from app.services.rate_limit import client_ip, get_login_rate_limiter
+from app.services.refresh_tokens import get_refresh_token_families
+from app.services.revocation import get_revocation_list
+from app.services.token_cache import get_token_cache
 from app.services.token_service import TokenService
+from app.services.token_versions import get_token_versions
+from app.services.user_cache import get_user_cache
 from app.services.user_service import UserService
 
 router = APIRouter()
 
+register_log = logger.bind(category="user.register")
+login_log = logger.bind(category="auth.login")
+refresh_log = logger.bind(category="token.refresh")
+validate_log = logger.bind(category="token.validate")
+
 
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(
@@ -36,21 +59,25 @@ async def register(
     Register a new user.
     """
     try:
-        logger.info(f"Attempting to register user: {user.email}")
+        register_log.info(f"Attempting to register user: {user.email}")
         db_user = await user_service.register_user(db, user)
-        logger.info(f"Successfully registered user: {user.email}")
-        return db_user
+        register_log.info(f"Successfully registered user: {user.email}")
+        return model_response(UserResponse, db_user, status_code=201)
     except DuplicateEntityException as e:
         logger.warning(f"Registration failed - duplicate user: {user.email}")
         raise HTTPException(status_code=400, detail=str(e.detail))
     except RegistrationException as e:
         logger.error(f"Registration failed - server error: {str(e.detail)}")
         raise HTTPException(status_code=500, detail=str(e.detail))
+    except ServiceUnavailableException as e:
+        logger.warning(f"Registration deferred - {str(e.detail)}")
+        raise HTTPException(status_code=503, detail=str(e.detail))
 
 
 @router.post("/token")
 async def login(
     login_data: UserLogin,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     auth_service: AuthService = Depends(get_auth_service),
 ):
@@ -58,28 +85,35 @@ async def login(
     Authenticate user and return tokens.
     """
     try:
-        logger.info(f"Login attempt for user: {login_data.email}")
+        login_log.info(f"Login attempt for user: {login_data.email}")
+        rate_limiter = get_login_rate_limiter()
+        if rate_limiter is not None:
+            await rate_limiter.check(
+                login_data.email,
+                client_ip(
+                    request.client.host if request.client else None,
+                    request.headers.get("x-forwarded-for"),
+                ),
+            )
         user = await auth_service.authenticate_user(db, login_data)
+        tokens = auth_service.issue_tokens(user)
 
-        access_token = auth_service.token_service.create_access_token(
-            data={"sub": user.email},
-            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-        )
-
-        refresh_token = auth_service.token_service.create_refresh_token(
-            data={"sub": user.email}, expires_delta=timedelta(days=7)
-        )
-
-        logger.info(f"Login successful for user: {login_data.email}")
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-        }
+        login_log.info(f"Login successful for user: {login_data.email}")
+        return json_response(tokens)
 
     except AuthenticationException as e:
         logger.warning(f"Login failed for user {login_data.email}: {str(e.detail)}")
         raise HTTPException(status_code=401, detail=str(e.detail))
+    except ServiceUnavailableException as e:
+        logger.warning(f"Login deferred for user {login_data.email}: {str(e.detail)}")
+        raise HTTPException(status_code=503, detail=str(e.detail))
+    except RateLimitException as e:
+        login_log.warning(f"Login throttled for user {login_data.email}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e.detail),
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post("/refresh-token")
@@ -97,16 +131,41 @@ async def refresh_token(
             logger.warning("Refresh token attempt without token")
             raise HTTPException(status_code=400, detail="Refresh token is required")
 
-        logger.info("Attempting to refresh tokens")
+        refresh_log.info("Attempting to refresh tokens")
         tokens = await auth_service.refresh_tokens(db, refresh_token)
-        logger.info("Tokens refreshed successfully")
-        return tokens
+        refresh_log.info("Tokens refreshed successfully")
+        return json_response(tokens)
 
     except AuthenticationException as e:
         logger.warning(f"Token refresh failed: {str(e.detail)}")
         raise HTTPException(status_code=401, detail=str(e.detail))
 
 
+@router.post("/logout")
+async def logout(
+    token_data: Dict[str, str] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """
+    Revoke an access token and, optionally, the refresh token issued with it.
+    """
+    access_token = token_data.get("access_token")
+    if not access_token:
+        logger.warning("Logout attempt without token")
+        raise HTTPException(status_code=400, detail="Access token is required")
+
+    try:
+        revoked = await auth_service.revoke_tokens(
+            db, access_token, token_data.get("refresh_token")
+        )
+        return json_response({"revoked": revoked})
+
+    except AuthenticationException as e:
+        logger.warning(f"Logout failed: {str(e.detail)}")
+        raise HTTPException(status_code=401, detail=str(e.detail))
+
+
 @router.post("/validate-token")
 async def validate_token(
     token_data: Dict[str, str] = Body(...),
@@ -122,17 +181,78 @@ async def validate_token(
             logger.warning("Token validation attempt without token")
             raise HTTPException(status_code=400, detail="Access token is required")
 
-        logger.info("Validating access token")
+        validate_log.info("Validating access token")
         user_details = await auth_service.validate_access_token(db, access_token)
-        logger.info(f"Token validated successfully for user: {user_details['email']}")
+        validate_log.info(
+            f"Token validated successfully for user: {user_details['email']}"
+        )
 
-        return {"valid": True, **user_details}
+        return json_response({"valid": True, **user_details})
 
     except AuthenticationException as e:
         logger.warning(f"Token validation failed: {str(e.detail)}")
         raise HTTPException(status_code=401, detail=str(e.detail))
 
 
+@router.post("/validate-tokens")
+async def validate_tokens(
+    batch: TokenBatchValidationRequest,
+    db: AsyncSession = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """
+    Validate a batch of access tokens, returning one result per token in
+    input order.
+    """
+    if len(batch.access_tokens) > settings.VALIDATE_TOKENS_MAX_BATCH:
+        logger.warning(f"Token batch too large: {len(batch.access_tokens)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.VALIDATE_TOKENS_MAX_BATCH} tokens per batch",
+        )
+
+    validate_log.info(f"Validating batch of {len(batch.access_tokens)} access tokens")
+    results = await auth_service.validate_access_tokens(db, batch.access_tokens)
+    return json_response({"results": results})
+
+
+@router.get("/stats")
+async def stats(current_user: Dict = Depends(get_current_superuser)):
+    """
+    Runtime statistics for the auth service internals (superusers only).
+    """
+    token_cache = get_token_cache()
+    user_cache = get_user_cache()
+    revocation_list = get_revocation_list()
+    refresh_families = get_refresh_token_families()
+    rate_limiter = get_login_rate_limiter()
+    token_versions = get_token_versions()
+    outbox = get_outbox()
+    return {
+        "hashing": get_password_hasher().stats.snapshot(),
+        "token_cache": token_cache.stats.snapshot() if token_cache else None,
+        "user_cache": user_cache.stats.snapshot() if user_cache else None,
+        "shared_cache": shared_tables_status(),
+        "revocation": revocation_list.stats.snapshot() if revocation_list else None,
+        "refresh_families": (
+            refresh_families.stats.snapshot() if refresh_families else None
+        ),
+        "login_rate_limit": rate_limiter.stats.snapshot() if rate_limiter else None,
+        "token_versions": token_versions.stats.snapshot() if token_versions else None,
+        "outbox": outbox.stats.snapshot() if outbox else None,
+        "single_flight": {
+            group: flight.stats.snapshot() if flight else None
+            for group, flight in (
+                ("token_validation", get_single_flight("token_validation")),
+                ("user_lookup", get_single_flight("user_lookup")),
+            )
+        },
+        "logging": {"dropped": dict(log_sampler.dropped)},
+        "db_pool": pool_status(async_engine),
+        "db_replicas": replica_set.status() if replica_set else None,
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth
+from app.api.v1.endpoints import admin, auth
 
 v1_router = APIRouter()
 
 v1_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+v1_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,68 @@
+"""
+Bulk import users from an NDJSON or CSV file.
+
+    python -m app.cli.import_users users.ndjson --checkpoint users.ckpt
+
+Each record has an ``email`` and either a plaintext ``password`` or a bcrypt
+``hashed_password``; ``full_name``, ``is_active`` and ``is_superuser`` are
+optional. Re-running with the same ``--checkpoint`` resumes after the last
+committed batch.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.services.user_import import (
+    IMPORT_FORMATS,
+    UserImporter,
+    detect_format,
+    iter_records,
+)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    importer = UserImporter(
+        async_engine,
+        batch_size=args.batch_size,
+        hashing_workers=args.workers,
+    )
+    source = (
+        sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    )
+    try:
+        fmt = args.format or detect_format(args.path)
+        report = await importer.run(
+            iter_records(source, fmt), checkpoint_path=args.checkpoint
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        await async_engine.dispose()
+    return report.snapshot()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.USER_IMPORT_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.USER_IMPORT_HASHING_WORKERS,
+        help="processes hashing plaintext passwords (default: CPU count)",
+    )
+    parser.add_argument("--checkpoint", help="file recording progress for resume")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Run the service in production: a supervisor and one or more uvicorn worker
+processes.
+
+    python -m app.cli.serve --workers 4 --max-requests 20000 --max-rss-mb 512
+
+Workers share one listening socket opened by the supervisor or, with
+``--reuse-port``, each bind their own and the kernel spreads connections
+across them. The supervisor restarts workers that die, and recycles them
+after ``--max-requests`` requests or once their RSS passes ``--max-rss-mb``.
+SIGTERM and SIGINT stop every worker gracefully; SIGHUP replaces them all.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+
+server_log = logger.bind(category="server")
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def available_cpus(cgroup_cpu_max: str = CGROUP_CPU_MAX) -> int:
+    """CPUs this process may use, honouring affinity and container quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open(cgroup_cpu_max) as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def select_loop(requested: str) -> str:
+    if requested != "auto":
+        return requested
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def select_http(requested: str) -> str:
+    if requested != "auto":
+        return requested
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of ``pid``, or None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def bind_socket(
+    host: str, port: int, reuse_port: bool, backlog: int = 2048
+) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def load_hook(path: str) -> Callable[[int], None]:
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Startup hook must look like module:function, got {path}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+@dataclass
+class ServerOptions:
+    host: str
+    port: int
+    workers: int
+    reuse_port: bool
+    loop: str
+    http: str
+    max_requests: Optional[int]
+    max_requests_jitter: int
+    max_rss_mb: Optional[int]
+    graceful_timeout: int
+    startup_hook: Optional[str]
+
+
+def prepare_metrics_dir(workers: int) -> Optional[str]:
+    """
+    With several workers, point prometheus_client in all of them at one
+    directory of metric files, so ``/metrics`` adds up every worker instead
+    of reporting whichever one answered. Runs before the workers start, as
+    prometheus_client picks its storage when it is imported. Returns the
+    directory if this call created it.
+    """
+    if workers <= 1 or not settings.METRICS_ENABLED:
+        return None
+
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path is None:
+        path = tempfile.mkdtemp(prefix="auth-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+        return path
+
+    # Files left by a previous run would be added to this run's totals
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    return None
+
+
+def mark_worker_dead(pid: int) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+def signal_when_serving(server, ready: Event) -> None:
+    """Set ``ready`` once ``server`` has run the app lifespan and listens"""
+    startup = server.startup
+
+    async def startup_then_signal(sockets=None):
+        await startup(sockets=sockets)
+        if not server.should_exit:
+            ready.set()
+
+    server.startup = startup_then_signal
+
+
+def run_worker(
+    worker_id: int,
+    options: ServerOptions,
+    max_requests: Optional[int],
+    sock: Optional[socket.socket],
+    ready: Optional[Event] = None,
+) -> None:
+    import uvicorn
+
+    os.environ["WORKER_ID"] = str(worker_id)
+    os.environ["SERVER_WORKER_COUNT"] = str(options.workers)
+    if options.startup_hook:
+        load_hook(options.startup_hook)(worker_id)
+    if sock is None:
+        sock = bind_socket(options.host, options.port, reuse_port=True)
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=options.host,
+        port=options.port,
+        loop=options.loop,
+        http=options.http,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=options.graceful_timeout,
+    )
+    server = uvicorn.Server(config)
+    if ready is not None:
+        signal_when_serving(server, ready)
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Keeps ``options.workers`` worker processes running. A worker is
+    recycled by starting its replacement first; only once the replacement
+    has run its startup and is serving is the old one asked to finish its
+    in-flight requests and exit. Workers that
+    keep crashing right after starting are restarted with a growing delay.
+    """
+
+    min_uptime_seconds = 5.0
+    max_backoff_seconds = 30.0
+    poll_seconds = 0.5
+
+    def __init__(self, options: ServerOptions):
+        self.options = options
+        self.context = multiprocessing.get_context("spawn")
+        self.socket = (
+            None
+            if options.reuse_port
+            else bind_socket(options.host, options.port, reuse_port=False)
+        )
+        self.workers: Dict[int, BaseProcess] = {}
+        self.ready: Dict[int, Event] = {}
+        # Workers being recycled, kept serving until their replacement is
+        # ready
+        self.replacing: Dict[int, BaseProcess] = {}
+        self.started_at: Dict[int, float] = {}
+        self.crashes: Dict[int, int] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.retiring: Dict[BaseProcess, float] = {}
+        self.should_exit = False
+        self.recycle_all = False
+
+    def spawn(self, worker_id: int) -> None:
+        max_requests = self.options.max_requests
+        if max_requests:
+            # Jitter keeps workers from all recycling at the same moment
+            max_requests += random.randint(0, self.options.max_requests_jitter)
+
+        ready = self.context.Event()
+        process = self.context.Process(
+            target=run_worker,
+            args=(worker_id, self.options, max_requests, self.socket, ready),
+            name=f"worker-{worker_id}",
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.ready[worker_id] = ready
+        self.started_at[worker_id] = time.monotonic()
+        server_log.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def retire(self, worker_id: int, reason: str) -> None:
+        process = self.workers[worker_id]
+        server_log.info(f"Recycling worker {worker_id} (pid {process.pid}): {reason}")
+        previous = self.replacing.pop(worker_id, None)
+        if previous is not None:
+            self._stop(previous)
+        self.replacing[worker_id] = process
+        self.spawn(worker_id)
+
+    def _stop(self, process: BaseProcess) -> None:
+        process.terminate()
+        self.retiring[process] = (
+            time.monotonic() + self.options.graceful_timeout + self.poll_seconds
+        )
+
+    def _schedule_restart(self, worker_id: int, process: BaseProcess) -> None:
+        process.join()
+        mark_worker_dead(process.pid)
+        uptime = time.monotonic() - self.started_at[worker_id]
+        if process.exitcode == 0 or uptime >= self.min_uptime_seconds:
+            self.crashes[worker_id] = 0
+        else:
+            self.crashes[worker_id] = self.crashes.get(worker_id, 0) + 1
+
+        delay = min(2 ** self.crashes[worker_id] - 1, self.max_backoff_seconds)
+        log = server_log.info if process.exitcode == 0 else server_log.warning
+        log(
+            f"Worker {worker_id} (pid {process.pid}) exited with code "
+            f"{process.exitcode}; restarting in {delay:g}s"
+        )
+        self.restart_at[worker_id] = time.monotonic() + delay
+
+    def check_workers(self) -> None:
+        max_rss = self.options.max_rss_mb and self.options.max_rss_mb * 1024 * 1024
+        for worker_id, process in list(self.workers.items()):
+            if worker_id in self.restart_at:
+                if time.monotonic() >= self.restart_at[worker_id]:
+                    del self.restart_at[worker_id]
+                    self.spawn(worker_id)
+            elif not process.is_alive():
+                self._schedule_restart(worker_id, process)
+            elif self.recycle_all:
+                self.retire(worker_id, "SIGHUP")
+            elif max_rss:
+                rss = rss_bytes(process.pid)
+                if rss is not None and rss > max_rss:
+                    self.retire(
+                        worker_id,
+                        f"RSS {rss // 2**20} MB over {self.options.max_rss_mb} MB",
+                    )
+        self.recycle_all = False
+
+        for worker_id, process in list(self.replacing.items()):
+            if self.ready[worker_id].is_set() or not process.is_alive():
+                del self.replacing[worker_id]
+                self._stop(process)
+
+        for process, deadline in list(self.retiring.items()):
+            if not process.is_alive():
+                process.join()
+                mark_worker_dead(process.pid)
+                del self.retiring[process]
+                server_log.info(
+                    f"Retired worker pid {process.pid} exited with code "
+                    f"{process.exitcode}"
+                )
+            elif time.monotonic() > deadline:
+                server_log.warning(f"Killing worker pid {process.pid} after timeout")
+                process.kill()
+
+    def _handle_exit(self, signum, frame) -> None:
+        self.should_exit = True
+
+    def _handle_hup(self, signum, frame) -> None:
+        self.recycle_all = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGHUP, self._handle_hup)
+
+        server_log.info(
+            f"Serving on {self.options.host}:{self.options.port} with "
+            f"{self.options.workers} workers ({self.options.loop}, "
+            f"{self.options.http}, "
+            f"{'SO_REUSEPORT' if self.options.reuse_port else 'shared socket'})"
+        )
+        for worker_id in range(self.options.workers):
+            self.spawn(worker_id)
+
+        try:
+            while not self.should_exit:
+                self.check_workers()
+                time.sleep(self.poll_seconds)
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        processes = [
+            *self.workers.values(),
+            *self.replacing.values(),
+            *self.retiring,
+        ]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.options.graceful_timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                server_log.warning(f"Killing worker pid {process.pid} after timeout")
+                process.kill()
+                process.join()
+            mark_worker_dead(process.pid)
+
+        if self.socket is not None:
+            self.socket.close()
+        server_log.info("All workers stopped")
+
+
+def main() -> None:
+    # Imports prometheus_client before prepare_metrics_dir points it at the
+    # workers' directory, which keeps the supervisor out of their totals
+    from app.core.security import calibrate_for_workers
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="worker processes (default: 1; 0 for one per available CPU)",
+    )
+    parser.add_argument(
+        "--reuse-port",
+        action=argparse.BooleanOptionalAction,
+        default=settings.SERVER_REUSE_PORT,
+        help="bind a socket per worker with SO_REUSEPORT",
+    )
+    parser.add_argument(
+        "--loop", choices=["auto", "uvloop", "asyncio"], default=settings.SERVER_LOOP
+    )
+    parser.add_argument(
+        "--http", choices=["auto", "httptools", "h11"], default=settings.SERVER_HTTP
+    )
+    parser.add_argument(
+        "--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS
+    )
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER
+    )
+    parser.add_argument("--max-rss-mb", type=int, default=settings.SERVER_MAX_RSS_MB)
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+    parser.add_argument(
+        "--startup-hook",
+        default=settings.SERVER_WORKER_STARTUP_HOOK,
+        help="module:function called with the worker id in each new worker",
+    )
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    workers = args.workers or cpus
+    calibrate_for_workers()
+    metrics_dir = prepare_metrics_dir(workers)
+    if settings.HASHING_WORKERS is None:
+        # Every worker process has its own hashing pool; split the CPUs
+        # between them instead of giving each one all of them
+        os.environ["HASHING_WORKERS"] = str(max(1, cpus // workers))
+
+    supervisor = Supervisor(
+        ServerOptions(
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            reuse_port=args.reuse_port,
+            loop=select_loop(args.loop),
+            http=select_http(args.http),
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            max_rss_mb=args.max_rss_mb,
+            graceful_timeout=args.graceful_timeout,
+            startup_hook=args.startup_hook,
+        )
+    )
+    try:
+        supervisor.run()
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,333 @@
-from typing import AsyncGenerator
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass
+from typing import AsyncGenerator, Dict, Iterable, List, Optional, Union
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.core.config import settings
+from app.core.config import settings, worker_count
+from app.core.logger import logger
+from app.core.shared_memory import SharedMemoryTable, digest, get_shared_table
 
-async_engine = create_async_engine(
-    settings.DATABASE_URL, echo=settings.DEBUG, future=True
+
+@dataclass
+class PoolStats:
+    """Counters for a connection pool; live gauges are read from the pool"""
+
+    checkouts: int = 0
+    connects: int = 0
+    connect_errors: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING / DO UPDATE
+conflict_free_inserts = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        except Exception:
+            self.stats.connect_errors += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.stats.checkouts += 1
+            self.stats.wait_seconds_total += waited
+            self.stats.wait_seconds_max = max(self.stats.wait_seconds_max, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def status_snapshot(self) -> Dict[str, Union[int, float]]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            **asdict(self.stats),
+        }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """Build an async engine with the pool and statement cache tuning from
+    Settings."""
+    options = {
+        "echo": settings.DEBUG,
+        "future": True,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+
+    if ":memory:" not in url:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+        }
+
+    engine = create_async_engine(url, **options)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        stats = getattr(engine.sync_engine.pool, "stats", None)
+        if stats is not None:
+            stats.connects += 1
+
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> Dict[str, Union[int, float]]:
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.status_snapshot()
+    return {"status": pool.status()}
+
+
+class ReplicaSet:
+    """
+    Read replicas with round-robin or least-busy selection. There is no
+    background health check: a replica is only marked failed when a read
+    on it errors, and is then skipped for ``retry_seconds`` before it is
+    tried again.
+    """
+
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        selection: str = "round_robin",
+        retry_seconds: float = 30.0,
+    ):
+        if selection not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown replica selection: {selection}")
+        self.engines = engines
+        self.selection = selection
+        self.retry_seconds = retry_seconds
+        self._down_until = [0.0] * len(engines)
+        self._counter = itertools.count()
+
+    def _healthy(self) -> List[int]:
+        now = time.monotonic()
+        return [i for i, until in enumerate(self._down_until) if until <= now]
+
+    def choose(self) -> Optional[AsyncEngine]:
+        healthy = self._healthy()
+        if not healthy:
+            return None
+        if self.selection == "least_busy":
+            index = min(healthy, key=lambda i: _checked_out(self.engines[i]))
+        else:
+            index = healthy[next(self._counter) % len(healthy)]
+        return self.engines[index]
+
+    def mark_failed(self, engine: AsyncEngine) -> None:
+        for index, candidate in enumerate(self.engines):
+            if candidate is engine:
+                self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def status(self) -> List[Dict]:
+        healthy = set(self._healthy())
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": index in healthy,
+                **pool_status(engine),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    pool = engine.sync_engine.pool
+    return pool.checkedout() if isinstance(pool, AsyncAdaptedQueuePool) else 0
+
+
+class RecentWrites:
+    """
+    Keys written within the last ``window_seconds``. Reads for those keys
+    stay on the primary so a client never misses its own write because of
+    replication lag. Writes are remembered by this process, or, given a
+    ``SharedMemoryTable``, by every worker on the host, since the read that
+    follows a write is usually served by another worker.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 5.0,
+        max_entries: int = 10_000,
+        table: Optional[SharedMemoryTable] = None,
+    ):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.table = table
+        self._written_at: "OrderedDict[str, float]" = OrderedDict()
+
+    def mark(self, key: str) -> None:
+        if self.table is not None:
+            self.table.set(digest(key), b"", time.time() + self.window_seconds)
+            return
+        self._written_at[key] = time.monotonic()
+        self._written_at.move_to_end(key)
+        while len(self._written_at) > self.max_entries:
+            self._written_at.popitem(last=False)
+
+    def is_recent(self, key: str) -> bool:
+        if self.table is not None:
+            return self.table.get(digest(key)) is not None
+        written_at = self._written_at.get(key)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > self.window_seconds:
+            del self._written_at[key]
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """
+    Session that sends statements executed with
+    ``bind_arguments={"use_replica": True}`` to a read replica and
+    everything else, including flushes, to the primary. A session sticks
+    to the first replica it picks.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, use_replica=False, **kw):
+        if use_replica and replica_set is not None and not self._flushing:
+            replica = self.info.get("replica") or replica_set.choose()
+            if replica is not None:
+                self.info["replica"] = replica
+                return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+async def execute_read(
+    db: AsyncSession, statement, params=None, keys: Iterable[str] = ()
+):
+    """
+    Run a read-only statement on a replica when one is configured. It goes
+    to the primary instead if any of ``keys`` was just written, and falls
+    back to the primary if the replica fails. That fallback rolls the
+    session back first, so call this with no uncommitted writes pending.
+    """
+    if replica_set is None or any(recent_writes.is_recent(key) for key in keys):
+        return await db.execute(statement, params)
+
+    try:
+        return await db.execute(statement, params, bind_arguments={"use_replica": True})
+    except (OperationalError, InterfaceError, PoolTimeoutError, OSError) as e:
+        replica = db.info.pop("replica", None)
+        if replica is None:
+            raise
+        replica_set.mark_failed(replica)
+        logger.warning(f"Read replica failed, using primary: {str(e)}")
+        # The failed replica connection may be invalidated or mid-way through
+        # an aborted transaction; either poisons the session until rollback
+        await db.rollback()
+        return await db.execute(statement, params)
+
+
+async_engine = create_engine(settings.DATABASE_URL)
+
+replica_set: Optional[ReplicaSet] = (
+    ReplicaSet(
+        [create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+        selection=settings.DB_REPLICA_SELECTION,
+        retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    )
+    if settings.DATABASE_REPLICA_URLS
+    else None
 )
 
+
+def create_recent_writes() -> RecentWrites:
+    backend = settings.DB_READ_YOUR_WRITES_BACKEND
+    if backend == "auto":
+        backend = (
+            "shared" if replica_set is not None and worker_count() > 1 else "memory"
+        )
+
+    table = None
+    if backend == "shared":
+        table = get_shared_table("recent_writes", settings.DB_READ_YOUR_WRITES_MAX_KEYS)
+    elif backend != "memory":
+        raise ValueError(f"Unknown read-your-writes backend: {backend}")
+    return RecentWrites(
+        window_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+        max_entries=settings.DB_READ_YOUR_WRITES_MAX_KEYS,
+        table=table,
+    )
+
+
+recent_writes = create_recent_writes()
+
 AsyncSessionLocal = sessionmaker(
-    async_engine, class_=AsyncSession, expire_on_commit=False
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
 )
 
 
+def all_engines() -> List[AsyncEngine]:
+    return [async_engine, *(replica_set.engines if replica_set else [])]
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> int:
+    """Open up to ``connections`` pooled connections now rather than on the
+    first requests. Returns how many were opened."""
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        connections = min(connections, pool.size())
+    else:
+        connections = min(connections, 1)
+
+    # Held together so that each checkout opens a separate connection
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections))
+        )
+    return connections
+
+
+async def dispose_engines() -> None:
+    for engine in all_engines():
+        await engine.dispose()
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
@@ -18,7 +18,41 @@ class RegistrationException(BaseAPIException):
     pass
 
 
+class UserUpdateException(BaseAPIException):
+    """Raised when a change to an existing user cannot be saved"""
+
+    pass
+
+
 class AuthenticationException(BaseAPIException):
     """Raised when authentication fails"""
 
     pass
+
+
+class ServiceUnavailableException(BaseAPIException):
+    """Raised when a backing resource is saturated or unavailable"""
+
+    pass
+
+
+class RateLimitException(BaseAPIException):
+    """Raised when a caller exceeds a rate limit"""
+
+    def __init__(self, detail: str, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(detail)
+
+
+class ProtocolException(BaseAPIException):
+    """Raised when an internal protocol message is malformed or too large"""
+
+    pass
+
+
+class RPCCallException(BaseAPIException):
+    """Raised by the internal protocol client when a call does not succeed"""
+
+    def __init__(self, detail: str, status: int):
+        self.status = status
+        super().__init__(detail)
@@ -0,0 +1,474 @@
+import base64
+import hashlib
+import hmac
+import json
+import re
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Type
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+from jose import JWTError, jwk
+from jose import jwt as jose_jwt
+
+from app.core.config import settings
+from app.core.keys import KeyRing, get_key_ring
+
+
+class TokenExpiredError(Exception):
+    """Raised by a JWT engine when the token's exp claim has passed"""
+
+    pass
+
+
+class InvalidTokenError(Exception):
+    """Raised by a JWT engine when a token is malformed or its signature is bad"""
+
+    pass
+
+
+class JWTEngine(ABC):
+    """
+    Encodes and decodes JWTs with key material prepared once at construction.
+
+    Signing uses the active key of the key ring when one is configured, and
+    the shared secret otherwise. Tokens carrying a ``kid`` header are
+    verified with that key. Tokens without one are verified against the
+    shared secret, or, once a key ring is configured, only while
+    ``accept_legacy`` is set.
+    """
+
+    name: str = ""
+
+    def __init__(
+        self,
+        key_ring: Optional[KeyRing] = None,
+        secret: Optional[str] = None,
+        algorithm: Optional[str] = None,
+        accept_legacy: Optional[bool] = None,
+    ):
+        self.key_ring = key_ring
+        self.secret = secret if secret is not None else settings.JWT_SECRET_KEY
+        self.algorithm = algorithm or settings.ALGORITHM
+        if accept_legacy is None:
+            accept_legacy = settings.JWT_ACCEPT_LEGACY_TOKENS
+        self.accept_legacy = key_ring is None or accept_legacy
+        self.prepare()
+
+    @property
+    def verifies_legacy_tokens(self) -> bool:
+        """Whether tokens without a kid are checked against the shared secret"""
+        return self.accept_legacy and self.algorithm.startswith("HS")
+
+    @abstractmethod
+    def prepare(self) -> None:
+        pass
+
+    @abstractmethod
+    def encode(self, claims: Dict) -> str:
+        pass
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict:
+        pass
+
+
+def _b64url_encode(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+_BASE64URL = re.compile(r"[A-Za-z0-9_-]*")
+
+
+def _b64url_decode(segment: str) -> bytes:
+    """
+    Strict base64url. ``urlsafe_b64decode`` skips characters outside the
+    alphabet and ignores the unused bits of the last one, so many strings
+    would decode to the same token, each missing the token cache.
+    """
+    if not _BASE64URL.fullmatch(segment) or len(segment) % 4 == 1:
+        raise ValueError("Invalid base64url segment")
+    raw = base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+    if _b64url_encode(raw) != segment.encode("ascii"):
+        raise ValueError("Non-canonical base64url segment")
+    return raw
+
+
+def _require_canonical_signature(token: str) -> None:
+    # Header and payload are signed as they appear, but the libraries
+    # decode the signature leniently
+    try:
+        _b64url_decode(token.rpartition(".")[2])
+    except ValueError as e:
+        raise InvalidTokenError(str(e))
+
+
+_HASHES = {"256": hashes.SHA256, "384": hashes.SHA384, "512": hashes.SHA512}
+_HMAC_DIGESTS = {"256": hashlib.sha256, "384": hashlib.sha384, "512": hashlib.sha512}
+
+
+def _require_secret_algorithm(algorithm: str) -> None:
+    # Only HMAC algorithms can use the shared secret.
+    if not algorithm.startswith("HS"):
+        raise ValueError(f"{algorithm} needs JWT_SIGNING_KEYS, not a shared secret")
+
+
+class _Verifier(NamedTuple):
+    algorithm: str
+    verify: Callable[[bytes, bytes], bool]
+
+
+def _make_signer(algorithm: str, key) -> Callable[[bytes], bytes]:
+    family, bits = algorithm[:2], algorithm[2:]
+
+    if family == "HS":
+        digest = _HMAC_DIGESTS[bits]
+        return lambda message: hmac.new(key, message, digest).digest()
+    if family == "RS":
+        pkcs1, hash_algorithm = padding.PKCS1v15(), _HASHES[bits]()
+        return lambda message: key.sign(message, pkcs1, hash_algorithm)
+    if family == "ES":
+        ecdsa = ec.ECDSA(_HASHES[bits]())
+        size = (key.curve.key_size + 7) // 8
+
+        def sign_ecdsa(message: bytes) -> bytes:
+            r, s = decode_dss_signature(key.sign(message, ecdsa))
+            return r.to_bytes(size, "big") + s.to_bytes(size, "big")
+
+        return sign_ecdsa
+    if algorithm == "EdDSA":
+        return key.sign
+    raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+
+def _make_verifier(algorithm: str, key) -> _Verifier:
+    family, bits = algorithm[:2], algorithm[2:]
+
+    if family == "HS":
+        digest = _HMAC_DIGESTS[bits]
+
+        def verify_hmac(message: bytes, signature: bytes) -> bool:
+            expected = hmac.new(key, message, digest).digest()
+            return hmac.compare_digest(expected, signature)
+
+        return _Verifier(algorithm, verify_hmac)
+
+    if family == "RS":
+        pkcs1, hash_algorithm = padding.PKCS1v15(), _HASHES[bits]()
+
+        def verify_rsa(message: bytes, signature: bytes) -> bool:
+            try:
+                key.verify(signature, message, pkcs1, hash_algorithm)
+                return True
+            except InvalidSignature:
+                return False
+
+        return _Verifier(algorithm, verify_rsa)
+
+    if family == "ES":
+        ecdsa = ec.ECDSA(_HASHES[bits]())
+        size = (key.curve.key_size + 7) // 8
+
+        def verify_ecdsa(message: bytes, signature: bytes) -> bool:
+            if len(signature) != 2 * size:
+                return False
+            r = int.from_bytes(signature[:size], "big")
+            s = int.from_bytes(signature[size:], "big")
+            try:
+                key.verify(encode_dss_signature(r, s), message, ecdsa)
+                return True
+            except InvalidSignature:
+                return False
+
+        return _Verifier(algorithm, verify_ecdsa)
+
+    if algorithm == "EdDSA":
+
+        def verify_eddsa(message: bytes, signature: bytes) -> bool:
+            try:
+                key.verify(signature, message)
+                return True
+            except InvalidSignature:
+                return False
+
+        return _Verifier(algorithm, verify_eddsa)
+
+    raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+
+class CryptographyEngine(JWTEngine):
+    """
+    JWS compact serialization implemented directly on ``hmac`` and
+    ``cryptography``. Header segments are encoded once per key, and header
+    segments that already verified are mapped straight to their verifier so
+    decoding normally skips parsing the header.
+    """
+
+    name = "cryptography"
+    _HEADER_CACHE_SIZE = 64
+
+    def prepare(self) -> None:
+        secret = self.secret.encode("utf-8")
+        self._legacy_verifier = (
+            _make_verifier(self.algorithm, secret)
+            if self.verifies_legacy_tokens
+            else None
+        )
+        self._verifiers: Dict[str, _Verifier] = {}
+        self._header_cache: Dict[str, _Verifier] = {}
+
+        if self.key_ring is None:
+            _require_secret_algorithm(self.algorithm)
+            header = {"alg": self.algorithm, "typ": "JWT"}
+            self._sign = _make_signer(self.algorithm, secret)
+        else:
+            active = self.key_ring.active
+            header = {"alg": active.algorithm, "typ": "JWT", "kid": active.kid}
+            self._sign = _make_signer(active.algorithm, active.private_key)
+            for key in self.key_ring.keys():
+                self._verifiers[key.kid] = _make_verifier(key.algorithm, key.public_key)
+
+        self._header_segment = _b64url_encode(
+            json.dumps(header, separators=(",", ":")).encode("utf-8")
+        )
+
+    def encode(self, claims: Dict) -> str:
+        payload_segment = _b64url_encode(
+            json.dumps(claims, separators=(",", ":")).encode("utf-8")
+        )
+        signing_input = self._header_segment + b"." + payload_segment
+        return (
+            signing_input + b"." + _b64url_encode(self._sign(signing_input))
+        ).decode("ascii")
+
+    def decode(self, token: str) -> Dict:
+        signing_input, _, signature_segment = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        if not header_segment or not payload_segment or "." in payload_segment:
+            raise InvalidTokenError("Invalid number of segments")
+
+        try:
+            verifier = self._header_cache.get(header_segment)
+            cached = verifier is not None
+            if not cached:
+                verifier = self._resolve_verifier(header_segment)
+
+            if not verifier.verify(
+                signing_input.encode("ascii"), _b64url_decode(signature_segment)
+            ):
+                raise InvalidTokenError("Signature verification failed")
+
+            payload = json.loads(_b64url_decode(payload_segment))
+        except (ValueError, UnicodeError) as e:
+            raise InvalidTokenError(str(e))
+
+        if not isinstance(payload, dict):
+            raise InvalidTokenError("Invalid payload")
+
+        if not cached and len(self._header_cache) < self._HEADER_CACHE_SIZE:
+            self._header_cache[header_segment] = verifier
+
+        now = time.time()
+        exp = payload.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise InvalidTokenError("Invalid exp claim")
+            if exp <= now:
+                raise TokenExpiredError("Signature has expired")
+        nbf = payload.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+            raise InvalidTokenError("The token is not yet valid")
+        return payload
+
+    def _resolve_verifier(self, header_segment: str) -> _Verifier:
+        header = json.loads(_b64url_decode(header_segment))
+        if not isinstance(header, dict):
+            raise InvalidTokenError("Invalid header")
+
+        kid = header.get("kid")
+        if kid is None:
+            verifier = self._legacy_verifier
+            if verifier is None:
+                raise InvalidTokenError("Token has no kid header")
+        else:
+            verifier = self._verifiers.get(kid)
+            if verifier is None:
+                raise InvalidTokenError(f"Unknown signing key: {kid}")
+
+        if header.get("alg") != verifier.algorithm:
+            raise InvalidTokenError("Token algorithm does not match its key")
+        return verifier
+
+
+class JoseEngine(JWTEngine):
+    """python-jose with pre-constructed key objects. EdDSA keys, which
+    python-jose does not support, are handled by the cryptography engine."""
+
+    name = "jose"
+
+    def prepare(self) -> None:
+        self._legacy_key = (
+            jwk.construct(self.secret, self.algorithm)
+            if self.verifies_legacy_tokens
+            else None
+        )
+        self._keys: Dict[str, Tuple[str, object]] = {}
+        self._eddsa: Optional[CryptographyEngine] = None
+
+        if self.key_ring is None:
+            _require_secret_algorithm(self.algorithm)
+            self._signing_key, self._signing_algorithm = (
+                self._legacy_key,
+                self.algorithm,
+            )
+            self._signing_headers = None
+            return
+
+        if any(key.algorithm == "EdDSA" for key in self.key_ring.keys()):
+            self._eddsa = CryptographyEngine(
+                self.key_ring, self.secret, self.algorithm, self.accept_legacy
+            )
+        for key in self.key_ring.keys():
+            if key.algorithm != "EdDSA":
+                self._keys[key.kid] = (
+                    key.algorithm,
+                    jwk.construct(key.public_key, key.algorithm),
+                )
+
+        active = self.key_ring.active
+        self._signing_algorithm = active.algorithm
+        self._signing_headers = {"kid": active.kid}
+        if active.algorithm != "EdDSA":
+            # python-jose only accepts RSA private keys as PEM.
+            private_pem = active.private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+            self._signing_key = jwk.construct(private_pem, active.algorithm)
+
+    def encode(self, claims: Dict) -> str:
+        if self._signing_algorithm == "EdDSA":
+            return self._eddsa.encode(claims)
+        return jose_jwt.encode(
+            claims,
+            self._signing_key,
+            algorithm=self._signing_algorithm,
+            headers=self._signing_headers,
+        )
+
+    def decode(self, token: str) -> Dict:
+        _require_canonical_signature(token)
+        try:
+            kid = jose_jwt.get_unverified_header(token).get("kid")
+            if kid is None:
+                if self._legacy_key is None:
+                    raise InvalidTokenError("Token has no kid header")
+                return jose_jwt.decode(
+                    token, self._legacy_key, algorithms=[self.algorithm]
+                )
+            if kid not in self._keys:
+                if self._eddsa is not None:
+                    return self._eddsa.decode(token)
+                raise InvalidTokenError(f"Unknown signing key: {kid}")
+
+            algorithm, key = self._keys[kid]
+            return jose_jwt.decode(token, key, algorithms=[algorithm])
+        except jose_jwt.ExpiredSignatureError as e:
+            raise TokenExpiredError(str(e))
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
+
+class PyJWTEngine(JWTEngine):
+    """PyJWT with keys prepared once through its algorithm objects"""
+
+    name = "pyjwt"
+
+    def prepare(self) -> None:
+        try:
+            import jwt
+        except ImportError:
+            raise RuntimeError("The pyjwt JWT engine requires the PyJWT package")
+
+        self._jwt = jwt
+        algorithms = jwt.algorithms.get_default_algorithms()
+
+        def prepare_key(algorithm: str, key):
+            return algorithms[algorithm].prepare_key(key)
+
+        self._legacy_key = (
+            prepare_key(self.algorithm, self.secret)
+            if self.verifies_legacy_tokens
+            else None
+        )
+        self._keys: Dict[str, Tuple[str, object]] = {}
+
+        if self.key_ring is None:
+            _require_secret_algorithm(self.algorithm)
+            self._signing_key, self._signing_algorithm = (
+                self._legacy_key,
+                self.algorithm,
+            )
+            self._signing_headers = None
+            return
+
+        for key in self.key_ring.keys():
+            self._keys[key.kid] = (
+                key.algorithm,
+                prepare_key(key.algorithm, key.public_key),
+            )
+        active = self.key_ring.active
+        self._signing_key = prepare_key(active.algorithm, active.private_key)
+        self._signing_algorithm = active.algorithm
+        self._signing_headers = {"kid": active.kid}
+
+    def encode(self, claims: Dict) -> str:
+        return self._jwt.encode(
+            claims,
+            self._signing_key,
+            algorithm=self._signing_algorithm,
+            headers=self._signing_headers,
+        )
+
+    def decode(self, token: str) -> Dict:
+        jwt = self._jwt
+        _require_canonical_signature(token)
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            if kid is None:
+                if self._legacy_key is None:
+                    raise InvalidTokenError("Token has no kid header")
+                algorithm, key = self.algorithm, self._legacy_key
+            elif kid in self._keys:
+                algorithm, key = self._keys[kid]
+            else:
+                raise InvalidTokenError(f"Unknown signing key: {kid}")
+            return jwt.decode(token, key, algorithms=[algorithm])
+        except jwt.ExpiredSignatureError as e:
+            raise TokenExpiredError(str(e))
+        except jwt.InvalidTokenError as e:
+            raise InvalidTokenError(str(e))
+
+
+JWT_ENGINES: Dict[str, Type[JWTEngine]] = {
+    engine.name: engine for engine in (JoseEngine, PyJWTEngine, CryptographyEngine)
+}
+
+
+def create_jwt_engine(name: str, key_ring: Optional[KeyRing] = None) -> JWTEngine:
+    if name not in JWT_ENGINES:
+        raise ValueError(f"Unknown JWT engine: {name}")
+    return JWT_ENGINES[name](key_ring)
+
+
+@lru_cache()
+def get_jwt_engine() -> JWTEngine:
+    return create_jwt_engine(settings.JWT_ENGINE, get_key_ring())
@@ -0,0 +1,161 @@
+import base64
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core.config import JWTKeyConfig, settings
+
+ASYMMETRIC_ALGORITHMS = {
+    "RS256",
+    "RS384",
+    "RS512",
+    "ES256",
+    "ES384",
+    "ES512",
+    "EdDSA",
+}
+
+_EC_CURVES = {"ES256": "P-256", "ES384": "P-384", "ES512": "P-521"}
+_EC_CURVE_TYPES = {"ES256": ec.SECP256R1, "ES384": ec.SECP384R1, "ES512": ec.SECP521R1}
+
+
+def _check_key_type(kid: str, algorithm: str, public_key: object) -> None:
+    """Fail when the key is loaded instead of on its first use or on /jwks"""
+    if isinstance(public_key, rsa.RSAPublicKey):
+        key_type, matches = "an RSA key", algorithm.startswith("RS")
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        key_type = f"an EC key on {public_key.curve.name}"
+        matches = isinstance(public_key.curve, _EC_CURVE_TYPES.get(algorithm, ()))
+    elif isinstance(public_key, ed25519.Ed25519PublicKey):
+        key_type, matches = "an Ed25519 key", algorithm == "EdDSA"
+    else:
+        key_type, matches = f"a {type(public_key).__name__}", False
+
+    if not matches:
+        raise ValueError(
+            f"JWT key {kid} is {key_type}, which cannot be used with {algorithm}"
+        )
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8 or 1, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _read_pem(path: str) -> bytes:
+    with open(path, "rb") as pem_file:
+        return pem_file.read()
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """
+    An asymmetric JWT key identified by ``kid``. Keys without private
+    material can still verify tokens, which is how retired keys stay
+    usable until every token they signed has expired.
+    """
+
+    kid: str
+    algorithm: str
+    public_key: object
+    private_key: Optional[object] = None
+
+    @property
+    def can_sign(self) -> bool:
+        return self.private_key is not None
+
+    @classmethod
+    def from_config(cls, config: JWTKeyConfig) -> "SigningKey":
+        if config.algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT signing algorithm: {config.algorithm}")
+
+        private_key = None
+        if config.private_key_path:
+            private_key = serialization.load_pem_private_key(
+                _read_pem(config.private_key_path), password=None
+            )
+            public_key = private_key.public_key()
+        elif config.public_key_path:
+            public_key = serialization.load_pem_public_key(
+                _read_pem(config.public_key_path)
+            )
+        else:
+            raise ValueError(f"JWT key {config.kid} has no key material configured")
+
+        _check_key_type(config.kid, config.algorithm, public_key)
+        return cls(
+            kid=config.kid,
+            algorithm=config.algorithm,
+            public_key=public_key,
+            private_key=private_key,
+        )
+
+    def public_jwk(self) -> Dict[str, str]:
+        jwk = {"kid": self.kid, "alg": self.algorithm, "use": "sig"}
+        key = self.public_key
+
+        if isinstance(key, rsa.RSAPublicKey):
+            numbers = key.public_numbers()
+            jwk.update(kty="RSA", n=_b64url_uint(numbers.n), e=_b64url_uint(numbers.e))
+        elif isinstance(key, ec.EllipticCurvePublicKey):
+            numbers = key.public_numbers()
+            size = (key.curve.key_size + 7) // 8
+            jwk.update(
+                kty="EC",
+                crv=_EC_CURVES[self.algorithm],
+                x=_b64url(numbers.x.to_bytes(size, "big")),
+                y=_b64url(numbers.y.to_bytes(size, "big")),
+            )
+        elif isinstance(key, ed25519.Ed25519PublicKey):
+            raw = key.public_bytes(
+                serialization.Encoding.Raw, serialization.PublicFormat.Raw
+            )
+            jwk.update(kty="OKP", crv="Ed25519", x=_b64url(raw))
+        else:
+            raise ValueError(f"Unsupported public key type for JWT key {self.kid}")
+
+        return jwk
+
+
+class KeyRing:
+    """Set of JWT keys: one active signing key plus any verification keys"""
+
+    def __init__(self, keys: List[SigningKey], active_kid: Optional[str] = None):
+        if not keys:
+            raise ValueError("A key ring needs at least one key")
+
+        self._keys = {key.kid: key for key in keys}
+        active_kid = active_kid or keys[0].kid
+        if active_kid not in self._keys:
+            raise ValueError(f"Active JWT key {active_kid} is not configured")
+        if not self._keys[active_kid].can_sign:
+            raise ValueError(f"Active JWT key {active_kid} has no private key")
+
+        self.active = self._keys[active_kid]
+        self._jwks = {"keys": [key.public_jwk() for key in keys]}
+
+    def get(self, kid: str) -> Optional[SigningKey]:
+        return self._keys.get(kid)
+
+    def keys(self) -> List[SigningKey]:
+        return list(self._keys.values())
+
+    def jwks(self) -> Dict[str, List[Dict[str, str]]]:
+        return self._jwks
+
+
+@lru_cache()
+def get_key_ring() -> Optional[KeyRing]:
+    if not settings.JWT_SIGNING_KEYS:
+        return None
+    return KeyRing(
+        [SigningKey.from_config(config) for config in settings.JWT_SIGNING_KEYS],
+        active_kid=settings.JWT_ACTIVE_KID,
+    )
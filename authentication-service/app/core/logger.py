@@ -1,11 +1,16 @@
+import json
 import logging
+import random
 import sys
-from typing import Optional
+import time
+from typing import Dict, Optional
 
 import loguru
 from loguru import logger
 from pydantic import BaseModel
 
+from app.core.config import settings
+
 LOGURU_FORMAT = (
     "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
     "<level>{level: <8}</level> | "
@@ -19,6 +24,98 @@ class LogConfig(BaseModel):
 
     LEVEL: str = "INFO"
     FORMAT: str = "%(levelprefix)s | %(asctime)s | %(message)s"
+    JSON: bool = False
+    ENQUEUE: bool = True
+    BACKTRACE: bool = False
+    FILE: Optional[str] = "logs/app.log"
+    SAMPLING: Dict[str, float] = {}
+    RATE_LIMITS: Dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls) -> "LogConfig":
+        return cls(
+            LEVEL=settings.LOG_LEVEL,
+            JSON=settings.LOG_FORMAT == "json",
+            ENQUEUE=settings.LOG_ASYNC,
+            BACKTRACE=settings.DEBUG,
+            FILE=settings.LOG_FILE or None,
+            SAMPLING=settings.LOG_SAMPLING,
+            RATE_LIMITS=settings.LOG_RATE_LIMITS,
+        )
+
+
+class LogSampler:
+    """
+    Sink filter that thins out high-volume log categories.
+
+    Records are tagged with ``logger.bind(category=...)``. For a tagged
+    record below WARNING, ``sampling`` gives the fraction of records kept
+    and ``rate_limits`` the maximum records kept per second. Warnings,
+    errors and untagged records are always kept.
+    """
+
+    def __init__(
+        self,
+        sampling: Optional[Dict[str, float]] = None,
+        rate_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.sampling = sampling or {}
+        self.rate_limits = rate_limits or {}
+        self.dropped: Dict[str, int] = {}
+        self._windows: Dict[str, list] = {}
+        self._decision_key = f"_sampled_{id(self)}"
+
+    def __call__(self, record) -> bool:
+        extra = record["extra"]
+        # Every sink sees the same record, so decide once and remember it.
+        decision = extra.get(self._decision_key)
+        if decision is None:
+            decision = extra[self._decision_key] = self._keep(record)
+        return decision
+
+    def _keep(self, record) -> bool:
+        category = record["extra"].get("category")
+        if category is None or record["level"].no >= logging.WARNING:
+            return True
+
+        rate = self.sampling.get(category)
+        if rate is not None and random.random() >= rate:
+            return self._drop(category)
+
+        limit = self.rate_limits.get(category)
+        if limit is not None:
+            now = int(time.monotonic())
+            window = self._windows.setdefault(category, [now, 0])
+            if window[0] != now:
+                window[0], window[1] = now, 0
+            if window[1] >= limit:
+                return self._drop(category)
+            window[1] += 1
+
+        return True
+
+    def _drop(self, category: str) -> bool:
+        self.dropped[category] = self.dropped.get(category, 0) + 1
+        return False
+
+
+def _json_format(record) -> str:
+    entry = {
+        "ts": record["time"].timestamp(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "msg": record["message"],
+    }
+    category = record["extra"].get("category")
+    if category is not None:
+        entry["category"] = category
+    if record["exception"] is not None:
+        entry["exc"] = repr(record["exception"].value)
+    record["extra"]["_json"] = json.dumps(entry, separators=(",", ":"))
+    return "{extra[_json]}\n"
+
+
+log_sampler = LogSampler()
 
 
 class InterceptHandler(logging.Handler):
@@ -45,29 +142,44 @@ class InterceptHandler(logging.Handler):
 def setup_logging(config: Optional[LogConfig] = None) -> None:
     """
     Configure logging with custom colors and formatting.
+
+    With ``ENQUEUE`` set, a background thread writes each record to the
+    sinks, so the request path never waits on stdout or the log file.
+    Records are still formatted, and JSON-encoded, by the thread that logs
+    them.
     """
     logger.remove()
 
-    config = config or LogConfig()
+    config = config or LogConfig.from_settings()
+    log_sampler.sampling = config.SAMPLING
+    log_sampler.rate_limits = config.RATE_LIMITS
+
+    log_format = _json_format if config.JSON else LOGURU_FORMAT
 
     logger.add(
         sys.stdout,
         level=config.LEVEL,
-        format=LOGURU_FORMAT,
-        colorize=True,
-        backtrace=True,
+        format=log_format,
+        colorize=not config.JSON,
+        backtrace=config.BACKTRACE,
+        enqueue=config.ENQUEUE,
+        filter=log_sampler,
         catch=True,
     )
 
-    logger.add(
-        "logs/app.log",
-        rotation="10 MB",
-        retention="10 days",
-        level=config.LEVEL,
-        format=LOGURU_FORMAT,
-        backtrace=True,
-        catch=True,
-    )
+    if config.FILE:
+        logger.add(
+            config.FILE,
+            rotation="10 MB",
+            retention="10 days",
+            level=config.LEVEL,
+            format=log_format,
+            colorize=False,
+            backtrace=config.BACKTRACE,
+            enqueue=config.ENQUEUE,
+            filter=log_sampler,
+            catch=True,
+        )
 
     # Intercept standard logging
     logging.basicConfig(
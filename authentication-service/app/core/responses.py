@@ -0,0 +1,45 @@
+from typing import Any, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class RawJSONResponse(Response):
+    """Response whose content is already encoded JSON"""
+
+    media_type = JSON_MEDIA_TYPE
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """
+    Encode service-built payloads (tokens, validation results) with orjson,
+    skipping FastAPI's ``jsonable_encoder`` pass over plain dicts.
+    """
+    return RawJSONResponse(orjson.dumps(content), status_code=status_code)
+
+
+def model_response(
+    model_class: Type[BaseModel], source: Any, status_code: int = 200
+) -> Response:
+    """
+    Serialize ``source`` (e.g. an ORM row) through ``model_class``'s compiled
+    pydantic-core serializer straight to bytes.
+
+    Rows the service has just written are trusted: unless
+    ``RESPONSE_VALIDATION`` is set, they are copied into the model without
+    running its validators again.
+    """
+    if settings.RESPONSE_VALIDATION:
+        model: BaseModel = model_class.model_validate(source)
+    else:
+        model = model_class.model_construct(
+            **{name: getattr(source, name) for name in model_class.model_fields}
+        )
+    return RawJSONResponse(
+        model_class.__pydantic_serializer__.to_json(model), status_code=status_code
+    )
@@ -0,0 +1,439 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple, Type, Union
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.logger import logger
+from app.core.metrics import observe_phase
+
+
+def _time_hash(scheme: "PasswordScheme") -> float:
+    started = time.perf_counter()
+    scheme.hash(b"calibration-password")
+    return time.perf_counter() - started
+
+
+class PasswordScheme(ABC):
+    """
+    One password hashing algorithm with a fixed cost policy. Instances are
+    sent to hashing worker processes, so they must stay picklable.
+    """
+
+    @staticmethod
+    @abstractmethod
+    def identify(hashed_password: bytes) -> bool:
+        """Whether ``hashed_password`` was produced by this algorithm"""
+        pass
+
+    @abstractmethod
+    def hash(self, password: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def verify(self, password: bytes, hashed_password: bytes) -> bool:
+        pass
+
+    @abstractmethod
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        """Whether ``hashed_password`` differs from this policy"""
+        pass
+
+    @abstractmethod
+    def calibrated(self, target_seconds: float) -> "PasswordScheme":
+        """The most expensive policy that still hashes within the target"""
+        pass
+
+    @abstractmethod
+    def policy_env(self) -> Dict[str, str]:
+        """The settings that configure this policy, as environment variables"""
+        pass
+
+
+class BcryptScheme(PasswordScheme):
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def __repr__(self) -> str:
+        return f"BcryptScheme(rounds={self.rounds})"
+
+    @staticmethod
+    def identify(hashed_password: bytes) -> bool:
+        return hashed_password.startswith(b"$2")
+
+    def hash(self, password: bytes) -> bytes:
+        return bcrypt.hashpw(password, bcrypt.gensalt(self.rounds))
+
+    def verify(self, password: bytes, hashed_password: bytes) -> bool:
+        return bcrypt.checkpw(password, hashed_password)
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        # $2b$<rounds>$<salt and hash>
+        return (
+            not self.identify(hashed_password)
+            or int(hashed_password[4:6]) != self.rounds
+        )
+
+    def calibrated(
+        self, target_seconds: float, min_rounds: int = 10, max_rounds: int = 16
+    ) -> "BcryptScheme":
+        # Each extra round doubles the work, so one measurement is enough
+        rounds = min_rounds
+        elapsed = _time_hash(BcryptScheme(rounds))
+        while rounds < max_rounds and elapsed * 2 <= target_seconds:
+            rounds += 1
+            elapsed *= 2
+        return BcryptScheme(rounds)
+
+    def policy_env(self) -> Dict[str, str]:
+        return {"BCRYPT_ROUNDS": str(self.rounds)}
+
+
+class Argon2Scheme(PasswordScheme):
+    """argon2id via ``argon2-cffi``"""
+
+    def __init__(
+        self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4
+    ):
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+
+    def __repr__(self) -> str:
+        return (
+            f"Argon2Scheme(time_cost={self.time_cost}, "
+            f"memory_cost={self.memory_cost}, parallelism={self.parallelism})"
+        )
+
+    def _hasher(self):
+        from argon2 import PasswordHasher as Argon2Hasher
+
+        return Argon2Hasher(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+        )
+
+    @staticmethod
+    def identify(hashed_password: bytes) -> bool:
+        return hashed_password.startswith(b"$argon2")
+
+    def hash(self, password: bytes) -> bytes:
+        return self._hasher().hash(password).encode("ascii")
+
+    def verify(self, password: bytes, hashed_password: bytes) -> bool:
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            return self._hasher().verify(hashed_password.decode("ascii"), password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        return not self.identify(hashed_password) or self._hasher().check_needs_rehash(
+            hashed_password.decode("ascii")
+        )
+
+    def calibrated(
+        self, target_seconds: float, max_time_cost: int = 20
+    ) -> "Argon2Scheme":
+        # Memory and parallelism stay as configured; time grows linearly
+        # with the number of passes
+        elapsed = _time_hash(Argon2Scheme(1, self.memory_cost, self.parallelism))
+        time_cost = int(target_seconds // elapsed) if elapsed > 0 else max_time_cost
+        return Argon2Scheme(
+            max(1, min(time_cost, max_time_cost)), self.memory_cost, self.parallelism
+        )
+
+    def policy_env(self) -> Dict[str, str]:
+        return {
+            "ARGON2_TIME_COST": str(self.time_cost),
+            "ARGON2_MEMORY_COST_KIB": str(self.memory_cost),
+            "ARGON2_PARALLELISM": str(self.parallelism),
+        }
+
+
+password_schemes: Dict[str, Type[PasswordScheme]] = {
+    "bcrypt": BcryptScheme,
+    "argon2": Argon2Scheme,
+}
+
+
+def _scheme_for(current: PasswordScheme, hashed_password: bytes) -> PasswordScheme:
+    # Hashes made under an older policy are verified by the algorithm that
+    # made them; the cost is read from the hash itself.
+    if current.identify(hashed_password):
+        return current
+    for scheme_class in password_schemes.values():
+        if scheme_class.identify(hashed_password):
+            return scheme_class()
+    raise ValueError("Unrecognised password hash format")
+
+
+def _hash_password(scheme: PasswordScheme, password: bytes) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    hashed = scheme.hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _check_password(
+    scheme: PasswordScheme, password: bytes, hashed_password: bytes
+) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    matches = _scheme_for(scheme, hashed_password).verify(password, hashed_password)
+    return matches, time.perf_counter() - started
+
+
+def _check_and_rehash(
+    scheme: PasswordScheme, password: bytes, hashed_password: bytes
+) -> Tuple[Tuple[bool, Optional[bytes]], float]:
+    started = time.perf_counter()
+    matches = _scheme_for(scheme, hashed_password).verify(password, hashed_password)
+    new_hash = None
+    if matches and scheme.needs_rehash(hashed_password):
+        new_hash = scheme.hash(password)
+    return (matches, new_hash), time.perf_counter() - started
+
+
+def _warm_up_worker() -> int:
+    # Held briefly so that each submission starts a worker of its own
+    # instead of reusing the one that just finished
+    time.sleep(0.01)
+    return os.getpid()
+
+
+def _encode(hashed_password: Union[bytes, str]) -> bytes:
+    if isinstance(hashed_password, bytes):
+        return hashed_password
+    return hashed_password.encode("utf-8")
+
+
+@dataclass
+class HashingStats:
+    """Counters and timings for the password hashing executor"""
+
+    completed: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    rehashed: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+    hash_seconds_total: float = 0.0
+    hash_seconds_max: float = 0.0
+
+    def record(self, queue_wait: float, hash_time: float) -> None:
+        self.completed += 1
+        self.queue_wait_seconds_total += queue_wait
+        self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+        self.hash_seconds_total += hash_time
+        self.hash_seconds_max = max(self.hash_seconds_max, hash_time)
+
+    def snapshot(self) -> Dict[str, Union[int, float]]:
+        return asdict(self)
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a bounded worker pool so that
+    CPU-heavy password work never blocks the event loop. New hashes follow
+    ``scheme``; existing hashes are verified with whichever scheme made them.
+
+    At most ``max_workers`` operations run at once; up to ``queue_size`` more
+    may wait for a free worker for at most ``queue_timeout`` seconds. Anything
+    beyond that is rejected with ``ServiceUnavailableException``.
+    """
+
+    def __init__(
+        self,
+        scheme: Optional[PasswordScheme] = None,
+        executor_type: str = "thread",
+        max_workers: Optional[int] = None,
+        queue_size: int = 64,
+        queue_timeout: Optional[float] = 5.0,
+    ):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing executor type: {executor_type}")
+
+        self.scheme = scheme or BcryptScheme()
+        self.executor_type = executor_type
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.stats = HashingStats()
+
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            # bcrypt releases the GIL while hashing, so threads scale across
+            # cores; the process pool is there for hashers that do not.
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hashing"
+                )
+        return self._executor
+
+    async def hash(self, password: str) -> bytes:
+        return await self._run(
+            "password_hash", _hash_password, self.scheme, password.encode("utf-8")
+        )
+
+    async def verify(self, plain_password: str, hashed_password: bytes) -> bool:
+        return await self._run(
+            "password_verify",
+            _check_password,
+            self.scheme,
+            plain_password.encode("utf-8"),
+            _encode(hashed_password),
+        )
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: bytes
+    ) -> Tuple[bool, Optional[bytes]]:
+        """
+        Verify a password and, if it matches a hash made under a different
+        policy, also return a replacement hash computed by the same worker.
+        """
+        matches, new_hash = await self._run(
+            "password_verify",
+            _check_and_rehash,
+            self.scheme,
+            plain_password.encode("utf-8"),
+            _encode(hashed_password),
+        )
+        if new_hash is not None:
+            self.stats.rehashed += 1
+        return matches, new_hash
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        return self.scheme.needs_rehash(_encode(hashed_password))
+
+    async def _acquire_slot(self) -> None:
+        """
+        Take a hashing slot, waiting at most ``queue_timeout``. The
+        acquisition runs as its own task: if the wait is interrupted by the
+        timeout or by cancellation just as a slot is granted, that slot is
+        handed back rather than leaked.
+        """
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout=self.queue_timeout)
+        except BaseException:
+            if not acquire.cancel() and not acquire.cancelled():
+                if acquire.exception() is None:
+                    self._slots.release()
+            raise
+
+    async def _run(self, phase: str, func: Callable, *args):
+        pending = self.stats.queued + self.stats.in_flight
+        if pending >= self.max_workers + self.queue_size:
+            self.stats.rejected += 1
+            logger.warning("Password hashing queue is full, rejecting request")
+            raise ServiceUnavailableException(
+                detail="Password hashing capacity exhausted, try again later"
+            )
+
+        enqueued_at = time.perf_counter()
+        self.stats.queued += 1
+        try:
+            await self._acquire_slot()
+        except asyncio.TimeoutError:
+            self.stats.timed_out += 1
+            logger.warning("Timed out waiting for a password hashing worker")
+            raise ServiceUnavailableException(
+                detail="Password hashing capacity exhausted, try again later"
+            )
+        finally:
+            self.stats.queued -= 1
+
+        queue_wait = time.perf_counter() - enqueued_at
+        self.stats.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.stats.in_flight -= 1
+            self._slots.release()
+
+        self.stats.record(queue_wait, hash_time)
+        observe_phase("password_queue", queue_wait)
+        observe_phase(phase, hash_time)
+        return result
+
+    async def warm_up(self) -> None:
+        """Start every worker now so the first logins do not pay for it"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _warm_up_worker)
+                for _ in range(self.max_workers)
+            )
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def build_password_scheme() -> PasswordScheme:
+    if settings.PASSWORD_HASH_SCHEME == "bcrypt":
+        scheme = BcryptScheme(rounds=settings.BCRYPT_ROUNDS)
+    elif settings.PASSWORD_HASH_SCHEME == "argon2":
+        scheme = Argon2Scheme(
+            time_cost=settings.ARGON2_TIME_COST,
+            memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+            parallelism=settings.ARGON2_PARALLELISM,
+        )
+    else:
+        raise ValueError(
+            f"Unknown password hash scheme: {settings.PASSWORD_HASH_SCHEME}"
+        )
+
+    if settings.PASSWORD_HASH_TARGET_SECONDS:
+        scheme = scheme.calibrated(settings.PASSWORD_HASH_TARGET_SECONDS)
+        logger.info(
+            f"Calibrated password hashing to {scheme!r} for a target of "
+            f"{settings.PASSWORD_HASH_TARGET_SECONDS}s"
+        )
+    return scheme
+
+
+def calibrate_for_workers() -> Optional[PasswordScheme]:
+    """
+    Calibrate the password policy once, before worker processes start, and
+    export the result so that every worker builds the same scheme instead
+    of timing its own. Workers settling on different costs would each
+    rehash the hashes the others just wrote.
+    """
+    if not settings.PASSWORD_HASH_TARGET_SECONDS:
+        return None
+
+    scheme = build_password_scheme()
+    os.environ.update(scheme.policy_env())
+    os.environ["PASSWORD_HASH_TARGET_SECONDS"] = "0"
+    return scheme
+
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    return PasswordHasher(
+        scheme=build_password_scheme(),
+        executor_type=settings.HASHING_EXECUTOR,
+        max_workers=settings.HASHING_WORKERS,
+        queue_size=settings.HASHING_QUEUE_SIZE,
+        queue_timeout=settings.HASHING_QUEUE_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,289 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from app.core.config import settings
+
+_MAGIC = b"AUTHSHM1"
+_HEADER = struct.Struct("<8sII")
+_HEADER_BYTES = 64
+
+# A slot is a sequence number followed by the entry: key digest, tag,
+# expiry (wall clock, so every process agrees), value length, value bytes
+_SEQ = struct.Struct("<I")
+_ENTRY = struct.Struct("<16s8sdH")
+_VALUE_OFFSET = _SEQ.size + _ENTRY.size
+_EMPTY_KEY = bytes(16)
+NO_TAG = bytes(8)
+
+
+def digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+
+def tag_for(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+
+@dataclass
+class SharedTableStats:
+    """Counters of this process's use of a shared table"""
+
+    writes: int = 0
+    evictions: int = 0
+    expired_reads: int = 0
+    oversized: int = 0
+    read_retries: int = 0
+    busy_slots: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class SharedMemoryTable:
+    """
+    Fixed-size hash table in a memory-mapped file that every worker process
+    on the host opens, so they all see each other's cache entries.
+
+    Keys are 16-byte digests. The table is split into buckets of ``ways``
+    slots of ``slot_bytes`` each; a key can only live in its own bucket, and
+    a full bucket evicts the entry closest to expiry. Values that do not fit
+    in a slot are not stored. The file never grows past
+    ``slots * slot_bytes``.
+
+    Reads take no lock: every slot carries a sequence number that writers
+    make odd while they change the slot, and readers retry or give up when
+    it is odd or moved under them. Writers lock the bucket's byte range with
+    ``fcntl``. The kernel drops those locks when a process dies, and a slot
+    left odd by a writer that died mid-write reads as empty until the next
+    write to it, so a crashed worker can neither block the others nor hand
+    them a torn entry.
+    """
+
+    read_attempts = 3
+
+    def __init__(self, path: str, slots: int, slot_bytes: int = 512, ways: int = 8):
+        if slot_bytes % 8 or slot_bytes <= _VALUE_OFFSET:
+            raise ValueError(
+                f"slot_bytes must be a multiple of 8 above {_VALUE_OFFSET}"
+            )
+        self.path = path
+        self.ways = ways
+        self.buckets = max(1, -(-slots // ways))
+        self.slots = self.buckets * ways
+        self.slot_bytes = slot_bytes
+        self.bucket_bytes = ways * slot_bytes
+        self.max_value_bytes = slot_bytes - _VALUE_OFFSET
+        self.size = _HEADER_BYTES + self.slots * slot_bytes
+        self.stats = SharedTableStats()
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._initialize()
+            self._mm = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _initialize(self) -> None:
+        with self._locked(0, _HEADER_BYTES):
+            if os.fstat(self._fd).st_size < self.size:
+                os.ftruncate(self._fd, self.size)
+            magic, slots, slot_bytes = _HEADER.unpack(
+                os.pread(self._fd, _HEADER.size, 0)
+            )
+            if magic == bytes(8):
+                os.pwrite(
+                    self._fd, _HEADER.pack(_MAGIC, self.slots, self.slot_bytes), 0
+                )
+            elif (magic, slots, slot_bytes) != (_MAGIC, self.slots, self.slot_bytes):
+                raise ValueError(
+                    f"{self.path} holds a table with another layout "
+                    f"({slots} slots of {slot_bytes} bytes)"
+                )
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _locked(self, start: int, length: int) -> Iterator[None]:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _bucket_offset(self, key: bytes) -> int:
+        bucket = int.from_bytes(key[:8], "little") % self.buckets
+        return _HEADER_BYTES + bucket * self.bucket_bytes
+
+    def _slot_offsets(self, bucket_offset: int) -> range:
+        return range(bucket_offset, bucket_offset + self.bucket_bytes, self.slot_bytes)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        now = time.time()
+        mm = self._mm
+        for offset in self._slot_offsets(self._bucket_offset(key)):
+            for _ in range(self.read_attempts):
+                (seq,) = _SEQ.unpack_from(mm, offset)
+                if seq & 1:
+                    self.stats.busy_slots += 1
+                    break
+                slot_key, _, expires_at, length = _ENTRY.unpack_from(
+                    mm, offset + _SEQ.size
+                )
+                if slot_key != key:
+                    break
+                start = offset + _VALUE_OFFSET
+                value = mm[start : start + min(length, self.max_value_bytes)]
+                if _SEQ.unpack_from(mm, offset)[0] != seq:
+                    self.stats.read_retries += 1
+                    continue
+                if expires_at <= now:
+                    self.stats.expired_reads += 1
+                    return None
+                return value
+        return None
+
+    def set(
+        self, key: bytes, value: bytes, expires_at: float, tag: bytes = NO_TAG
+    ) -> bool:
+        if len(value) > self.max_value_bytes:
+            self.stats.oversized += 1
+            return False
+
+        bucket_offset = self._bucket_offset(key)
+        with self._locked(bucket_offset, self.bucket_bytes):
+            offset = self._claim_slot(bucket_offset, key)
+            self._write(offset, key, tag, expires_at, value)
+        self.stats.writes += 1
+        return True
+
+    def _claim_slot(self, bucket_offset: int, key: bytes) -> int:
+        """The slot already holding ``key``, else a free one, else a victim"""
+        now = time.time()
+        victim, victim_expires = None, None
+        for offset in self._slot_offsets(bucket_offset):
+            (seq,) = _SEQ.unpack_from(self._mm, offset)
+            slot_key, _, expires_at, _ = _ENTRY.unpack_from(
+                self._mm, offset + _SEQ.size
+            )
+            if slot_key == key:
+                return offset
+            if seq & 1 or slot_key == _EMPTY_KEY or expires_at <= now:
+                expires_at = float("-inf")
+            if victim is None or expires_at < victim_expires:
+                victim, victim_expires = offset, expires_at
+
+        if victim_expires != float("-inf"):
+            self.stats.evictions += 1
+        return victim
+
+    def _write(
+        self, offset: int, key: bytes, tag: bytes, expires_at: float, value: bytes
+    ) -> None:
+        (seq,) = _SEQ.unpack_from(self._mm, offset)
+        if not seq & 1:
+            # An odd number here means the last writer died mid-write
+            seq = (seq + 1) & 0xFFFFFFFF
+        _SEQ.pack_into(self._mm, offset, seq)
+        _ENTRY.pack_into(self._mm, offset + _SEQ.size, key, tag, expires_at, len(value))
+        start = offset + _VALUE_OFFSET
+        self._mm[start : start + len(value)] = value
+        _SEQ.pack_into(self._mm, offset, (seq + 1) & 0xFFFFFFFF)
+
+    def delete(self, key: bytes) -> bool:
+        bucket_offset = self._bucket_offset(key)
+        with self._locked(bucket_offset, self.bucket_bytes):
+            for offset in self._slot_offsets(bucket_offset):
+                slot_key, _, _, _ = _ENTRY.unpack_from(self._mm, offset + _SEQ.size)
+                if slot_key == key:
+                    self._write(offset, _EMPTY_KEY, NO_TAG, 0.0, b"")
+                    return True
+        return False
+
+    def delete_tagged(self, tag: bytes) -> int:
+        """Remove every entry written with ``tag``, e.g. all tokens of a user"""
+        tags = struct.Struct(f"<{_SEQ.size + 16}x8s{self.slot_bytes - _SEQ.size - 24}x")
+        with memoryview(self._mm) as view:
+            offsets = [
+                _HEADER_BYTES + index * self.slot_bytes
+                for index, (slot_tag,) in enumerate(
+                    tags.iter_unpack(view[_HEADER_BYTES:])
+                )
+                if slot_tag == tag
+            ]
+
+        removed = 0
+        for offset in offsets:
+            bucket_offset = offset - (offset - _HEADER_BYTES) % self.bucket_bytes
+            with self._locked(bucket_offset, self.bucket_bytes):
+                _, slot_tag, _, _ = _ENTRY.unpack_from(self._mm, offset + _SEQ.size)
+                if slot_tag == tag:
+                    self._write(offset, _EMPTY_KEY, NO_TAG, 0.0, b"")
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._locked(_HEADER_BYTES, self.size - _HEADER_BYTES):
+            for offset in range(_HEADER_BYTES, self.size, self.slot_bytes):
+                self._write(offset, _EMPTY_KEY, NO_TAG, 0.0, b"")
+
+    def status(self) -> Dict:
+        """Occupancy of the whole table (all processes) and this process's counters"""
+        now = time.time()
+        fields = struct.Struct(
+            f"<I{_ENTRY.size - 10}xdH{self.slot_bytes - _VALUE_OFFSET}x"
+        )
+        entries = used_bytes = 0
+        with memoryview(self._mm) as view:
+            for seq, expires_at, length in fields.iter_unpack(view[_HEADER_BYTES:]):
+                if not seq & 1 and expires_at > now:
+                    entries += 1
+                    used_bytes += length
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "entries": entries,
+            "bytes": used_bytes,
+            **self.stats.snapshot(),
+        }
+
+
+def shared_cache_dir() -> str:
+    if settings.SHARED_CACHE_DIR:
+        return settings.SHARED_CACHE_DIR
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+_tables: Dict[str, SharedMemoryTable] = {}
+
+
+def get_shared_table(name: str, slots: int) -> SharedMemoryTable:
+    """
+    The host-wide table called ``name``. The layout is part of the file
+    name, so workers started with different sizes never share a file.
+    """
+    table = _tables.get(name)
+    if table is None:
+        slot_bytes = settings.SHARED_CACHE_SLOT_BYTES
+        path = os.path.join(
+            shared_cache_dir(), f"auth-{name}-{slots}x{slot_bytes}.cache"
+        )
+        table = _tables[name] = SharedMemoryTable(
+            path, slots=slots, slot_bytes=slot_bytes
+        )
+    return table
+
+
+def shared_tables_status() -> Dict[str, Dict]:
+    return {name: table.status() for name, table in _tables.items()}
@@ -0,0 +1,85 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import SINGLE_FLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The caller running a shared call was cancelled; waiters retry"""
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters for one group of coalesced calls"""
+
+    executed: int = 0
+    coalesced: int = 0
+    leader_cancelled: int = 0
+    in_flight: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key. The first caller runs the
+    call; callers arriving while it is in flight wait for it and receive the
+    same result or exception. Nothing is remembered once the call finishes.
+
+    A waiter being cancelled never affects the shared call. If the caller
+    running it is cancelled, the waiters start over and one of them runs it.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self.stats = SingleFlightStats()
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        while key in self._calls:
+            self.stats.coalesced += 1
+            SINGLE_FLIGHT_CALLS.labels(group=self.group, outcome="coalesced").inc()
+            try:
+                return await asyncio.shield(self._calls[key])
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.stats.executed += 1
+        self.stats.in_flight = len(self._calls)
+        SINGLE_FLIGHT_CALLS.labels(group=self.group, outcome="executed").inc()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self.stats.leader_cancelled += 1
+            self._settle(future, exception=_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._settle(future, exception=e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+            self.stats.in_flight = len(self._calls)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, exception: BaseException) -> None:
+        future.set_exception(exception)
+        # Mark it retrieved so a call nobody waited for is not logged
+        future.exception()
+
+
+@lru_cache()
+def get_single_flight(group: str) -> Optional[SingleFlight]:
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return None
+    return SingleFlight(group)
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
 from datetime import timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin
+from app.services.user_cache import UserSnapshot
 
 
 class IUserService(ABC):
@@ -12,7 +13,25 @@ class IUserService(ABC):
         pass
 
     @abstractmethod
-    async def get_user_by_email(self, db, email: str) -> Optional[User]:
+    async def get_user_by_email(self, db, email: str) -> Optional[UserSnapshot]:
+        pass
+
+    @abstractmethod
+    async def get_users_by_emails(
+        self, db, emails: Iterable[str]
+    ) -> Dict[str, UserSnapshot]:
+        pass
+
+    @abstractmethod
+    async def deactivate_user(self, db, email: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def change_password(self, db, email: str, new_password: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def set_superuser(self, db, email: str, is_superuser: bool) -> bool:
         pass
 
     @abstractmethod
@@ -21,6 +40,10 @@ class IUserService(ABC):
     ) -> bool:
         pass
 
+    @abstractmethod
+    async def check_password(self, db, user: UserSnapshot, plain_password: str) -> bool:
+        pass
+
 
 class ITokenService(ABC):
     @abstractmethod
@@ -42,13 +65,27 @@ class ITokenService(ABC):
 
 class IAuthService(ABC):
     @abstractmethod
-    async def authenticate_user(self, db, login_data: UserLogin) -> User:
+    async def authenticate_user(self, db, login_data: UserLogin) -> UserSnapshot:
         pass
 
     @abstractmethod
     async def validate_access_token(self, db, access_token: str) -> Dict:
         pass
 
+    @abstractmethod
+    async def validate_access_tokens(self, db, access_tokens: List[str]) -> List[Dict]:
+        pass
+
     @abstractmethod
     async def refresh_tokens(self, db, refresh_token: str) -> Dict[str, str]:
         pass
+
+    @abstractmethod
+    def issue_tokens(self, user: UserSnapshot) -> Dict[str, str]:
+        pass
+
+    @abstractmethod
+    async def revoke_tokens(
+        self, db, access_token: str, refresh_token: Optional[str] = None
+    ) -> int:
+        pass
@@ -1,14 +1,85 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.security import OAuth2PasswordBearer
 
+from app.api.dependencies.auth import init_services
 from app.api.v1.routes import v1_router
 from app.core.config import settings
+from app.core.database import all_engines, dispose_engines, warm_up_pool
+from app.core.keys import get_key_ring
 from app.core.logger import logger, setup_logging
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.security import get_password_hasher
+from app.rpc.server import build_rpc_server
+from app.services.outbox import get_outbox
+from app.services.refresh_tokens import get_refresh_token_families
+from app.services.revocation import get_revocation_list
+from app.services.token_versions import get_token_versions
+from app.services.user_import import shutdown_import_executor
 
 setup_logging()
+
+
+async def warm_up(app: FastAPI) -> None:
+    started = time.perf_counter()
+    opened = await asyncio.gather(
+        *(
+            warm_up_pool(engine, settings.DB_WARMUP_CONNECTIONS)
+            for engine in all_engines()
+        )
+    )
+    await get_password_hasher().warm_up()
+    app.state.token_service.warm_up()
+    logger.info(
+        f"Warmed up in {time.perf_counter() - started:.3f}s: "
+        f"{sum(opened)} database connections, "
+        f"{get_password_hasher().max_workers} hashing workers"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Whatever started is stopped again even if a later startup step fails
+    hasher = None
+    background = []
+    try:
+        init_services(app.state)
+        # Builds the hasher, and calibrates it if configured, before serving
+        # rather than on the first login
+        hasher = get_password_hasher()
+        if settings.WARMUP_ENABLED:
+            await warm_up(app)
+
+        for service in (
+            get_revocation_list(),
+            get_refresh_token_families(),
+            get_token_versions(),
+            get_outbox(),
+            build_rpc_server(app.state.auth_service),
+        ):
+            if service is not None:
+                await service.start()
+                background.append(service)
+        yield
+    finally:
+        for service in reversed(background):
+            await service.stop()
+
+        if hasher is not None:
+            hasher.shutdown()
+        shutdown_import_executor()
+        await dispose_engines()
+
+
 # Create FastAPI application
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title=settings.APP_NAME,
     description="E-commerce API with FastAPI",
     version="0.1.0",
@@ -28,6 +99,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include API routers
 app.include_router(v1_router, prefix="/api/v1")
 
@@ -37,6 +111,23 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    key_ring = get_key_ring()
+    return JSONResponse(
+        content=key_ring.jwks() if key_ring else {"keys": []},
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"},
+    )
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,2 +1,5 @@
 from .base import Base, TimeStampedBase
+from .outbox_event import OutboxEvent
+from .refresh_token_family import RefreshTokenFamily
+from .revoked_token import RevokedToken
 from .user import User
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+from app.models.base import Base
+
+
+class RefreshTokenFamily(Base):
+    __tablename__ = "refresh_token_families"
+
+    family_id = Column(String(32), primary_key=True)
+    subject = Column(String, nullable=False)
+    generation = Column(Integer, nullable=False, default=0)
+    revoked = Column(Boolean, nullable=False, default=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -1,6 +1,6 @@
 from ctypes.wintypes import BYTE
 
-from sqlalchemy import BLOB, Boolean, Column, LargeBinary, String
+from sqlalchemy import BLOB, Boolean, Column, Index, Integer, LargeBinary, String
 
 from app.models.base import TimeStampedBase
 
@@ -13,3 +13,7 @@ class User(TimeStampedBase):
     hashed_password = Column(LargeBinary, nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # Bumped whenever tokens issued to the user must stop working
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (Index("ix_users_updated_at", "updated_at"),)
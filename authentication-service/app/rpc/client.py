@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional
+
+from app.core.exceptions import ProtocolException, RPCCallException
+from app.rpc.protocol import (
+    OP_PING,
+    OP_REFRESH,
+    OP_VALIDATE,
+    OP_VALIDATE_BATCH,
+    encode_frame,
+    read_frame,
+)
+
+
+class AuthRPCClient:
+    """
+    Client for the internal protocol. Keeps one persistent connection and
+    pipelines concurrent calls over it, matching responses by request id.
+    """
+
+    def __init__(self, host: str, port: int, max_frame_bytes: int = 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.max_frame_bytes = max_frame_bytes
+
+        self._ids = itertools.count(1)
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._reader_task = asyncio.create_task(self._read_responses(reader))
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+    async def __aenter__(self) -> "AuthRPCClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _read_responses(self, reader: asyncio.StreamReader) -> None:
+        error: Exception = ConnectionError("Connection closed")
+        try:
+            while True:
+                message = await read_frame(reader, self.max_frame_bytes)
+                if message is None:
+                    break
+                request_id, status, body = message
+                future = self._waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == 200:
+                    future.set_result(body)
+                else:
+                    future.set_exception(RPCCallException(body, status))
+        except (ProtocolException, ConnectionError, ValueError) as e:
+            error = e
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._waiting.clear()
+
+    async def call(self, op: str, argument: Any = None) -> Any:
+        if self._writer is None:
+            await self.connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(encode_frame([request_id, op, argument]))
+        try:
+            await self._writer.drain()
+            return await future
+        finally:
+            self._waiting.pop(request_id, None)
+
+    async def validate(self, access_token: str) -> Dict:
+        return await self.call(OP_VALIDATE, access_token)
+
+    async def validate_batch(self, access_tokens: List[str]) -> List[Dict]:
+        return await self.call(OP_VALIDATE_BATCH, access_tokens)
+
+    async def refresh(self, refresh_token: str) -> Dict:
+        return await self.call(OP_REFRESH, refresh_token)
+
+    async def ping(self) -> str:
+        return await self.call(OP_PING)
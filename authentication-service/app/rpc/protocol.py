@@ -0,0 +1,62 @@
+"""
+Framing of the internal validation protocol.
+
+Every message is a 4-byte big-endian length followed by that many bytes of
+msgpack. Requests are ``[id, op, argument]`` and responses
+``[id, status, body]``. The client picks ``id`` and the server echoes it,
+so one connection carries many requests at once and responses may come
+back in any order. ``status`` follows HTTP (200, 400, 401, 503, 500);
+``body`` is the result on 200 and the error detail otherwise.
+
+Operations:
+
+-   ``validate``: access token -> ``{"valid": true, ...user details}``
+-   ``validate_batch``: list of access tokens -> list of results, as
+    returned by ``/validate-tokens``
+-   ``refresh``: refresh token -> new token pair
+-   ``ping``: anything -> ``"pong"``
+"""
+
+import asyncio
+import struct
+from typing import Any, Optional
+
+import msgpack
+
+from app.core.exceptions import ProtocolException
+
+OP_VALIDATE = "validate"
+OP_VALIDATE_BATCH = "validate_batch"
+OP_REFRESH = "refresh"
+OP_PING = "ping"
+
+_LENGTH = struct.Struct(">I")
+
+
+def encode_frame(message: Any) -> bytes:
+    body = msgpack.packb(message)
+    return _LENGTH.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader, max_bytes: int) -> Optional[Any]:
+    """The next message, or None once the peer has closed the connection"""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ProtocolException("Connection closed in the middle of a frame")
+
+    (length,) = _LENGTH.unpack(header)
+    if length > max_bytes:
+        raise ProtocolException(f"Frame of {length} bytes exceeds {max_bytes}")
+
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ProtocolException("Connection closed in the middle of a frame")
+
+    try:
+        return msgpack.unpackb(body)
+    except (ValueError, msgpack.UnpackException):
+        raise ProtocolException("Frame is not valid msgpack")
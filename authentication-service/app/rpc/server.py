@@ -0,0 +1,210 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import (
+    AuthenticationException,
+    ProtocolException,
+    ServiceUnavailableException,
+)
+from app.core.logger import logger
+from app.core.metrics import RPC_REQUEST_COUNT, RPC_REQUEST_LATENCY
+from app.rpc.protocol import (
+    OP_PING,
+    OP_REFRESH,
+    OP_VALIDATE,
+    OP_VALIDATE_BATCH,
+    encode_frame,
+    read_frame,
+)
+from app.services.auth_service import AuthService
+
+rpc_log = logger.bind(category="rpc")
+
+
+def _required_string(argument: Any, name: str) -> str:
+    if not isinstance(argument, str) or not argument:
+        raise ProtocolException(f"{name} is required")
+    return argument
+
+
+class AuthRPCServer:
+    """
+    Serves token validation and refresh to other services over persistent
+    TCP connections (see ``app.rpc.protocol``), without HTTP routing,
+    header parsing or JSON. Each connection handles up to ``max_in_flight``
+    requests concurrently. Every worker process binds the port with
+    ``SO_REUSEPORT``, so the kernel spreads connections across workers.
+
+    The protocol has no authentication: bind it to loopback or an internal
+    interface that other hosts cannot reach.
+    """
+
+    def __init__(
+        self,
+        auth_service: AuthService,
+        session_factory: Callable,
+        host: str = "127.0.0.1",
+        port: int = 9000,
+        max_frame_bytes: int = 1024 * 1024,
+        max_in_flight: int = 64,
+        shutdown_timeout: float = 5.0,
+    ):
+        self.auth_service = auth_service
+        self.session_factory = session_factory
+        self.host = host
+        self.port = port
+        self.max_frame_bytes = max_frame_bytes
+        self.max_in_flight = max_in_flight
+        self.shutdown_timeout = shutdown_timeout
+
+        self._handlers: Dict[str, Callable[[Any], Awaitable[Any]]] = {
+            OP_VALIDATE: self._validate,
+            OP_VALIDATE_BATCH: self._validate_batch,
+            OP_REFRESH: self._refresh,
+            OP_PING: self._ping,
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._serve_connection, self.host, self.port, reuse_port=True
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        rpc_log.info(f"Internal protocol listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """
+        Stop accepting connections and reading requests. Requests already
+        received get up to ``shutdown_timeout`` seconds to be answered;
+        any still running after that are cancelled unanswered.
+        """
+        if self._server is None:
+            return
+        self._server.close()
+        connections = list(self._connections)
+        # The first cancel only interrupts reading: each connection then
+        # waits for its pending requests before closing
+        for connection in connections:
+            connection.cancel()
+        if connections:
+            _, unfinished = await asyncio.wait(
+                connections, timeout=self.shutdown_timeout
+            )
+            for connection in unfinished:
+                rpc_log.warning("Dropping internal protocol requests at shutdown")
+                connection.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        pending: Set[asyncio.Task] = set()
+        try:
+            while True:
+                message = await read_frame(reader, self.max_frame_bytes)
+                if message is None:
+                    break
+                await slots.acquire()
+                request = asyncio.create_task(self._respond(message, writer))
+                pending.add(request)
+                request.add_done_callback(pending.discard)
+                request.add_done_callback(lambda _: slots.release())
+        except ProtocolException as e:
+            rpc_log.warning(f"Closing connection: {str(e.detail)}")
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled by stop(): read no further requests
+            pass
+        finally:
+            try:
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+            except asyncio.CancelledError:
+                # Cancelled again: stop() gave up on the pending requests
+                pass
+            finally:
+                writer.close()
+                self._connections.discard(connection)
+
+    async def _respond(self, message: Any, writer: asyncio.StreamWriter) -> None:
+        started = time.perf_counter()
+        request_id, op, status, body = None, "invalid", 400, None
+
+        if isinstance(message, list) and len(message) == 3:
+            request_id, op, argument = message
+            handler = self._handlers.get(op) if isinstance(op, str) else None
+            if handler is None:
+                op, body = "unknown", f"Unknown operation: {op}"
+            else:
+                try:
+                    body = await handler(argument)
+                    status = 200
+                except ProtocolException as e:
+                    body = str(e.detail)
+                except AuthenticationException as e:
+                    status, body = 401, str(e.detail)
+                except ServiceUnavailableException as e:
+                    status, body = 503, str(e.detail)
+                except Exception:
+                    rpc_log.exception(f"Internal protocol {op} request failed")
+                    status, body = 500, "Internal error"
+        else:
+            body = "Expected [id, op, argument]"
+
+        writer.write(encode_frame([request_id, status, body]))
+        RPC_REQUEST_COUNT.labels(op=op, status=str(status)).inc()
+        RPC_REQUEST_LATENCY.labels(op=op).observe(time.perf_counter() - started)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _validate(self, argument: Any) -> Dict:
+        access_token = _required_string(argument, "Access token")
+        async with self.session_factory() as db:
+            user_details = await self.auth_service.validate_access_token(
+                db, access_token
+            )
+        return {"valid": True, **user_details}
+
+    async def _validate_batch(self, argument: Any) -> List[Dict]:
+        if not isinstance(argument, list) or not all(
+            isinstance(token, str) for token in argument
+        ):
+            raise ProtocolException("Expected a list of access tokens")
+        if len(argument) > settings.VALIDATE_TOKENS_MAX_BATCH:
+            raise ProtocolException(
+                f"At most {settings.VALIDATE_TOKENS_MAX_BATCH} tokens per batch"
+            )
+        async with self.session_factory() as db:
+            return await self.auth_service.validate_access_tokens(db, argument)
+
+    async def _refresh(self, argument: Any) -> Dict:
+        refresh_token = _required_string(argument, "Refresh token")
+        async with self.session_factory() as db:
+            return await self.auth_service.refresh_tokens(db, refresh_token)
+
+    async def _ping(self, argument: Any) -> str:
+        return "pong"
+
+
+def build_rpc_server(auth_service: AuthService) -> Optional[AuthRPCServer]:
+    if not settings.RPC_ENABLED:
+        return None
+    return AuthRPCServer(
+        auth_service,
+        AsyncSessionLocal,
+        host=settings.RPC_HOST,
+        port=settings.RPC_PORT,
+        max_frame_bytes=settings.RPC_MAX_FRAME_BYTES,
+        max_in_flight=settings.RPC_MAX_IN_FLIGHT,
+        shutdown_timeout=settings.RPC_SHUTDOWN_TIMEOUT_SECONDS,
+    )
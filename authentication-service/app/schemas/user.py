@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 from pydantic.types import StringConstraints
 from typing_extensions import Annotated
 
@@ -9,14 +9,32 @@ from typing_extensions import Annotated
 class UserBase(BaseModel):
     email: EmailStr
     full_name: Optional[str] = None
-    is_active: bool = True
-    is_superuser: bool = False
 
 
 class UserCreate(UserBase):
+    """Public registration: accounts always start active and unprivileged"""
+
     password: Annotated[str, StringConstraints(min_length=8)]
 
 
+class UserImportRecord(UserBase):
+    """One account from a bulk import: a plaintext or a bcrypt password"""
+
+    is_active: bool = True
+    is_superuser: bool = False
+
+    password: Optional[Annotated[str, StringConstraints(min_length=8)]] = None
+    hashed_password: Optional[
+        Annotated[str, StringConstraints(pattern=r"^\$2[aby]\$\d{2}\$.{53}$")]
+    ] = None
+
+    @model_validator(mode="after")
+    def check_one_password(self) -> "UserImportRecord":
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Exactly one of password or hashed_password is required")
+        return self
+
+
 class UserResponse(UserBase):
     id: int
     created_at: datetime
@@ -30,6 +48,18 @@ class UserLogin(UserBase):
     password: str
 
 
+class PasswordChange(BaseModel):
+    password: Annotated[str, StringConstraints(min_length=8)]
+
+
+class RoleChange(BaseModel):
+    is_superuser: bool
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+
+class TokenBatchValidationRequest(BaseModel):
+    access_tokens: List[str] = Field(min_length=1)
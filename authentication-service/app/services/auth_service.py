@@ -1,20 +1,64 @@
-from datetime import timedelta
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from app.core.config import settings
 from app.core.exceptions import AuthenticationException
 from app.core.logger import logger
+from app.core.singleflight import SingleFlight, get_single_flight
 from app.interfaces.auth import IAuthService, ITokenService, IUserService
-from app.models.user import User
 from app.schemas.user import UserLogin
+from app.services.outbox import EVENT_USER_LOGGED_IN, Outbox, get_outbox
+from app.services.refresh_tokens import (
+    RefreshTokenFamilies,
+    get_refresh_token_families,
+)
+from app.services.revocation import RevocationList, get_revocation_list
+from app.services.token_cache import TokenValidationCache, get_token_cache
+from app.services.token_versions import TokenVersions, get_token_versions
+from app.services.user_cache import UserSnapshot
+
+login_log = logger.bind(category="auth.login")
+refresh_log = logger.bind(category="token.refresh")
 
 
 class AuthService(IAuthService):
-    def __init__(self, user_service: IUserService, token_service: ITokenService):
+    def __init__(
+        self,
+        user_service: IUserService,
+        token_service: ITokenService,
+        token_cache: Optional[TokenValidationCache] = None,
+        revocation_list: Optional[RevocationList] = None,
+        refresh_families: Optional[RefreshTokenFamilies] = None,
+        validation_flight: Optional[SingleFlight] = None,
+        token_versions: Optional[TokenVersions] = None,
+        embed_claims: Optional[bool] = None,
+        outbox: Optional[Outbox] = None,
+    ):
         self.user_service = user_service
         self.token_service = token_service
+        self.token_cache = token_cache if token_cache is not None else get_token_cache()
+        self.revocation_list = (
+            revocation_list if revocation_list is not None else get_revocation_list()
+        )
+        self.refresh_families = (
+            refresh_families
+            if refresh_families is not None
+            else get_refresh_token_families()
+        )
+        self.validation_flight = (
+            validation_flight
+            if validation_flight is not None
+            else get_single_flight("token_validation")
+        )
+        self.token_versions = (
+            token_versions if token_versions is not None else get_token_versions()
+        )
+        self.embed_claims = (
+            settings.TOKEN_EMBED_CLAIMS if embed_claims is None else embed_claims
+        )
+        self.outbox = outbox if outbox is not None else get_outbox()
 
-    async def authenticate_user(self, db, login_data: UserLogin) -> User:
+    async def authenticate_user(self, db, login_data: UserLogin) -> UserSnapshot:
         user = await self.user_service.get_user_by_email(db, login_data.email)
 
         if not user:
@@ -23,9 +67,7 @@ class AuthService(IAuthService):
             )
             raise AuthenticationException(detail="Incorrect email or password")
 
-        if not await self.user_service.verify_password(
-            login_data.password, user.hashed_password
-        ):
+        if not await self.user_service.check_password(db, user, login_data.password):
             logger.warning(
                 f"Authentication failed - invalid password: {login_data.email}"
             )
@@ -35,13 +77,105 @@ class AuthService(IAuthService):
             logger.warning(f"Authentication failed - inactive user: {login_data.email}")
             raise AuthenticationException(detail="User account is not active")
 
-        logger.info(f"User authenticated successfully: {login_data.email}")
+        if self.outbox is not None:
+            self.outbox.enqueue(EVENT_USER_LOGGED_IN, user.email, {"user_id": user.id})
+        login_log.info(f"User authenticated successfully: {login_data.email}")
         return user
 
     async def validate_access_token(self, db, access_token: str) -> Dict:
+        cached = self._cached_details(access_token)
+        if cached is not None:
+            return cached
+
+        if self.validation_flight is None:
+            return await self._validate_uncached(db, access_token)
+        return await self.validation_flight.do(
+            access_token, lambda: self._validate_uncached(db, access_token)
+        )
+
+    async def _validate_uncached(self, db, access_token: str) -> Dict:
         payload = self.token_service.verify_token(access_token, token_type="access")
+        await self._check_not_revoked(db, payload)
+        self._check_token_version(payload)
+
+        user_details = self._details_from_claims(access_token, payload)
+        if user_details is not None:
+            return user_details
+
         user = await self.user_service.get_user_by_email(db, payload.get("sub"))
+        return self._build_user_details(access_token, payload, user)
+
+    async def validate_access_tokens(self, db, access_tokens: List[str]) -> List[Dict]:
+        results: List[Optional[Dict]] = [None] * len(access_tokens)
+        payloads: Dict[int, Dict] = {}
+
+        for index, access_token in enumerate(access_tokens):
+            cached = self._cached_details(access_token)
+            if cached is not None:
+                results[index] = {"valid": True, **cached}
+                continue
+            try:
+                payload = self.token_service.verify_token(
+                    access_token, token_type="access"
+                )
+                await self._check_not_revoked(db, payload)
+                self._check_token_version(payload)
+            except AuthenticationException as e:
+                results[index] = {"valid": False, "detail": e.detail}
+                continue
+
+            user_details = self._details_from_claims(access_token, payload)
+            if user_details is not None:
+                results[index] = {"valid": True, **user_details}
+            else:
+                payloads[index] = payload
+
+        if not payloads:
+            return results
+        users = await self.user_service.get_users_by_emails(
+            db, {payload.get("sub") for payload in payloads.values()}
+        )
+
+        for index, payload in payloads.items():
+            try:
+                user_details = self._build_user_details(
+                    access_tokens[index], payload, users.get(payload.get("sub"))
+                )
+                results[index] = {"valid": True, **user_details}
+            except AuthenticationException as e:
+                results[index] = {"valid": False, "detail": e.detail}
+
+        return results
+
+    def _cached_details(self, access_token: str) -> Optional[Dict]:
+        """
+        Details of an already-validated token, unless the revocation filter
+        has since picked up its jti, e.g. from a logout on another worker.
+        Such a token is dropped from the cache and validated in full.
+        """
+        if self.token_cache is None:
+            return None
+        cached = self.token_cache.lookup(access_token)
+        if cached is None:
+            return None
+
+        if self.revocation_list is not None and self.revocation_list.may_be_revoked(
+            cached.jti
+        ):
+            self.token_cache.invalidate_token(access_token)
+            return None
+        return cached.details
+
+    async def _check_not_revoked(self, db, payload: Dict) -> None:
+        if self.revocation_list is not None and await self.revocation_list.is_revoked(
+            db, payload.get("jti")
+        ):
+            logger.warning(f"Revoked token presented for user: {payload.get('sub')}")
+            raise AuthenticationException(detail="Token has been revoked")
 
+    def _build_user_details(
+        self, access_token: str, payload: Dict, user: Optional[UserSnapshot]
+    ) -> Dict:
         if not user:
             logger.warning(
                 f"Token validation failed - user not found: {payload.get('sub')}"
@@ -54,7 +188,8 @@ class AuthService(IAuthService):
             )
             raise AuthenticationException(detail="User account is not active")
 
-        return {
+        self._check_token_version(payload, user)
+        user_details = {
             "user_id": user.id,
             "email": user.email,
             "full_name": user.full_name,
@@ -62,8 +197,54 @@ class AuthService(IAuthService):
             "token_expires": payload.get("exp"),
         }
 
+        if self.token_cache is not None:
+            self.token_cache.set(access_token, user_details, payload.get("jti"))
+        return user_details
+
+    def _check_token_version(
+        self, payload: Dict, user: Optional[UserSnapshot] = None
+    ) -> None:
+        """Reject tokens issued before the user's last deactivation, password
+        or role change"""
+        current = user.token_version if user is not None else 0
+        if self.token_versions is not None:
+            current = max(current, self.token_versions.current(payload.get("sub")))
+
+        if payload.get("ver", 0) < current:
+            if self.token_versions is not None:
+                self.token_versions.stats.rejected += 1
+            logger.warning(f"Outdated token presented for user: {payload.get('sub')}")
+            raise AuthenticationException(detail="Token has been invalidated")
+
+    def _details_from_claims(self, access_token: str, payload: Dict) -> Optional[Dict]:
+        """
+        User details embedded in the token itself, or None when they have to
+        be loaded: claims are not embedded, or the token versions are not
+        recent enough to vouch for them.
+        """
+        if (
+            not self.embed_claims
+            or "uid" not in payload
+            or self.token_versions is None
+            or not self.token_versions.is_fresh()
+        ):
+            return None
+
+        user_details = {
+            "user_id": payload["uid"],
+            "email": payload.get("sub"),
+            "full_name": payload.get("name"),
+            "is_superuser": bool(payload.get("su")),
+            "token_expires": payload.get("exp"),
+        }
+        self.token_versions.stats.validated_from_claims += 1
+        if self.token_cache is not None:
+            self.token_cache.set(access_token, user_details, payload.get("jti"))
+        return user_details
+
     async def refresh_tokens(self, db, refresh_token: str) -> Dict[str, str]:
         payload = self.token_service.verify_token(refresh_token, token_type="refresh")
+        await self._check_not_revoked(db, payload)
         user = await self.user_service.get_user_by_email(db, payload.get("sub"))
 
         if not user:
@@ -78,18 +259,79 @@ class AuthService(IAuthService):
             )
             raise AuthenticationException(detail="User account is not active")
 
+        self._check_token_version(payload, user)
+        refresh_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        family = {}
+        if self.refresh_families is not None:
+            family = await self.refresh_families.rotate(
+                db, payload, datetime.now() + refresh_expires
+            )
+
+        refresh_log.info(f"Tokens refreshed successfully for user: {user.email}")
+        return self._token_pair(user, family, refresh_expires)
+
+    def issue_tokens(self, user: UserSnapshot) -> Dict[str, str]:
+        """Issue the first token pair of a session, starting a new family"""
+        refresh_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        family = {}
+        if self.refresh_families is not None:
+            family = self.refresh_families.start_family(
+                user.email, datetime.now() + refresh_expires
+            )
+        return self._token_pair(user, family, refresh_expires)
+
+    def _token_pair(
+        self, user: UserSnapshot, family: Dict, refresh_expires: timedelta
+    ) -> Dict[str, str]:
+        claims = {"sub": user.email, "ver": user.token_version}
+        access_claims = dict(claims)
+        if self.embed_claims:
+            access_claims.update(uid=user.id, name=user.full_name, su=user.is_superuser)
+
         access_token = self.token_service.create_access_token(
-            data={"sub": user.email},
+            data=access_claims,
             expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
-
-        new_refresh_token = self.token_service.create_refresh_token(
-            data={"sub": user.email}, expires_delta=timedelta(days=7)
+        refresh_token = self.token_service.create_refresh_token(
+            data={**claims, **family}, expires_delta=refresh_expires
         )
-
-        logger.info(f"Tokens refreshed successfully for user: {user.email}")
         return {
             "access_token": access_token,
-            "refresh_token": new_refresh_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
         }
+
+    async def revoke_tokens(
+        self, db, access_token: str, refresh_token: Optional[str] = None
+    ) -> int:
+        payloads = [self.token_service.verify_token(access_token, token_type="access")]
+        if refresh_token:
+            refresh_payload = self.token_service.verify_token(
+                refresh_token, token_type="refresh"
+            )
+            if refresh_payload.get("sub") != payloads[0].get("sub"):
+                logger.warning(
+                    f"Logout refused - token subjects differ: {payloads[0].get('sub')}"
+                )
+                raise AuthenticationException(
+                    detail="Refresh token does not belong to this user"
+                )
+            payloads.append(refresh_payload)
+
+        revoked = 0
+        if self.revocation_list is not None:
+            for payload in payloads:
+                revoked += await self.revocation_list.revoke(db, payload)
+
+        if (
+            refresh_token
+            and payloads[-1].get("fid")
+            and self.refresh_families is not None
+        ):
+            await self.refresh_families.revoke(db, payloads[-1])
+
+        if self.token_cache is not None:
+            self.token_cache.invalidate_token(access_token)
+
+        logger.info(f"Revoked {revoked} tokens for user: {payloads[0].get('sub')}")
+        return revoked
@@ -0,0 +1,347 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import orjson
+import pika
+from sqlalchemy import delete, insert, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.models.outbox_event import OutboxEvent
+
+EVENT_USER_REGISTERED = "user.registered"
+EVENT_USER_LOGGED_IN = "user.logged_in"
+EVENT_USER_DEACTIVATED = "user.deactivated"
+EVENT_USER_PASSWORD_CHANGED = "user.password_changed"
+EVENT_USER_ROLE_CHANGED = "user.role_changed"
+
+outbox_log = logger.bind(category="outbox")
+
+
+def _message(event: OutboxEvent) -> Dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "subject": event.subject,
+        "occurred_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+class EventPublisher(ABC):
+    @abstractmethod
+    async def publish(self, messages: List[Dict]) -> None:
+        """Deliver a batch, raising unless the broker accepted all of it"""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryEventBroker(EventPublisher):
+    """Keeps published messages in a list; ``fail_next`` rejects batches."""
+
+    def __init__(self):
+        self.messages: List[Dict] = []
+        self.fail_next = 0
+
+    async def publish(self, messages: List[Dict]) -> None:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise ConnectionError("In-memory broker is unavailable")
+        self.messages.extend(messages)
+
+
+class AMQPEventPublisher(EventPublisher):
+    """
+    Publishes to a durable topic exchange with the event type as routing
+    key. Each batch is sent in one AMQP transaction, so by the time
+    ``publish`` returns the broker holds every message of the batch.
+    pika's blocking client runs on a dedicated thread and reconnects on the
+    next batch after any error.
+    """
+
+    def __init__(self, url: str, exchange: str):
+        self.url = url
+        self.exchange = exchange
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="amqp")
+        self._connection: Optional[pika.BlockingConnection] = None
+        self._channel = None
+
+    async def publish(self, messages: List[Dict]) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._publish, messages)
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._disconnect)
+        self._executor.shutdown()
+
+    def _open_channel(self):
+        if self._connection is not None:
+            try:
+                # Answers heartbeats missed while idle, or finds the
+                # connection dead before a batch is sent on it
+                self._connection.process_data_events(time_limit=0)
+            except Exception:
+                self._disconnect()
+
+        if self._channel is None or self._channel.is_closed:
+            self._disconnect()
+            self._connection = pika.BlockingConnection(pika.URLParameters(self.url))
+            self._channel = self._connection.channel()
+            self._channel.exchange_declare(
+                self.exchange, exchange_type="topic", durable=True
+            )
+            self._channel.tx_select()
+        return self._channel
+
+    def _publish(self, messages: List[Dict]) -> None:
+        channel = self._open_channel()
+        try:
+            for message in messages:
+                channel.basic_publish(
+                    self.exchange,
+                    message["type"],
+                    orjson.dumps(message),
+                    pika.BasicProperties(
+                        content_type="application/json",
+                        delivery_mode=pika.DeliveryMode.Persistent,
+                        message_id=str(message["id"]),
+                        type=message["type"],
+                    ),
+                )
+            channel.tx_commit()
+        except Exception:
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        connection, self._connection, self._channel = self._connection, None, None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+@dataclass
+class OutboxStats:
+    """Counters for the event outbox and its dispatcher"""
+
+    recorded: int = 0
+    buffered: int = 0
+    dropped: int = 0
+    published: int = 0
+    batches: int = 0
+    publish_errors: int = 0
+    flush_errors: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class Outbox:
+    """
+    User lifecycle events for other services, delivered at least once.
+
+    ``add`` writes an event in the caller's transaction, so it exists if
+    and only if the change it describes was committed. ``enqueue`` is for
+    events with no transaction to join (logins): they are buffered in
+    memory and written in one batch by the dispatcher, and the buffer is
+    lost if the process dies first.
+
+    The dispatcher wakes every ``max_latency_seconds``, or as soon as
+    ``batch_size`` events are waiting, and publishes the oldest due events
+    in batches of up to ``batch_size``. Published events are deleted; a
+    failed batch is retried with exponential backoff from
+    ``retry_base_seconds`` up to ``retry_max_seconds``. A crash between
+    publishing and deleting republishes the batch, so consumers should
+    deduplicate on the message id. Rows are claimed with ``SKIP LOCKED``
+    where the database supports it, so workers do not publish the same
+    batch concurrently.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        publisher: EventPublisher,
+        batch_size: int = 100,
+        max_latency_seconds: float = 1.0,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 300.0,
+        max_buffered: int = 10_000,
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.max_latency_seconds = max_latency_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_buffered = max_buffered
+        self.stats = OutboxStats()
+        self._buffer: List[Dict] = []
+        self._since_dispatch = 0
+        self._dispatch_wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _row(self, event_type: str, subject: str, payload: Dict) -> Dict:
+        now = datetime.now()
+        return {
+            "event_type": event_type,
+            "subject": subject,
+            "payload": payload,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+
+    def _recorded(self) -> None:
+        self.stats.recorded += 1
+        self._since_dispatch += 1
+        if self._since_dispatch >= self.batch_size:
+            self._dispatch_wanted.set()
+
+    async def add(self, db, event_type: str, subject: str, payload: Dict) -> None:
+        """Record an event in ``db``'s transaction; the caller commits"""
+        await db.execute(
+            insert(OutboxEvent).values(self._row(event_type, subject, payload))
+        )
+        self._recorded()
+
+    def enqueue(self, event_type: str, subject: str, payload: Dict) -> None:
+        if len(self._buffer) >= self.max_buffered:
+            self.stats.dropped += 1
+            return
+        self._buffer.append(self._row(event_type, subject, payload))
+        self.stats.buffered = len(self._buffer)
+        self._recorded()
+
+    async def flush_buffer(self) -> int:
+        if not self._buffer:
+            return 0
+
+        rows, self._buffer = self._buffer, []
+        self.stats.buffered = 0
+        try:
+            async with self.session_factory() as db:
+                await db.execute(insert(OutboxEvent), rows)
+                await db.commit()
+        except Exception:
+            self._buffer = (rows + self._buffer)[: self.max_buffered]
+            self.stats.buffered = len(self._buffer)
+            self.stats.flush_errors += 1
+            raise
+        return len(rows)
+
+    def _retry_at(self, attempts: int, now: datetime) -> datetime:
+        delay = self.retry_base_seconds * 2 ** (attempts - 1)
+        return now + timedelta(seconds=min(delay, self.retry_max_seconds))
+
+    async def dispatch(self) -> int:
+        """Publish one batch of due events, returning how many were sent"""
+        now = datetime.now()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.next_attempt_at <= now)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                return 0
+
+            try:
+                await self.publisher.publish([_message(event) for event in events])
+            except Exception as e:
+                self.stats.publish_errors += 1
+                outbox_log.warning(f"Publishing {len(events)} events failed: {str(e)}")
+                for event in events:
+                    event.attempts += 1
+                    event.next_attempt_at = self._retry_at(event.attempts, now)
+                await db.commit()
+                return 0
+
+            await db.execute(
+                delete(OutboxEvent).where(
+                    OutboxEvent.id.in_([event.id for event in events])
+                )
+            )
+            await db.commit()
+
+        self.stats.published += len(events)
+        self.stats.batches += 1
+        return len(events)
+
+    async def drain(self) -> int:
+        """Persist the buffer and publish every due event"""
+        self._since_dispatch = 0
+        await self.flush_buffer()
+        published = 0
+        while True:
+            sent = await self.dispatch()
+            published += sent
+            if sent < self.batch_size:
+                return published
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._dispatch_wanted.wait(), timeout=self.max_latency_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._dispatch_wanted.clear()
+
+            try:
+                await self.drain()
+            except Exception as e:
+                outbox_log.error(f"Outbox dispatch failed: {str(e)}")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush_buffer()
+        except Exception as e:
+            outbox_log.error(f"Final outbox flush failed: {str(e)}")
+        await self.publisher.close()
+
+
+@lru_cache()
+def get_outbox() -> Optional[Outbox]:
+    if not settings.OUTBOX_ENABLED:
+        return None
+
+    if settings.OUTBOX_BROKER == "memory":
+        publisher = InMemoryEventBroker()
+    elif settings.OUTBOX_BROKER == "amqp":
+        publisher = AMQPEventPublisher(settings.AMQP_URL, settings.AMQP_EXCHANGE)
+    else:
+        raise ValueError(f"Unknown outbox broker: {settings.OUTBOX_BROKER}")
+
+    return Outbox(
+        AsyncSessionLocal,
+        publisher,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        max_latency_seconds=settings.OUTBOX_MAX_LATENCY_SECONDS,
+        retry_base_seconds=settings.OUTBOX_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.OUTBOX_RETRY_MAX_SECONDS,
+        max_buffered=settings.OUTBOX_MAX_BUFFERED,
+    )
@@ -0,0 +1,215 @@
+import ipaddress
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings, worker_count
+from app.core.exceptions import RateLimitException
+from app.core.logger import logger
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+@lru_cache()
+def trusted_proxies() -> List[Network]:
+    return [
+        ipaddress.ip_network(entry.strip(), strict=False)
+        for entry in settings.TRUSTED_PROXIES.split(",")
+        if entry.strip()
+    ]
+
+
+def _is_trusted(address: str, networks: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(
+    peer: Optional[str],
+    forwarded_for: Optional[str],
+    networks: Optional[List[Network]] = None,
+) -> Optional[str]:
+    """
+    The address a request came from. ``X-Forwarded-For`` is only believed
+    when the peer is a trusted proxy, and then only up to the first hop
+    (from the right) that is not itself trusted, so clients cannot pick
+    their own address by sending the header.
+    """
+    networks = trusted_proxies() if networks is None else networks
+    if peer is None or not forwarded_for or not _is_trusted(peer, networks):
+        return peer
+
+    for hop in reversed([hop.strip() for hop in forwarded_for.split(",")]):
+        if hop and not _is_trusted(hop, networks):
+            return hop
+    return peer
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        """
+        Record one attempt for ``key``. Returns 0 when it is allowed,
+        otherwise the number of seconds until the next attempt will be.
+        """
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-process token buckets: each key holds up to ``limit`` attempts and
+    regains them at ``limit / window_seconds`` per second. The least
+    recently used keys are dropped beyond ``max_keys``; a dropped key simply
+    starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        now = time.monotonic()
+        rate = limit / window_seconds
+        tokens, updated_at = self._buckets.get(key, (float(limit), now))
+        tokens = min(float(limit), tokens + (now - updated_at) * rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Fixed-window counters shared by every replica through any server
+    speaking the Redis protocol. If the server cannot be reached, attempts
+    are allowed and the error is logged, so an outage never locks every
+    user out.
+    """
+
+    def __init__(self, client, key_prefix: str = "auth:ratelimit:"):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url))
+
+    async def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        redis_key = f"{self.key_prefix}{key}"
+        try:
+            await self.client.set(
+                redis_key, 0, px=max(1, int(window_seconds * 1000)), nx=True
+            )
+            attempts = await self.client.incr(redis_key)
+            if attempts <= limit:
+                return 0.0
+            return max(await self.client.pttl(redis_key), 1) / 1000
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed, allowing attempt: {str(e)}")
+            return 0.0
+
+
+@dataclass
+class RateLimitStats:
+    """Counters for login throttling"""
+
+    allowed: int = 0
+    rejected_email: int = 0
+    rejected_ip: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class LoginRateLimiter:
+    """
+    Throttles login attempts per email address and per client IP; a
+    ``per_ip`` of 0 turns the per-IP limit off.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        per_email: int = 10,
+        per_ip: int = 0,
+        window_seconds: float = 60.0,
+    ):
+        self.backend = backend
+        self.per_email = per_email
+        self.per_ip = per_ip
+        self.window_seconds = window_seconds
+        self.stats = RateLimitStats()
+
+    async def check(self, email: str, client_ip: Optional[str]) -> None:
+        if client_ip and self.per_ip > 0:
+            retry_after = await self.backend.hit(
+                f"ip:{client_ip}", self.per_ip, self.window_seconds
+            )
+            if retry_after:
+                self.stats.rejected_ip += 1
+                raise RateLimitException(
+                    detail="Too many login attempts from this address",
+                    retry_after=math.ceil(retry_after),
+                )
+
+        retry_after = await self.backend.hit(
+            f"email:{email.lower()}", self.per_email, self.window_seconds
+        )
+        if retry_after:
+            self.stats.rejected_email += 1
+            raise RateLimitException(
+                detail="Too many login attempts for this account",
+                retry_after=math.ceil(retry_after),
+            )
+
+        self.stats.allowed += 1
+
+
+@lru_cache()
+def get_login_rate_limiter() -> Optional[LoginRateLimiter]:
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return None
+
+    if settings.LOGIN_RATE_LIMIT_BACKEND == "redis":
+        if not settings.LOGIN_RATE_LIMIT_REDIS_URL:
+            raise ValueError(
+                "LOGIN_RATE_LIMIT_REDIS_URL is required for the redis backend"
+            )
+        backend = RedisRateLimitBackend.from_url(settings.LOGIN_RATE_LIMIT_REDIS_URL)
+    elif settings.LOGIN_RATE_LIMIT_BACKEND == "memory":
+        backend = InMemoryRateLimitBackend(max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS)
+        workers = worker_count()
+        if workers > 1:
+            logger.warning(
+                f"Login rate limits are kept per worker: with {workers} workers "
+                "a client gets up to that many times each limit. Set "
+                "LOGIN_RATE_LIMIT_BACKEND=redis to share them."
+            )
+    else:
+        raise ValueError(
+            f"Unknown rate limit backend: {settings.LOGIN_RATE_LIMIT_BACKEND}"
+        )
+
+    return LoginRateLimiter(
+        backend,
+        per_email=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+        per_ip=settings.LOGIN_RATE_LIMIT_PER_IP,
+        window_seconds=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    )
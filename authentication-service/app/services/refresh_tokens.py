@@ -0,0 +1,337 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import case, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, conflict_free_inserts
+from app.core.exceptions import AuthenticationException
+from app.core.logger import logger
+from app.models.refresh_token_family import RefreshTokenFamily
+
+families_table = RefreshTokenFamily.__table__
+
+
+@dataclass
+class FamilyState:
+    subject: str
+    generation: int
+    expires_at: datetime
+    revoked: bool = False
+
+    def row(self, family_id: str) -> Dict:
+        return {"family_id": family_id, "created_at": datetime.now(), **asdict(self)}
+
+
+@dataclass
+class RefreshFamilyStats:
+    """Counters for refresh-token rotation and its write-behind queue"""
+
+    issued: int = 0
+    rotated: int = 0
+    reuse_detected: int = 0
+    rejected_revoked: int = 0
+    db_loads: int = 0
+    flushes: int = 0
+    flushed_rows: int = 0
+    flush_errors: int = 0
+    reaped: int = 0
+    pending: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def _build_upsert(dialect_name: str):
+    dialect_insert = conflict_free_inserts.get(dialect_name)
+    if dialect_insert is None:
+        return None
+
+    statement = dialect_insert(families_table)
+    excluded = statement.excluded
+    advanced = excluded.generation > families_table.c.generation
+    # Rows from other processes may arrive in any order, so a flush never
+    # moves a family backwards and never un-revokes it.
+    return statement.on_conflict_do_update(
+        index_elements=["family_id"],
+        set_={
+            "generation": case(
+                (advanced, excluded.generation), else_=families_table.c.generation
+            ),
+            "expires_at": case(
+                (advanced, excluded.expires_at), else_=families_table.c.expires_at
+            ),
+            "revoked": or_(families_table.c.revoked, excluded.revoked),
+        },
+    )
+
+
+class RefreshTokenFamilies:
+    """
+    Server-side state for refresh-token families.
+
+    Login starts a family; each refresh token carries its family id (``fid``)
+    and generation (``gen``). A refresh must present the current generation
+    and advances it, so every refresh token is single-use. Presenting an
+    older generation means a token was replayed, and the whole family is
+    revoked.
+
+    The database row is the only authority. A refresh advances it with one
+    conditional ``UPDATE`` that matches the presented generation of an
+    unrevoked family, so concurrent refreshes in any number of processes
+    accept at most one token per generation. New families are written
+    behind in batched upserts every ``flush_seconds``; a refresh of a
+    family whose row is not written yet inserts it instead. Revocations are
+    written through. Revoked family ids are remembered, up to
+    ``max_entries``, so replays of a revoked family fail without a query.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        max_entries: int = 100_000,
+        flush_seconds: float = 0.5,
+        flush_batch_size: int = 500,
+        reap_seconds: float = 3600.0,
+    ):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.flush_seconds = flush_seconds
+        self.flush_batch_size = flush_batch_size
+        self.reap_seconds = reap_seconds
+        self.stats = RefreshFamilyStats()
+        self._revoked: "OrderedDict[str, None]" = OrderedDict()
+        self._dirty: Dict[str, FamilyState] = {}
+        self._flush_wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _remember_revoked(self, family_id: str) -> None:
+        self._revoked[family_id] = None
+        self._revoked.move_to_end(family_id)
+        while len(self._revoked) > self.max_entries:
+            self._revoked.popitem(last=False)
+
+    def _mark_dirty(self, family_id: str, state: FamilyState) -> None:
+        self._dirty[family_id] = state
+        self.stats.pending = len(self._dirty)
+        if len(self._dirty) >= self.flush_batch_size:
+            self._flush_wanted.set()
+
+    def start_family(self, subject: str, expires_at: datetime) -> Dict:
+        family_id = uuid.uuid4().hex
+        state = FamilyState(subject=subject, generation=0, expires_at=expires_at)
+        self._mark_dirty(family_id, state)
+        self.stats.issued += 1
+        return {"fid": family_id, "gen": 0}
+
+    async def _advance(
+        self, db, family_id: str, generation: int, expires_at: datetime
+    ) -> bool:
+        result = await db.execute(
+            update(RefreshTokenFamily)
+            .where(
+                RefreshTokenFamily.family_id == family_id,
+                RefreshTokenFamily.generation == generation,
+                RefreshTokenFamily.revoked.is_(False),
+            )
+            .values(generation=generation + 1, expires_at=expires_at)
+        )
+        return result.rowcount == 1
+
+    async def _insert_new(self, db, family_id: str, state: FamilyState) -> bool:
+        """Write a family that has no row yet; False if another process won"""
+        row = state.row(family_id)
+        dialect_insert = conflict_free_inserts.get(db.get_bind().dialect.name)
+        if dialect_insert is None:
+            try:
+                await db.execute(insert(RefreshTokenFamily).values(**row))
+            except IntegrityError:
+                await db.rollback()
+                return False
+            return True
+
+        result = await db.execute(
+            dialect_insert(RefreshTokenFamily)
+            .values(**row)
+            .on_conflict_do_nothing(index_elements=["family_id"])
+        )
+        return result.rowcount == 1
+
+    async def rotate(self, db, payload: Dict, expires_at: datetime) -> Dict:
+        """Consume the presented refresh token and return the next claims"""
+        family_id, generation = payload.get("fid"), payload.get("gen")
+        if family_id is None or generation is None:
+            raise AuthenticationException(detail="Invalid refresh token")
+
+        if family_id in self._revoked:
+            self.stats.rejected_revoked += 1
+            raise AuthenticationException(detail="Refresh token has been revoked")
+
+        # Twice at most: losing the race to insert a new family's row leaves
+        # a row to advance on the second pass
+        for _ in range(2):
+            if await self._advance(db, family_id, generation, expires_at):
+                return await self._rotated(db, family_id, generation)
+
+            self.stats.db_loads += 1
+            family = await db.get(RefreshTokenFamily, family_id, populate_existing=True)
+            if family is None:
+                # Started by a process that has not flushed it yet
+                if generation != 0:
+                    break
+                state = FamilyState(
+                    subject=payload.get("sub"),
+                    generation=1,
+                    expires_at=expires_at,
+                )
+                if await self._insert_new(db, family_id, state):
+                    return await self._rotated(db, family_id, generation)
+                continue
+
+            if family.revoked:
+                self._remember_revoked(family_id)
+                self.stats.rejected_revoked += 1
+                raise AuthenticationException(detail="Refresh token has been revoked")
+
+            if generation < family.generation:
+                self.stats.reuse_detected += 1
+                logger.warning(
+                    f"Refresh token reuse detected, revoking family for: {family.subject}"
+                )
+                await self.revoke(db, payload)
+                raise AuthenticationException(
+                    detail="Refresh token has already been used"
+                )
+            # A generation the database has never issued
+            break
+
+        raise AuthenticationException(detail="Invalid refresh token")
+
+    async def _rotated(self, db, family_id: str, generation: int) -> Dict:
+        await db.commit()
+        self._dirty.pop(family_id, None)
+        self.stats.pending = len(self._dirty)
+        self.stats.rotated += 1
+        return {"fid": family_id, "gen": generation + 1}
+
+    async def revoke(self, db, payload: Dict) -> None:
+        """Revoke the family of a refresh token, writing its row if missing"""
+        family_id = payload["fid"]
+        self._remember_revoked(family_id)
+        state = self._dirty.pop(family_id, None) or FamilyState(
+            subject=payload.get("sub"),
+            generation=payload.get("gen", 0),
+            expires_at=datetime.fromtimestamp(payload["exp"]),
+        )
+        self.stats.pending = len(self._dirty)
+        state.revoked = True
+
+        upsert = _build_upsert(db.get_bind().dialect.name)
+        if upsert is None:
+            result = await db.execute(
+                update(RefreshTokenFamily)
+                .where(RefreshTokenFamily.family_id == family_id)
+                .values(revoked=True)
+            )
+            if result.rowcount == 0:
+                await db.merge(RefreshTokenFamily(**state.row(family_id)))
+        else:
+            await db.execute(upsert, [state.row(family_id)])
+        await db.commit()
+
+    async def flush(self) -> int:
+        if not self._dirty:
+            return 0
+
+        pending, self._dirty = self._dirty, {}
+        self.stats.pending = 0
+        rows = [state.row(family_id) for family_id, state in pending.items()]
+        try:
+            async with self.session_factory() as db:
+                upsert = _build_upsert(db.get_bind().dialect.name)
+                if upsert is None:
+                    for row in rows:
+                        await db.merge(RefreshTokenFamily(**row))
+                else:
+                    await db.execute(upsert, rows)
+                await db.commit()
+        except Exception:
+            # Keep anything that was not superseded while flushing
+            for family_id, state in pending.items():
+                self._dirty.setdefault(family_id, state)
+            self.stats.pending = len(self._dirty)
+            self.stats.flush_errors += 1
+            raise
+
+        self.stats.flushes += 1
+        self.stats.flushed_rows += len(rows)
+        return len(rows)
+
+    async def reap(self) -> int:
+        """Delete every family whose newest token has expired"""
+        now = datetime.now()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(RefreshTokenFamily).where(RefreshTokenFamily.expires_at <= now)
+            )
+            await db.commit()
+
+        self.stats.reaped += result.rowcount
+        return result.rowcount
+
+    async def run(self) -> None:
+        last_reaped = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_wanted.wait(), timeout=self.flush_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+
+            try:
+                await self.flush()
+                if time.monotonic() - last_reaped >= self.reap_seconds:
+                    reaped = await self.reap()
+                    last_reaped = time.monotonic()
+                    logger.info(f"Reaped {reaped} expired refresh token families")
+            except Exception as e:
+                logger.error(f"Refresh token family write-behind failed: {str(e)}")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final refresh token family flush failed: {str(e)}")
+
+
+@lru_cache()
+def get_refresh_token_families() -> Optional[RefreshTokenFamilies]:
+    if not settings.REFRESH_TOKEN_ROTATION:
+        return None
+
+    return RefreshTokenFamilies(
+        AsyncSessionLocal,
+        max_entries=settings.REFRESH_FAMILY_CACHE_SIZE,
+        flush_seconds=settings.REFRESH_FLUSH_SECONDS,
+        flush_batch_size=settings.REFRESH_FLUSH_BATCH_SIZE,
+        reap_seconds=settings.REFRESH_REAP_SECONDS,
+    )
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import math
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy import bindparam, delete, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.models.revoked_token import RevokedToken
+
+select_revoked_jti = select(RevokedToken.jti).where(
+    RevokedToken.jti == bindparam("jti")
+)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Membership answers "definitely
+    not present" or "possibly present"; it never gives a false negative.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+@dataclass
+class RevocationStats:
+    """Counters for revocation checks and filter maintenance"""
+
+    checks: int = 0
+    filter_misses: int = 0
+    db_lookups: int = 0
+    false_positives: int = 0
+    revoked: int = 0
+    syncs: int = 0
+    sync_errors: int = 0
+    pruned: int = 0
+    filter_entries: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class RevocationList:
+    """
+    Revoked token IDs, persisted in ``revoked_tokens`` and mirrored in a
+    per-process Bloom filter.
+
+    A token whose ``jti`` misses the filter is cleared without touching the
+    database; only filter hits are confirmed with a primary-key lookup. The
+    filter is rebuilt from unexpired rows every ``sync_seconds``, so a
+    revocation made by another process takes effect here within that
+    interval. Revocations made by this process apply immediately.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        sync_seconds: float = 30.0,
+        prune_seconds: float = 3600.0,
+    ):
+        self.session_factory = session_factory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.prune_seconds = prune_seconds
+        self.filter = BloomFilter(capacity, error_rate)
+        self.stats = RevocationStats()
+        self._task: Optional[asyncio.Task] = None
+        # Local revocations not yet seen by a sync, re-added to each rebuilt
+        # filter so a sync racing with a revoke cannot drop it
+        self._unsynced: Set[str] = set()
+
+    def may_be_revoked(self, jti: Optional[str]) -> bool:
+        """Filter-only check: False means definitely not revoked"""
+        return bool(jti) and jti in self.filter
+
+    async def is_revoked(self, db, jti: Optional[str]) -> bool:
+        # Tokens issued before jti claims existed cannot be revoked
+        if not jti:
+            return False
+
+        self.stats.checks += 1
+        if jti not in self.filter:
+            self.stats.filter_misses += 1
+            return False
+
+        self.stats.db_lookups += 1
+        result = await db.execute(select_revoked_jti, {"jti": jti})
+        if result.scalar_one_or_none() is None:
+            self.stats.false_positives += 1
+            return False
+
+        self.stats.revoked += 1
+        return True
+
+    async def revoke(self, db, payload: Dict) -> bool:
+        jti = payload.get("jti")
+        if not jti:
+            return False
+
+        await db.merge(
+            RevokedToken(
+                jti=jti,
+                subject=payload.get("sub"),
+                expires_at=datetime.fromtimestamp(payload["exp"]),
+            )
+        )
+        await db.commit()
+        self._unsynced.add(jti)
+        self.filter.add(jti)
+        self.stats.filter_entries = self.filter.count
+        return True
+
+    async def sync(self) -> None:
+        """Rebuild the filter from every revocation that has not expired"""
+        unsynced = set(self._unsynced)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.now())
+            )
+            jtis = result.scalars().all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        for jti in self._unsynced - unsynced:
+            bloom.add(jti)
+        self._unsynced -= unsynced
+
+        self.filter = bloom
+        self.stats.syncs += 1
+        self.stats.filter_entries = bloom.count
+        if len(jtis) > self.capacity:
+            logger.warning(
+                f"{len(jtis)} revoked tokens exceed the filter capacity of "
+                f"{self.capacity}; raise REVOCATION_FILTER_CAPACITY"
+            )
+
+    async def prune(self) -> int:
+        """Delete revocations of tokens that have expired anyway"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now())
+            )
+            await db.commit()
+
+        self.stats.pruned += result.rowcount
+        return result.rowcount
+
+    async def run(self) -> None:
+        last_pruned = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                if time.monotonic() - last_pruned >= self.prune_seconds:
+                    pruned = await self.prune()
+                    last_pruned = time.monotonic()
+                    logger.info(f"Pruned {pruned} expired token revocations")
+                await self.sync()
+            except Exception as e:
+                self.stats.sync_errors += 1
+                logger.error(f"Token revocation sync failed: {str(e)}")
+
+    async def start(self) -> None:
+        try:
+            await self.sync()
+        except Exception as e:
+            self.stats.sync_errors += 1
+            logger.error(f"Initial token revocation sync failed: {str(e)}")
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+@lru_cache()
+def get_revocation_list() -> Optional[RevocationList]:
+    if not settings.REVOCATION_ENABLED:
+        return None
+
+    return RevocationList(
+        AsyncSessionLocal,
+        capacity=settings.REVOCATION_FILTER_CAPACITY,
+        error_rate=settings.REVOCATION_FILTER_ERROR_RATE,
+        sync_seconds=settings.REVOCATION_SYNC_SECONDS,
+        prune_seconds=settings.REVOCATION_PRUNE_SECONDS,
+    )
@@ -0,0 +1,235 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Set
+
+import orjson
+
+from app.core.config import settings
+from app.core.shared_memory import SharedMemoryTable, get_shared_table, tag_for
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _estimate_size(key: bytes, details: Dict) -> int:
+    size = sys.getsizeof(key) + sys.getsizeof(details)
+    for name, value in details.items():
+        size += sys.getsizeof(name) + sys.getsizeof(value)
+    return size
+
+
+class CachedToken(NamedTuple):
+    details: Dict
+    jti: Optional[str]
+
+
+class _Entry(NamedTuple):
+    details: Dict
+    email: Optional[str]
+    jti: Optional[str]
+    expires_at: float
+    size: int
+
+
+@dataclass
+class TokenCacheStats:
+    """Counters for the verified-token cache"""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class TokenValidationCache:
+    """
+    Bounded LRU cache of already-validated access tokens.
+
+    Entries are keyed by a SHA-256 digest of the token and hold the response
+    built by ``AuthService.validate_access_token``, along with the token's
+    ``jti`` so that a hit can still be checked against revocations made
+    after it was cached. An entry never outlives
+    ``ttl_seconds`` nor the token's own ``exp`` claim, and the cache evicts
+    least recently used entries once ``max_entries`` or ``max_bytes`` is hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 60.0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = TokenCacheStats()
+
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._keys_by_email: Dict[str, Set[bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Dict]:
+        cached = self.lookup(token)
+        return cached.details if cached is not None else None
+
+    def lookup(self, token: str) -> Optional[CachedToken]:
+        key = token_digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return CachedToken(entry.details, entry.jti)
+
+    def set(self, token: str, details: Dict, jti: Optional[str] = None) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        token_expires = details.get("token_expires")
+        if token_expires is not None:
+            expires_at = min(expires_at, float(token_expires))
+        if expires_at <= now:
+            return
+
+        key = token_digest(token)
+        if key in self._entries:
+            self._remove(key)
+
+        email = details.get("email")
+        entry = _Entry(details, email, jti, expires_at, _estimate_size(key, details))
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        if email is not None:
+            self._keys_by_email.setdefault(email, set()).add(key)
+        self.stats.entries += 1
+        self.stats.bytes += entry.size
+
+        while (
+            len(self._entries) > self.max_entries or self.stats.bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def invalidate_token(self, token: str) -> None:
+        key = token_digest(token)
+        if key in self._entries:
+            self._remove(key)
+            self.stats.invalidations += 1
+
+    def invalidate_user(self, email: str) -> None:
+        """Drop every cached token of a user, e.g. after deactivation."""
+        for key in list(self._keys_by_email.get(email, ())):
+            self._remove(key)
+            self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_email.clear()
+        self.stats.entries = 0
+        self.stats.bytes = 0
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key)
+        self.stats.entries -= 1
+        self.stats.bytes -= entry.size
+
+        if entry.email is not None:
+            keys = self._keys_by_email.get(entry.email)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_email[entry.email]
+
+
+class SharedTokenValidationCache(TokenValidationCache):
+    """
+    Validated-token cache kept in a ``SharedMemoryTable`` so that every
+    worker process on the host shares it, and an invalidation in one worker
+    applies to all of them. Entries are stored as the orjson-encoded
+    details and ``jti``, tagged with the user's email; the table's slot
+    count and slot size bound its memory, so ``max_entries``/``max_bytes``
+    do not apply. The hit, miss and invalidation counters are this process's own.
+    """
+
+    def __init__(self, table: SharedMemoryTable, ttl_seconds: float = 60.0):
+        super().__init__(ttl_seconds=ttl_seconds)
+        self.table = table
+
+    def __len__(self) -> int:
+        return self.table.status()["entries"]
+
+    def lookup(self, token: str) -> Optional[CachedToken]:
+        raw = self.table.get(token_digest(token)[:16])
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        details, jti = orjson.loads(raw)
+        return CachedToken(details, jti)
+
+    def set(self, token: str, details: Dict, jti: Optional[str] = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        token_expires = details.get("token_expires")
+        if token_expires is not None:
+            expires_at = min(expires_at, float(token_expires))
+        if expires_at <= time.time():
+            return
+
+        email = details.get("email")
+        self.table.set(
+            token_digest(token)[:16],
+            orjson.dumps([details, jti]),
+            expires_at,
+            tag=tag_for(email) if email is not None else bytes(8),
+        )
+
+    def invalidate_token(self, token: str) -> None:
+        if self.table.delete(token_digest(token)[:16]):
+            self.stats.invalidations += 1
+
+    def invalidate_user(self, email: str) -> None:
+        self.stats.invalidations += self.table.delete_tagged(tag_for(email))
+
+    def clear(self) -> None:
+        self.table.clear()
+
+
+@lru_cache()
+def get_token_cache() -> Optional[TokenValidationCache]:
+    if not settings.TOKEN_CACHE_ENABLED:
+        return None
+    if settings.TOKEN_CACHE_BACKEND == "shared":
+        return SharedTokenValidationCache(
+            get_shared_table("tokens", settings.TOKEN_CACHE_MAX_ENTRIES),
+            ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+        )
+    if settings.TOKEN_CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown token cache backend: {settings.TOKEN_CACHE_BACKEND}")
+    return TokenValidationCache(
+        max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+        max_bytes=settings.TOKEN_CACHE_MAX_BYTES,
+        ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+    )
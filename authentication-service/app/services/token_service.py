@@ -1,42 +1,55 @@
-from datetime import datetime, timedelta
+import time
+import uuid
+from datetime import timedelta
 from typing import Dict, Optional
 
-from jose import JWTError, jwt
-
-from app.core.config import settings
 from app.core.exceptions import AuthenticationException
+from app.core.jwt_engines import (
+    InvalidTokenError,
+    JWTEngine,
+    TokenExpiredError,
+    get_jwt_engine,
+)
 from app.core.logger import logger
+from app.core.metrics import time_phase
 from app.interfaces.auth import ITokenService
 
 
 class TokenService(ITokenService):
+    def __init__(self, engine: Optional[JWTEngine] = None):
+        self.engine = engine or get_jwt_engine()
+
     def create_access_token(
         self, data: dict, expires_delta: Optional[timedelta] = None
     ) -> str:
-        to_encode = data.copy()
-        expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-        to_encode.update({"exp": expire, "type": "access"})
-
-        return jwt.encode(
-            to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM
+        expire = int(
+            time.time() + (expires_delta or timedelta(minutes=15)).total_seconds()
         )
+        with time_phase("token_encode"):
+            return self.engine.encode(
+                {**data, "exp": expire, "jti": uuid.uuid4().hex, "type": "access"}
+            )
 
     def create_refresh_token(
         self, data: dict, expires_delta: Optional[timedelta] = None
     ) -> str:
-        to_encode = data.copy()
-        expire = datetime.utcnow() + (expires_delta or timedelta(days=7))
-        to_encode.update({"exp": expire, "type": "refresh"})
+        expire = int(time.time() + (expires_delta or timedelta(days=7)).total_seconds())
+        with time_phase("token_encode"):
+            return self.engine.encode(
+                {**data, "exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"}
+            )
 
-        return jwt.encode(
-            to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM
+    def warm_up(self) -> None:
+        """Run one encode/decode round trip so keys and code paths are ready"""
+        self.verify_token(
+            self.create_access_token({"sub": "warm-up"}, timedelta(minutes=1)),
+            token_type="access",
         )
 
     def verify_token(self, token: str, token_type: str = None) -> Dict:
         try:
-            payload = jwt.decode(
-                token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM]
-            )
+            with time_phase("token_decode"):
+                payload = self.engine.decode(token)
 
             if token_type and payload.get("type") != token_type:
                 logger.warning(f"Invalid token type: expected {token_type}")
@@ -44,9 +57,9 @@ class TokenService(ITokenService):
 
             return payload
 
-        except jwt.ExpiredSignatureError:
+        except TokenExpiredError:
             logger.warning("Token expired")
             raise AuthenticationException(detail="Token has expired")
-        except JWTError:
+        except InvalidTokenError:
             logger.warning("Invalid token")
             raise AuthenticationException(detail="Invalid token")
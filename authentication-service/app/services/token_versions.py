@@ -0,0 +1,152 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.logger import logger
+from app.models.user import User
+from app.services.token_cache import TokenValidationCache, get_token_cache
+from app.services.user_cache import UserCache, get_user_cache
+
+
+@dataclass
+class TokenVersionStats:
+    """Counters for token version tracking"""
+
+    tracked: int = 0
+    validated_from_claims: int = 0
+    rejected: int = 0
+    syncs: int = 0
+    sync_errors: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class TokenVersions:
+    """
+    Current ``token_version`` of every user whose version was bumped
+    (deactivation, password or role change) within the last
+    ``window_seconds``. Access tokens issued before an older bump have
+    expired anyway, so a user missing from the map has no invalidated
+    tokens, and the map holds only the few users changed recently.
+
+    The map is reloaded from the users table every ``sync_seconds``, so a
+    bump made by another process takes effect here within that interval;
+    bumps made by this process apply immediately. Validated tokens and the
+    user snapshot cached for a user whose version moved are dropped on sync.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        window_seconds: float,
+        sync_seconds: float = 5.0,
+        token_cache: Optional[TokenValidationCache] = None,
+        user_cache: Optional[UserCache] = None,
+    ):
+        self.session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.sync_seconds = sync_seconds
+        self.token_cache = token_cache
+        self.user_cache = user_cache
+        self.stats = TokenVersionStats()
+        self._versions: Dict[str, int] = {}
+        # Local bumps with the time they were made, kept until they are
+        # older than the window so a sync racing with a bump cannot drop it
+        self._local: Dict[str, Tuple[int, float]] = {}
+        self._synced_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self, email: str) -> int:
+        return self._versions.get(email, 0)
+
+    def is_fresh(self) -> bool:
+        """Whether the map is recent enough to trust without a database read"""
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= 3 * self.sync_seconds
+        )
+
+    def record(self, email: str, version: int) -> None:
+        self._local[email] = (version, time.monotonic())
+        self._versions[email] = max(self._versions.get(email, 0), version)
+        self.stats.tracked = len(self._versions)
+
+    async def sync(self) -> None:
+        since = datetime.now() - timedelta(seconds=self.window_seconds)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(User.email, User.token_version).where(
+                    User.updated_at > since, User.token_version > 0
+                )
+            )
+            versions = dict(result.all())
+
+        now = time.monotonic()
+        for email, (version, recorded_at) in list(self._local.items()):
+            if now - recorded_at > self.window_seconds:
+                del self._local[email]
+            else:
+                versions[email] = max(versions.get(email, 0), version)
+
+        for email, version in versions.items():
+            if version > self._versions.get(email, 0):
+                if self.token_cache is not None:
+                    self.token_cache.invalidate_user(email)
+                if self.user_cache is not None:
+                    await self.user_cache.invalidate(email)
+
+        self._versions = versions
+        self._synced_at = now
+        self.stats.syncs += 1
+        self.stats.tracked = len(versions)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.sync()
+            except Exception as e:
+                self.stats.sync_errors += 1
+                logger.error(f"Token version sync failed: {str(e)}")
+
+    async def start(self) -> None:
+        try:
+            await self.sync()
+        except Exception as e:
+            self.stats.sync_errors += 1
+            logger.error(f"Initial token version sync failed: {str(e)}")
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+@lru_cache()
+def get_token_versions() -> Optional[TokenVersions]:
+    # Needed with or without embedded claims: user snapshots and validated
+    # tokens cached by other processes only learn of a bump through sync
+    if not settings.TOKEN_VERSION_TRACKING:
+        return None
+
+    sync_seconds = settings.TOKEN_VERSION_SYNC_SECONDS
+    return TokenVersions(
+        AsyncSessionLocal,
+        window_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + sync_seconds,
+        sync_seconds=sync_seconds,
+        token_cache=get_token_cache(),
+        user_cache=get_user_cache(),
+    )
@@ -0,0 +1,318 @@
+import json
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings, worker_count
+from app.core.logger import logger
+from app.core.shared_memory import SharedMemoryTable, digest, get_shared_table
+from app.models.user import User
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Immutable, session-independent view of a user row"""
+
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    is_superuser: bool
+    hashed_password: bytes
+    token_version: int = 0
+
+    @classmethod
+    def from_orm(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            hashed_password=bytes(user.hashed_password),
+            token_version=int(user.token_version or 0),
+        )
+
+    def to_bytes(self) -> bytes:
+        data = asdict(self)
+        data["hashed_password"] = self.hashed_password.decode("latin-1")
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "UserSnapshot":
+        data = json.loads(raw)
+        data["hashed_password"] = data["hashed_password"].encode("latin-1")
+        return cls(**data)
+
+
+class UserCacheBackend(ABC):
+    @abstractmethod
+    async def get(self, email: str) -> Optional[UserSnapshot]:
+        pass
+
+    @abstractmethod
+    async def set(self, snapshot: UserSnapshot, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, email: str) -> None:
+        pass
+
+
+class InMemoryUserCacheBackend(UserCacheBackend):
+    """Per-process LRU backend; snapshots are stored as-is, without encoding."""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[UserSnapshot, float]]" = OrderedDict()
+
+    async def get(self, email: str) -> Optional[UserSnapshot]:
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+
+        snapshot, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[email]
+            return None
+
+        self._entries.move_to_end(email)
+        return snapshot
+
+    async def set(self, snapshot: UserSnapshot, ttl: float) -> None:
+        self._entries[snapshot.email] = (snapshot, time.monotonic() + ttl)
+        self._entries.move_to_end(snapshot.email)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, email: str) -> None:
+        self._entries.pop(email, None)
+
+
+class RedisUserCacheBackend(UserCacheBackend):
+    """
+    Backend shared by every replica through any server speaking the Redis
+    protocol. Errors talking to the server are logged and treated as misses
+    so that the database remains the source of truth.
+    """
+
+    def __init__(self, client, key_prefix: str = "auth:user:"):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisUserCacheBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url))
+
+    def _key(self, email: str) -> str:
+        return f"{self.key_prefix}{email}"
+
+    async def get(self, email: str) -> Optional[UserSnapshot]:
+        try:
+            raw = await self.client.get(self._key(email))
+        except Exception as e:
+            logger.warning(f"User cache read failed: {str(e)}")
+            return None
+        return UserSnapshot.from_bytes(raw) if raw is not None else None
+
+    async def set(self, snapshot: UserSnapshot, ttl: float) -> None:
+        try:
+            await self.client.set(
+                self._key(snapshot.email),
+                snapshot.to_bytes(),
+                px=max(1, int(ttl * 1000)),
+            )
+        except Exception as e:
+            logger.warning(f"User cache write failed: {str(e)}")
+
+    async def delete(self, email: str) -> None:
+        try:
+            await self.client.delete(self._key(email))
+        except Exception as e:
+            logger.warning(f"User cache invalidation failed: {str(e)}")
+
+
+# id, token_version, is_active, is_superuser, then the lengths of email,
+# full_name and hashed_password; a full_name length of 0xFFFF stands for None
+_SNAPSHOT_RECORD = struct.Struct("<qI??HHH")
+_NO_NAME = 0xFFFF
+
+
+class SharedMemoryUserCacheBackend(UserCacheBackend):
+    """
+    Backend shared by the worker processes of one host through a
+    ``SharedMemoryTable``; snapshots are packed into fixed binary records.
+    """
+
+    def __init__(self, table: SharedMemoryTable):
+        self.table = table
+
+    @staticmethod
+    def pack(snapshot: UserSnapshot) -> bytes:
+        email = snapshot.email.encode("utf-8")
+        full_name = (
+            snapshot.full_name.encode("utf-8")
+            if snapshot.full_name is not None
+            else b""
+        )
+        return (
+            _SNAPSHOT_RECORD.pack(
+                snapshot.id,
+                snapshot.token_version,
+                snapshot.is_active,
+                snapshot.is_superuser,
+                len(email),
+                _NO_NAME if snapshot.full_name is None else len(full_name),
+                len(snapshot.hashed_password),
+            )
+            + email
+            + full_name
+            + snapshot.hashed_password
+        )
+
+    @staticmethod
+    def unpack(raw: bytes) -> UserSnapshot:
+        (
+            user_id,
+            token_version,
+            is_active,
+            is_superuser,
+            email_len,
+            name_len,
+            hash_len,
+        ) = _SNAPSHOT_RECORD.unpack_from(raw)
+        start = _SNAPSHOT_RECORD.size
+        email = raw[start : start + email_len].decode("utf-8")
+        start += email_len
+        full_name = None
+        if name_len != _NO_NAME:
+            full_name = raw[start : start + name_len].decode("utf-8")
+            start += name_len
+        return UserSnapshot(
+            id=user_id,
+            email=email,
+            full_name=full_name,
+            is_active=is_active,
+            is_superuser=is_superuser,
+            hashed_password=raw[start : start + hash_len],
+            token_version=token_version,
+        )
+
+    async def get(self, email: str) -> Optional[UserSnapshot]:
+        raw = self.table.get(digest(email))
+        return self.unpack(raw) if raw is not None else None
+
+    async def set(self, snapshot: UserSnapshot, ttl: float) -> None:
+        self.table.set(digest(snapshot.email), self.pack(snapshot), time.time() + ttl)
+
+    async def delete(self, email: str) -> None:
+        self.table.delete(digest(email))
+
+
+@dataclass
+class UserCacheStats:
+    """Counters for the user record cache"""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    stale_writes: int = 0
+    invalidations: int = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class UserCache:
+    """
+    Read-through cache of user snapshots in front of the users table.
+
+    A snapshot read from the database may be outdated by the time it is
+    written back, if the user changed in between. Callers take a
+    ``generation()`` before reading and pass it to ``set``, and the write is
+    dropped if this process invalidated the user since. Invalidations are
+    remembered for the last ``max_invalidations`` users; a generation older
+    than any forgotten one is treated as stale.
+    """
+
+    def __init__(
+        self,
+        backend: UserCacheBackend,
+        ttl_seconds: float = 300.0,
+        max_invalidations: int = 10_000,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_invalidations = max_invalidations
+        self.stats = UserCacheStats()
+        self._generation = 0
+        self._forgotten = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def _is_stale(self, email: str, generation: int) -> bool:
+        if generation < self._forgotten:
+            return True
+        return self._invalidated.get(email, -1) >= generation
+
+    async def get(self, email: str) -> Optional[UserSnapshot]:
+        snapshot = await self.backend.get(email)
+        if snapshot is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return snapshot
+
+    async def set(
+        self, snapshot: UserSnapshot, generation: Optional[int] = None
+    ) -> None:
+        if generation is not None and self._is_stale(snapshot.email, generation):
+            self.stats.stale_writes += 1
+            return
+        self.stats.writes += 1
+        await self.backend.set(snapshot, self.ttl_seconds)
+
+    async def invalidate(self, email: str) -> None:
+        self.stats.invalidations += 1
+        self._invalidated[email] = self._generation
+        self._invalidated.move_to_end(email)
+        self._generation += 1
+        while len(self._invalidated) > self.max_invalidations:
+            _, generation = self._invalidated.popitem(last=False)
+            self._forgotten = generation + 1
+        await self.backend.delete(email)
+
+
+@lru_cache()
+def get_user_cache() -> Optional[UserCache]:
+    backend_name = settings.USER_CACHE_BACKEND
+    if backend_name == "auto":
+        # Per-process caches would only be invalidated in the worker that
+        # made the change
+        backend_name = "shared" if worker_count() > 1 else "memory"
+
+    if backend_name == "none":
+        return None
+
+    if backend_name == "redis":
+        if not settings.USER_CACHE_REDIS_URL:
+            raise ValueError("USER_CACHE_REDIS_URL is required for the redis backend")
+        backend = RedisUserCacheBackend.from_url(settings.USER_CACHE_REDIS_URL)
+    elif backend_name == "shared":
+        backend = SharedMemoryUserCacheBackend(
+            get_shared_table("users", settings.USER_CACHE_MAX_ENTRIES)
+        )
+    elif backend_name == "memory":
+        backend = InMemoryUserCacheBackend(max_entries=settings.USER_CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Unknown user cache backend: {backend_name}")
+
+    return UserCache(backend, ttl_seconds=settings.USER_CACHE_TTL_SECONDS)
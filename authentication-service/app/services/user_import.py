@@ -0,0 +1,401 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.core.database import conflict_free_inserts
+from app.core.logger import logger
+from app.core.security import PasswordScheme, get_password_hasher
+from app.models.user import User
+from app.schemas.user import UserImportRecord
+
+import_log = logger.bind(category="user.import")
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+_COLUMNS = (
+    "email",
+    "full_name",
+    "hashed_password",
+    "is_active",
+    "is_superuser",
+    "created_at",
+    "updated_at",
+)
+
+_STAGING_TABLE = "users_import_staging"
+
+_CREATE_STAGING_TABLE = f"""
+CREATE TEMPORARY TABLE IF NOT EXISTS {_STAGING_TABLE} (
+    email VARCHAR NOT NULL,
+    full_name VARCHAR,
+    hashed_password BYTEA NOT NULL,
+    is_active BOOLEAN,
+    is_superuser BOOLEAN,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+_COLUMN_LIST = ", ".join(_COLUMNS)
+_MERGE_STAGING_TABLE = (
+    f"INSERT INTO users ({_COLUMN_LIST}) "
+    f"SELECT {_COLUMN_LIST} FROM {_STAGING_TABLE} "
+    "ON CONFLICT (email) DO NOTHING"
+)
+
+
+def _hash_many(scheme: PasswordScheme, passwords: List[str]) -> List[bytes]:
+    return [scheme.hash(p.encode("utf-8")) for p in passwords]
+
+
+def hashing_workers() -> int:
+    return settings.USER_IMPORT_HASHING_WORKERS or os.cpu_count() or 1
+
+
+@lru_cache()
+def get_import_executor() -> Executor:
+    """
+    Hashing pool for imports through the API, built once per process.
+    Threads rather than processes: bcrypt and argon2 release the GIL, and a
+    web worker should not fork.
+    """
+    return ThreadPoolExecutor(
+        max_workers=hashing_workers(), thread_name_prefix="user-import"
+    )
+
+
+def shutdown_import_executor() -> None:
+    """Shut down the API import pool, if an import ever created it"""
+    if get_import_executor.cache_info().currsize:
+        get_import_executor().shutdown()
+        get_import_executor.cache_clear()
+
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def iter_records(
+    lines: Iterable[str], fmt: str
+) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """
+    Yield ``(position, fields)`` for every record in an NDJSON or CSV
+    stream. Records that cannot be parsed yield ``None`` so that positions
+    stay stable for checkpoints.
+    """
+    if fmt == "csv":
+        for position, row in enumerate(csv.DictReader(lines)):
+            yield position, {key: value for key, value in row.items() if value != ""}
+        return
+
+    if fmt != "ndjson":
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    position = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield position, record if isinstance(record, dict) else None
+        position += 1
+
+
+@dataclass
+class ImportCheckpoint:
+    """Progress of an import, saved after every committed batch"""
+
+    records: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+    @classmethod
+    def load(cls, path: str) -> "ImportCheckpoint":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as checkpoint_file:
+            return cls(**json.load(checkpoint_file))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump(asdict(self), checkpoint_file)
+        os.replace(tmp_path, path)
+
+
+@dataclass
+class ImportReport:
+    """Outcome and throughput of a bulk import"""
+
+    records: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    hashed: int = 0
+    resumed_from: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def snapshot(self) -> Dict:
+        data = asdict(self)
+        data["records_per_second"] = (
+            round(self.records / self.elapsed_seconds, 1)
+            if self.elapsed_seconds
+            else 0.0
+        )
+        return data
+
+
+class UserImporter:
+    """
+    Streams user records into the users table in large batches.
+
+    Each batch is deduplicated by email, then checked against existing users
+    before any hashing, so duplicates and resumed batches never cost a
+    bcrypt round. Plaintext passwords are hashed on ``executor``: the CLI
+    passes a process pool, the admin endpoint the shared thread pool from
+    ``get_import_executor``, and without one a process pool is created for
+    the run. Postgres batches are loaded with COPY into a staging table and
+    merged with ON CONFLICT DO NOTHING; other databases use executemany.
+    """
+
+    max_reported_errors = 100
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        batch_size: int = 5000,
+        hashing_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        password_scheme: Optional[PasswordScheme] = None,
+    ):
+        self.engine = engine
+        self.password_scheme = password_scheme or get_password_hasher().scheme
+        self.batch_size = batch_size
+        self.hashing_workers = hashing_workers or os.cpu_count() or 1
+        self._executor = executor
+
+    async def run(
+        self,
+        records: Iterable[Tuple[int, Optional[Dict]]],
+        checkpoint_path: Optional[str] = None,
+    ) -> ImportReport:
+        checkpoint = (
+            ImportCheckpoint.load(checkpoint_path)
+            if checkpoint_path
+            else ImportCheckpoint()
+        )
+        report = ImportReport(
+            inserted=checkpoint.inserted,
+            duplicates=checkpoint.duplicates,
+            invalid=checkpoint.invalid,
+            resumed_from=checkpoint.records,
+        )
+        if checkpoint.records:
+            import_log.info(f"Resuming import after {checkpoint.records} records")
+
+        owns_executor = self._executor is None
+        executor = self._executor or ProcessPoolExecutor(self.hashing_workers)
+        started = time.perf_counter()
+        records = islice(iter(records), checkpoint.records, None)
+
+        try:
+            while True:
+                count, users = await asyncio.to_thread(
+                    self._read_batch, records, report
+                )
+                if not count:
+                    break
+
+                await self._import_batch(users, executor, report)
+                report.records += count
+
+                checkpoint = ImportCheckpoint(
+                    records=report.resumed_from + report.records,
+                    inserted=report.inserted,
+                    duplicates=report.duplicates,
+                    invalid=report.invalid,
+                )
+                if checkpoint_path:
+                    checkpoint.save(checkpoint_path)
+
+                import_log.info(
+                    f"Imported {checkpoint.records} records: "
+                    f"{report.inserted} inserted, {report.duplicates} duplicates, "
+                    f"{report.invalid} invalid"
+                )
+        finally:
+            if owns_executor:
+                executor.shutdown()
+            report.elapsed_seconds = round(time.perf_counter() - started, 3)
+
+        return report
+
+    def _read_batch(
+        self, records: Iterator[Tuple[int, Optional[Dict]]], report: ImportReport
+    ) -> Tuple[int, Dict[str, UserImportRecord]]:
+        """
+        Read and validate the next batch, deduplicated by email. Runs on a
+        worker thread: reading the input blocks and validation is CPU work.
+        """
+        users: Dict[str, UserImportRecord] = {}
+        count = 0
+        for position, fields in islice(records, self.batch_size):
+            count += 1
+            user = self._parse(position, fields, report)
+            if user is None:
+                continue
+            if user.email in users:
+                report.duplicates += 1
+                continue
+            users[user.email] = user
+        return count, users
+
+    async def _import_batch(
+        self,
+        users: Dict[str, UserImportRecord],
+        executor: Executor,
+        report: ImportReport,
+    ) -> None:
+        if not users:
+            return
+
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(User.email).where(User.email.in_(list(users)))
+            )
+            existing = set(result.scalars())
+        for email in existing:
+            del users[email]
+        report.duplicates += len(existing)
+
+        if not users:
+            return
+
+        rows = await self._hash_rows(list(users.values()), executor, report)
+
+        async with self.engine.begin() as conn:
+            inserted = await self._write_rows(conn, rows)
+        report.inserted += inserted
+        # Rows that lost a race with a concurrent insert
+        report.duplicates += len(rows) - inserted
+
+    def _parse(
+        self, position: int, fields: Optional[Dict], report: ImportReport
+    ) -> Optional[UserImportRecord]:
+        if fields is None:
+            message = "not a JSON object"
+        else:
+            try:
+                return UserImportRecord.model_validate(fields)
+            except ValidationError as e:
+                error = e.errors()[0]
+                location = ".".join(str(part) for part in error["loc"])
+                message = f"{location}: {error['msg']}" if location else error["msg"]
+
+        report.invalid += 1
+        if len(report.errors) < self.max_reported_errors:
+            report.errors.append(f"record {position}: {message}")
+        return None
+
+    async def _hash_rows(
+        self,
+        users: List[UserImportRecord],
+        executor: Executor,
+        report: ImportReport,
+    ) -> List[Dict]:
+        plaintext = [user for user in users if user.password is not None]
+        hashes: Dict[str, bytes] = {}
+
+        if plaintext:
+            loop = asyncio.get_running_loop()
+            chunk_size = -(-len(plaintext) // self.hashing_workers)
+            chunks = [
+                plaintext[i : i + chunk_size]
+                for i in range(0, len(plaintext), chunk_size)
+            ]
+            hashed_chunks = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        _hash_many,
+                        self.password_scheme,
+                        [user.password for user in chunk],
+                    )
+                    for chunk in chunks
+                )
+            )
+            for chunk, hashed in zip(chunks, hashed_chunks):
+                hashes.update(zip((user.email for user in chunk), hashed))
+            report.hashed += len(plaintext)
+
+        now = datetime.now()
+        return [
+            {
+                "email": user.email,
+                "full_name": user.full_name,
+                "hashed_password": hashes.get(user.email)
+                or user.hashed_password.encode("ascii"),
+                "is_active": user.is_active,
+                "is_superuser": user.is_superuser,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user in users
+        ]
+
+    async def _write_rows(self, conn: AsyncConnection, rows: List[Dict]) -> int:
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+            return await self._copy_rows(conn, rows)
+
+        dialect_insert = conflict_free_inserts.get(conn.dialect.name)
+        if dialect_insert is None:
+            statement = User.__table__.insert()
+        else:
+            statement = dialect_insert(User.__table__).on_conflict_do_nothing(
+                index_elements=["email"]
+            )
+            if conn.dialect.insert_executemany_returning:
+                # rowcount of an executemany is unreliable across drivers;
+                # the returned rows are exactly the ones inserted
+                result = await conn.execute(
+                    statement.returning(User.__table__.c.email), rows
+                )
+                return len(result.all())
+
+        result = await conn.execute(statement, rows)
+        # A driver that cannot tell (rowcount -1) gets every row counted as
+        # inserted, so users that a concurrent insert got to first are not
+        # reported as duplicates
+        return result.rowcount if result.rowcount >= 0 else len(rows)
+
+    async def _copy_rows(self, conn: AsyncConnection, rows: List[Dict]) -> int:
+        # Creating the staging table also opens the transaction, so the COPY
+        # on the raw asyncpg connection below is part of it.
+        await conn.exec_driver_sql(_CREATE_STAGING_TABLE)
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            _STAGING_TABLE,
+            records=[tuple(row[column] for column in _COLUMNS) for row in rows],
+            columns=list(_COLUMNS),
+        )
+        result = await conn.exec_driver_sql(_MERGE_STAGING_TABLE)
+        return result.rowcount
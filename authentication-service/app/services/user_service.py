@@ -1,47 +1,128 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
-import bcrypt
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.future import select
 
-from app.core.exceptions import DuplicateEntityException, RegistrationException
+from app.core.config import settings
+from app.core.database import conflict_free_inserts, execute_read, recent_writes
+from app.core.exceptions import (
+    DuplicateEntityException,
+    RegistrationException,
+    UserUpdateException,
+)
 from app.core.logger import logger
+from app.core.metrics import time_phase
+from app.core.security import PasswordHasher, get_password_hasher
+from app.core.singleflight import SingleFlight, get_single_flight
 from app.interfaces.auth import IUserService
 from app.models.user import User
 from app.schemas.user import UserCreate
+from app.services.outbox import (
+    EVENT_USER_DEACTIVATED,
+    EVENT_USER_PASSWORD_CHANGED,
+    EVENT_USER_REGISTERED,
+    EVENT_USER_ROLE_CHANGED,
+    Outbox,
+    get_outbox,
+)
+from app.services.token_cache import TokenValidationCache, get_token_cache
+from app.services.token_versions import TokenVersions, get_token_versions
+from app.services.user_cache import UserCache, UserSnapshot, get_user_cache
+
+register_log = logger.bind(category="user.register")
+
+# Built once so every lookup renders identical SQL, which keeps it in
+# SQLAlchemy's compiled cache and asyncpg's prepared statement cache.
+select_user_by_email = select(User).where(User.email == bindparam("email"))
+
+
+def build_insert_user(dialect_name: str, values: Dict):
+    # A duplicate email is skipped inside the INSERT itself, so a conflict
+    # comes back as "no row returned" instead of an IntegrityError.
+    dialect_insert = conflict_free_inserts.get(dialect_name)
+    if dialect_insert is None:
+        return insert(User).values(**values).returning(User)
+    return (
+        dialect_insert(User)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
 
 
 class UserService(IUserService):
+    def __init__(
+        self,
+        password_hasher: Optional[PasswordHasher] = None,
+        user_cache: Optional[UserCache] = None,
+        rehash_on_login: Optional[bool] = None,
+        lookup_flight: Optional[SingleFlight] = None,
+        outbox: Optional[Outbox] = None,
+        token_cache: Optional[TokenValidationCache] = None,
+        token_versions: Optional[TokenVersions] = None,
+    ):
+        self.password_hasher = password_hasher or get_password_hasher()
+        self.user_cache = user_cache if user_cache is not None else get_user_cache()
+        self.rehash_on_login = (
+            settings.PASSWORD_REHASH_ON_LOGIN
+            if rehash_on_login is None
+            else rehash_on_login
+        )
+        self.lookup_flight = (
+            lookup_flight
+            if lookup_flight is not None
+            else get_single_flight("user_lookup")
+        )
+        self.outbox = outbox if outbox is not None else get_outbox()
+        self.token_cache = token_cache if token_cache is not None else get_token_cache()
+        self.token_versions = (
+            token_versions if token_versions is not None else get_token_versions()
+        )
+
     async def register_user(self, db, user_create: UserCreate) -> User:
-        # Check if user already exists
-        existing_user = await self.get_user_by_email(db, user_create.email)
-        if existing_user:
+        # A cached user is known to exist, so skip the hash and the insert.
+        # Everything else is settled atomically by the INSERT below.
+        if self.user_cache is not None and await self.user_cache.get(user_create.email):
             raise DuplicateEntityException(
                 detail="A user with this email is already registered"
             )
 
-        try:
-            hashed_password = bcrypt.hashpw(
-                user_create.password.encode("utf-8"), bcrypt.gensalt()
-            )
+        hashed_password = await self.password_hasher.hash(user_create.password)
+        dialect_name = db.get_bind().dialect.name
 
-            db_user = User(
-                email=user_create.email,
-                full_name=user_create.full_name,
-                hashed_password=hashed_password,
-                is_active=user_create.is_active,
-                is_superuser=user_create.is_superuser,
+        try:
+            statement = build_insert_user(
+                dialect_name,
+                {
+                    "email": user_create.email,
+                    "full_name": user_create.full_name,
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                    "is_superuser": False,
+                },
             )
-
-            db.add(db_user)
+            with time_phase("db_query"):
+                result = await db.execute(statement)
+            db_user = result.scalar_one_or_none()
+            if db_user is not None and self.outbox is not None:
+                await self.outbox.add(
+                    db,
+                    EVENT_USER_REGISTERED,
+                    db_user.email,
+                    {"user_id": db_user.id, "full_name": db_user.full_name},
+                )
             await db.commit()
-            await db.refresh(db_user)
-
-            logger.info(f"User registered successfully: {user_create.email}")
-            return db_user
+            recent_writes.mark(user_create.email)
 
         except IntegrityError:
             await db.rollback()
+            if dialect_name not in conflict_free_inserts:
+                # Without ON CONFLICT the email's unique index is what
+                # reports a duplicate
+                raise DuplicateEntityException(
+                    detail="A user with this email is already registered"
+                )
             logger.error(
                 f"Registration failed - database constraint: {user_create.email}"
             )
@@ -55,18 +136,190 @@ class UserService(IUserService):
                 detail=f"Unexpected error during user registration: {str(e)}"
             )
 
-    async def get_user_by_email(self, db, email: str) -> Optional[User]:
-        result = await db.execute(select(User).where(User.email == email))
-        return result.scalar_one_or_none()
+        if db_user is None:
+            raise DuplicateEntityException(
+                detail="A user with this email is already registered"
+            )
+
+        if self.user_cache is not None:
+            await self.user_cache.set(UserSnapshot.from_orm(db_user))
+
+        register_log.info(f"User registered successfully: {user_create.email}")
+        return db_user
+
+    async def get_user_by_email(self, db, email: str) -> Optional[UserSnapshot]:
+        if self.user_cache is not None:
+            snapshot = await self.user_cache.get(email)
+            if snapshot is not None:
+                return snapshot
+
+        if self.lookup_flight is None:
+            return await self._load_user(db, email)
+        return await self.lookup_flight.do(email, lambda: self._load_user(db, email))
+
+    async def _load_user(self, db, email: str) -> Optional[UserSnapshot]:
+        generation = (
+            self.user_cache.generation() if self.user_cache is not None else None
+        )
+        with time_phase("db_query"):
+            result = await execute_read(
+                db, select_user_by_email, {"email": email}, keys=(email,)
+            )
+        user = result.scalar_one_or_none()
+        if user is None:
+            return None
+
+        snapshot = UserSnapshot.from_orm(user)
+        if self.user_cache is not None:
+            await self.user_cache.set(snapshot, generation)
+        return snapshot
+
+    async def get_users_by_emails(
+        self, db, emails: Iterable[str]
+    ) -> Dict[str, UserSnapshot]:
+        users: Dict[str, UserSnapshot] = {}
+        missing = []
+        for email in set(emails):
+            snapshot = None
+            if self.user_cache is not None:
+                snapshot = await self.user_cache.get(email)
+            if snapshot is not None:
+                users[email] = snapshot
+            else:
+                missing.append(email)
+
+        if missing:
+            generation = (
+                self.user_cache.generation() if self.user_cache is not None else None
+            )
+            with time_phase("db_query"):
+                result = await execute_read(
+                    db, select(User).where(User.email.in_(missing)), keys=missing
+                )
+            for user in result.scalars():
+                snapshot = UserSnapshot.from_orm(user)
+                users[snapshot.email] = snapshot
+                if self.user_cache is not None:
+                    await self.user_cache.set(snapshot, generation)
+
+        return users
+
+    async def deactivate_user(self, db, email: str) -> bool:
+        return await self._change_user(
+            db, email, {"is_active": False}, "deactivated", EVENT_USER_DEACTIVATED
+        )
+
+    async def change_password(self, db, email: str, new_password: str) -> bool:
+        hashed_password = await self.password_hasher.hash(new_password)
+        return await self._change_user(
+            db,
+            email,
+            {"hashed_password": hashed_password},
+            "password changed",
+            EVENT_USER_PASSWORD_CHANGED,
+        )
+
+    async def set_superuser(self, db, email: str, is_superuser: bool) -> bool:
+        return await self._change_user(
+            db,
+            email,
+            {"is_superuser": is_superuser},
+            "role changed",
+            EVENT_USER_ROLE_CHANGED,
+            {"is_superuser": is_superuser},
+        )
+
+    async def _change_user(
+        self,
+        db,
+        email: str,
+        values: Dict,
+        action: str,
+        event_type: str,
+        event_data: Optional[Dict] = None,
+    ) -> bool:
+        """
+        Apply a change that must end the user's existing sessions: the
+        token version is bumped in the same UPDATE, so every token issued
+        before it stops validating. The outbox event commits with it.
+        """
+        try:
+            result = await db.execute(
+                update(User)
+                .where(User.email == email)
+                .values(**values, token_version=User.token_version + 1)
+                .returning(User.id, User.token_version)
+            )
+            row = result.one_or_none()
+            if row is not None and self.outbox is not None:
+                await self.outbox.add(
+                    db, event_type, email, {"user_id": row.id, **(event_data or {})}
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"User update failed - {action}: {email}: {str(e)}")
+            raise UserUpdateException(
+                detail=f"Unexpected error while updating user: {str(e)}"
+            )
+
+        token_version = row.token_version if row is not None else None
+        recent_writes.mark(email)
+
+        if self.user_cache is not None:
+            await self.user_cache.invalidate(email)
+
+        if self.token_cache is not None:
+            self.token_cache.invalidate_user(email)
+
+        if self.token_versions is not None and token_version is not None:
+            self.token_versions.record(email, token_version)
+
+        logger.info(f"User {action}: {email}")
+        return token_version is not None
 
     async def verify_password(
         self, plain_password: str, hashed_password: bytes
     ) -> bool:
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"),
-            (
-                hashed_password
-                if isinstance(hashed_password, bytes)
-                else hashed_password.encode("utf-8")
-            ),
+        return await self.password_hasher.verify(plain_password, hashed_password)
+
+    async def check_password(self, db, user: UserSnapshot, plain_password: str) -> bool:
+        """
+        Verify a login password. When the stored hash was made under a
+        different hashing policy, replace it with one made under the current
+        policy while the plaintext is at hand.
+        """
+        if not self.rehash_on_login:
+            return await self.verify_password(plain_password, user.hashed_password)
+
+        matches, new_hash = await self.password_hasher.verify_and_update(
+            plain_password, user.hashed_password
         )
+        if new_hash is not None:
+            await self._replace_password_hash(db, user, new_hash)
+        return matches
+
+    async def _replace_password_hash(
+        self, db, user: UserSnapshot, new_hash: bytes
+    ) -> None:
+        # Only replace the hash that was verified, so a password changed in
+        # the meantime is never overwritten
+        try:
+            await db.execute(
+                update(User)
+                .where(
+                    User.email == user.email,
+                    User.hashed_password == user.hashed_password,
+                )
+                .values(hashed_password=new_hash)
+            )
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.warning(f"Password rehash failed for user {user.email}: {str(e)}")
+            return
+
+        recent_writes.mark(user.email)
+        if self.user_cache is not None:
+            await self.user_cache.invalidate(user.email)
+        logger.info(f"Password rehashed under the current policy: {user.email}")
@@ -0,0 +1,18 @@
+import os
+
+# Benchmarks run outside docker-compose, so provide throwaway values for the
+# settings the application refuses to start without.
+for name, value in {
+    "APP_NAME": "auth-benchmark",
+    "ENVIRONMENT": "benchmark",
+    "DEBUG": "false",
+    "SECRET_KEY": "benchmark-secret",
+    "DATABASE_URL": "sqlite+aiosqlite:///./benchmark.db",
+    "TEST_DATABASE_URL": "sqlite+aiosqlite:///./benchmark.db",
+    "JWT_SECRET_KEY": "benchmark-jwt-secret",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ALGORITHM": "HS256",
+    "STRIPE_SECRET_KEY": "unused",
+    "STRIPE_WEBHOOK_SECRET": "unused",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of JWT encode/decode throughput for every engine and
+algorithm.
+
+    python -m benchmarks.jwt_engines --iterations 5000 --output jwt.json
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List, Optional
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core.jwt_engines import JWT_ENGINES
+from app.core.keys import KeyRing, SigningKey
+
+ALGORITHMS = ["HS256", "RS256", "ES256", "EdDSA"]
+
+_PRIVATE_KEYS = {
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "EdDSA": ed25519.Ed25519PrivateKey.generate,
+}
+
+
+def _key_ring(algorithm: str) -> Optional[KeyRing]:
+    if algorithm == "HS256":
+        return None
+    private_key = _PRIVATE_KEYS[algorithm]()
+    return KeyRing(
+        [
+            SigningKey(
+                kid="bench",
+                algorithm=algorithm,
+                public_key=private_key.public_key(),
+                private_key=private_key,
+            )
+        ]
+    )
+
+
+def _rate(func: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - started)
+
+
+def run(iterations: int, engines: List[str], algorithms: List[str]) -> List[Dict]:
+    results = []
+    claims = {"sub": "user@example.com", "exp": int(time.time()) + 3600}
+
+    for algorithm in algorithms:
+        key_ring = _key_ring(algorithm)
+        for name in engines:
+            try:
+                engine = JWT_ENGINES[name](key_ring, algorithm="HS256")
+            except (RuntimeError, ValueError) as e:
+                results.append(
+                    {"engine": name, "algorithm": algorithm, "error": str(e)}
+                )
+                continue
+
+            token = engine.encode(claims)
+            results.append(
+                {
+                    "engine": name,
+                    "algorithm": algorithm,
+                    "encode_per_sec": round(
+                        _rate(lambda: engine.encode(claims), iterations)
+                    ),
+                    "decode_per_sec": round(
+                        _rate(lambda: engine.decode(token), iterations)
+                    ),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--engines", nargs="+", default=sorted(JWT_ENGINES))
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.engines, args.algorithms)
+
+    print(f"{'algorithm':<10}{'engine':<14}{'encode/s':>12}{'decode/s':>12}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['algorithm']:<10}{result['engine']:<14}  {result['error']}")
+            continue
+        print(
+            f"{result['algorithm']:<10}{result['engine']:<14}"
+            f"{result['encode_per_sec']:>12}{result['decode_per_sec']:>12}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
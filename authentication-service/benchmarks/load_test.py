@@ -0,0 +1,303 @@
+"""
+Load test of the auth endpoints against a throwaway database.
+
+    python -m benchmarks.load_test --users 200 --concurrency 20 --output load.json
+
+Runs the application in-process by default, or under uvicorn with
+``--uvicorn``. ``--database-url`` points it at a disposable Postgres
+instead of the default temporary SQLite file.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ["register", "token", "refresh-token", "validate-token"]
+PASSWORD = "benchmark-password-123"
+
+
+@dataclass
+class EndpointResult:
+    endpoint: str
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def record(self, latency: float, status: int) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        return {
+            "endpoint": self.endpoint,
+            "requests": len(latencies),
+            "errors": self.errors,
+            "statuses": {str(code): count for code, count in self.statuses.items()},
+            "elapsed_seconds": round(self.elapsed, 4),
+            "throughput_rps": (
+                round(len(latencies) / self.elapsed, 1) if self.elapsed else 0.0
+            ),
+            "p50_ms": _percentile_ms(latencies, 50),
+            "p95_ms": _percentile_ms(latencies, 95),
+            "p99_ms": _percentile_ms(latencies, 99),
+            "max_ms": _percentile_ms(latencies, 100),
+        }
+
+
+def _percentile_ms(sorted_latencies: List[float], percentile: float) -> float:
+    if not sorted_latencies:
+        return 0.0
+    rank = max(0, -(-len(sorted_latencies) * percentile // 100) - 1)
+    return round(sorted_latencies[int(rank)] * 1000, 3)
+
+
+async def _drive(
+    endpoint: str,
+    jobs: List[Callable[[], Awaitable[httpx.Response]]],
+    concurrency: int,
+) -> EndpointResult:
+    result = EndpointResult(endpoint)
+    queue = iter(jobs)
+
+    async def worker():
+        for job in queue:
+            started = time.perf_counter()
+            try:
+                response = await job()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            result.record(time.perf_counter() - started, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient,
+    users: int,
+    concurrency: int,
+    validate_rounds: int,
+    scenarios: List[str],
+) -> List[Dict]:
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f"load-{run_id}-{i}@example.com" for i in range(users)]
+    tokens: Dict[str, Dict] = {}
+    results = []
+
+    def register(email):
+        return lambda: client.post(
+            "/api/v1/auth/register",
+            json={"email": email, "password": PASSWORD, "full_name": "Load Test"},
+        )
+
+    def login(email):
+        async def job():
+            response = await client.post(
+                "/api/v1/auth/token", json={"email": email, "password": PASSWORD}
+            )
+            if response.status_code == 200:
+                tokens[email] = response.json()
+            return response
+
+        return job
+
+    def refresh(email):
+        return lambda: client.post(
+            "/api/v1/auth/refresh-token",
+            json={"refresh_token": tokens[email]["refresh_token"]},
+        )
+
+    def validate(email):
+        return lambda: client.post(
+            "/api/v1/auth/validate-token",
+            json={"access_token": tokens[email]["access_token"]},
+        )
+
+    # Later scenarios need the users and tokens created by earlier ones, so
+    # those steps always run; only the selected scenarios are reported.
+    steps = [
+        ("register", [register(email) for email in emails]),
+        ("token", [login(email) for email in emails]),
+    ]
+    for name, jobs in steps:
+        result = await _drive(name, jobs, concurrency)
+        if name in scenarios:
+            results.append(result.summary())
+
+    issued = [email for email in emails if email in tokens]
+    if "refresh-token" in scenarios:
+        result = await _drive(
+            "refresh-token", [refresh(email) for email in issued], concurrency
+        )
+        results.append(result.summary())
+    if "validate-token" in scenarios:
+        result = await _drive(
+            "validate-token",
+            [validate(email) for email in issued for _ in range(validate_rounds)],
+            concurrency,
+        )
+        results.append(result.summary())
+
+    return results
+
+
+async def _create_schema() -> None:
+    from app.core.database import async_engine
+    from app.models import Base
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await async_engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    await _create_schema()
+
+    lifespan = AsyncExitStack()
+    server: Optional[subprocess.Popen] = None
+    if args.uvicorn:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--no-access-log",
+            ],
+            env=os.environ.copy(),
+        )
+        await _wait_until_healthy(base_url)
+        client = httpx.AsyncClient(base_url=base_url, timeout=args.timeout)
+    else:
+        from app.main import app
+
+        # ASGITransport sends no lifespan events; run startup and shutdown
+        # as uvicorn would, so pools, warm-up and background tasks exist
+        await lifespan.enter_async_context(app.router.lifespan_context(app))
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            timeout=args.timeout,
+        )
+
+    try:
+        async with client:
+            results = await run_scenarios(
+                client,
+                args.users,
+                args.concurrency,
+                args.validate_rounds,
+                args.scenarios,
+            )
+    finally:
+        await lifespan.aclose()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    return {
+        "config": {
+            "mode": "uvicorn" if args.uvicorn else "in-process",
+            "database": args.database_url.split("://", 1)[0],
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "validate_rounds": args.validate_rounds,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--validate-rounds",
+        type=int,
+        default=5,
+        help="validate-token requests per issued access token",
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument(
+        "--database-url",
+        help="database to run against (default: a temporary SQLite file)",
+    )
+    parser.add_argument("--uvicorn", action="store_true", help="serve over HTTP")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if not args.database_url:
+            args.database_url = f"sqlite+aiosqlite:///{workdir}/load_test.db"
+        # Settings are read at import time, so configure the environment
+        # before anything under app/ is imported.
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("LOG_FILE", "")
+
+        report = asyncio.run(run(args))
+
+    print(
+        f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for result in report["results"]:
+        print(
+            f"{result['endpoint']:<16}{result['requests']:>9}{result['errors']:>8}"
+            f"{result['throughput_rps']:>10}{result['p50_ms']:>10}"
+            f"{result['p95_ms']:>10}{result['p99_ms']:>10}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare token validation over HTTP/JSON with the internal msgpack protocol
+against a running instance started with ``RPC_ENABLED=true``.
+
+    python -m benchmarks.rpc --http http://127.0.0.1:8000 --rpc 127.0.0.1:9000 \
+        --requests 5000 --concurrency 16 --output rpc.json
+
+Registers a throwaway user, logs in once, then validates the same access
+token repeatedly, so both paths are served from the validated-token cache
+and the difference is transport and encoding.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.rpc.client import AuthRPCClient
+from benchmarks.load_test import PASSWORD, _percentile_ms
+
+AUTH_PREFIX = "/api/v1/auth"
+
+
+async def _access_token(http: httpx.AsyncClient) -> str:
+    email = f"rpc-{uuid.uuid4().hex[:12]}@example.com"
+    response = await http.post(
+        f"{AUTH_PREFIX}/register", json={"email": email, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    response = await http.post(
+        f"{AUTH_PREFIX}/token", json={"email": email, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _measure(
+    name: str, call: Callable[[], Awaitable[object]], requests: int, concurrency: int
+) -> Dict:
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "transport": name,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p99_ms": _percentile_ms(latencies, 99),
+    }
+
+
+async def run(http_url: str, rpc_address: str, requests: int, concurrency: int):
+    host, _, port = rpc_address.rpartition(":")
+    async with httpx.AsyncClient(base_url=http_url) as http:
+        token = await _access_token(http)
+
+        async def over_http() -> None:
+            response = await http.post(
+                f"{AUTH_PREFIX}/validate-token", json={"access_token": token}
+            )
+            response.raise_for_status()
+
+        async with AuthRPCClient(host, int(port)) as rpc:
+            results = []
+            for name, call in (
+                ("http", over_http),
+                ("rpc", lambda: rpc.validate(token)),
+            ):
+                await _measure(name, call, min(requests, 200), concurrency)
+                results.append(await _measure(name, call, requests, concurrency))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--http", default="http://127.0.0.1:8000")
+    parser.add_argument("--rpc", default="127.0.0.1:9000")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.http, args.rpc, args.requests, args.concurrency))
+
+    print(f"{'transport':<10}{'rps':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for result in results:
+        print(
+            f"{result['transport']:<10}{result['throughput_rps']:>10}"
+            f"{result['p50_ms']:>9}{result['p99_ms']:>9}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
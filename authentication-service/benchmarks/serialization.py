@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of response encoding: FastAPI's default path against the
+orjson / compiled-serializer path used by the auth endpoints.
+
+    python -m benchmarks.serialization --iterations 20000 --output serialization.json
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.responses import json_response, model_response
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+_user_adapter = TypeAdapter(UserResponse)
+
+
+def _user() -> User:
+    now = datetime.now()
+    return User(
+        id=42,
+        email="user@example.com",
+        full_name="Benchmark User",
+        hashed_password=b"$2b$12$" + b"x" * 53,
+        is_active=True,
+        is_superuser=False,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def _payloads() -> Dict[str, Dict]:
+    return {
+        "tokens": {
+            "access_token": "a" * 220,
+            "refresh_token": "r" * 240,
+            "token_type": "bearer",
+        },
+        "validation": {
+            "valid": True,
+            "user_id": 42,
+            "email": "user@example.com",
+            "full_name": "Benchmark User",
+            "is_superuser": False,
+            "token_expires": int(time.time()) + 900,
+        },
+    }
+
+
+def _default_model_response(user: User) -> bytes:
+    # What FastAPI does for ``response_model=UserResponse``: validate from
+    # attributes, dump to JSON-compatible Python, then json.dumps
+    model = _user_adapter.validate_python(user, from_attributes=True)
+    return JSONResponse(_user_adapter.dump_python(model, mode="json")).body
+
+
+def _per_call_us(func: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run(iterations: int) -> List[Dict]:
+    user = _user()
+    cases = {
+        "user_response": {
+            "default": lambda: _default_model_response(user),
+            "fast": lambda: model_response(UserResponse, user).body,
+        }
+    }
+    for name, payload in _payloads().items():
+        cases[name] = {
+            "default": lambda payload=payload: JSONResponse(
+                jsonable_encoder(payload)
+            ).body,
+            "fast": lambda payload=payload: json_response(payload).body,
+        }
+
+    results = []
+    for name, paths in cases.items():
+        default_us = _per_call_us(paths["default"], iterations)
+        fast_us = _per_call_us(paths["fast"], iterations)
+        results.append(
+            {
+                "payload": name,
+                "default_us": round(default_us, 2),
+                "fast_us": round(fast_us, 2),
+                "speedup": round(default_us / fast_us, 1),
+                "response_validation": settings.RESPONSE_VALIDATION,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+
+    print(f"{'payload':<16}{'default µs':>12}{'fast µs':>10}{'speedup':>9}")
+    for result in results:
+        print(
+            f"{result['payload']:<16}{result['default_us']:>12}"
+            f"{result['fast_us']:>10}{result['speedup']:>8}x"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
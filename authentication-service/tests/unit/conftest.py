@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.services.token_service import TokenService
+from app.services.token_versions import get_token_versions
+from app.services.user_cache import UserSnapshot
+
+
+@pytest.fixture(scope="session", autouse=True)
+def apply_migrations():
+    # Unit tests that need a database get a throwaway SQLite file from the
+    # engine fixture, never the migrated test database, so skip alembic.
+    yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_token_versions():
+    # Versions recorded by one test's user changes must not reject the
+    # tokens of the next
+    get_token_versions.cache_clear()
+    yield
+    get_token_versions.cache_clear()
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'unit.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class FakeHasher:
+    async def hash(self, password: str) -> bytes:
+        return b"hashed:" + password.encode("utf-8")
+
+
+class FakeUserService:
+    def __init__(self, *snapshots: UserSnapshot):
+        self.users = {snapshot.email: snapshot for snapshot in snapshots}
+        self.queries = 0
+
+    async def get_user_by_email(self, db, email):
+        self.queries += 1
+        return self.users.get(email)
+
+    async def get_users_by_emails(self, db, emails):
+        self.queries += 1
+        return {email: self.users[email] for email in emails if email in self.users}
+
+
+def make_snapshot(user_id: int, email: str, is_active: bool = True) -> UserSnapshot:
+    return UserSnapshot(
+        id=user_id,
+        email=email,
+        full_name=None,
+        is_active=is_active,
+        is_superuser=False,
+        hashed_password=b"hash",
+    )
+
+
+def make_access_token(token_service: TokenService, email: str) -> str:
+    return token_service.create_access_token(
+        data={"sub": email}, expires_delta=timedelta(minutes=5)
+    )
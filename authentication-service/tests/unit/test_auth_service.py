@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.auth_service import AuthService
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from tests.unit.conftest import FakeUserService, make_access_token, make_snapshot
+
+
+@pytest.mark.asyncio
+async def test_repeat_validation_is_served_from_cache():
+    user_service = FakeUserService(make_snapshot(1, "a@example.com"))
+    token_service = TokenService()
+    auth_service = AuthService(user_service, token_service, TokenValidationCache())
+    token = make_access_token(token_service, "a@example.com")
+
+    first = await auth_service.validate_access_token(None, token)
+    second = await auth_service.validate_access_token(None, token)
+
+    assert first == second
+    assert user_service.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_validation_preserves_order_with_one_lookup():
+    user_service = FakeUserService(
+        make_snapshot(1, "a@example.com"),
+        make_snapshot(2, "b@example.com"),
+        make_snapshot(3, "inactive@example.com", is_active=False),
+    )
+    token_service = TokenService()
+    auth_service = AuthService(user_service, token_service, TokenValidationCache())
+    tokens = [
+        make_access_token(token_service, "b@example.com"),
+        "not-a-token",
+        make_access_token(token_service, "a@example.com"),
+        make_access_token(token_service, "inactive@example.com"),
+        make_access_token(token_service, "b@example.com"),
+    ]
+
+    results = await auth_service.validate_access_tokens(None, tokens)
+
+    assert [r["valid"] for r in results] == [True, False, True, False, True]
+    assert results[0]["user_id"] == 2
+    assert results[2]["user_id"] == 1
+    assert results[3]["detail"] == "User account is not active"
+    assert user_service.queries == 1
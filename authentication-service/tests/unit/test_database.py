@@ -0,0 +1,180 @@
+import pytest
+from sqlalchemy import event, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.database import (
+    InstrumentedQueuePool,
+    RecentWrites,
+    ReplicaSet,
+    RoutingSession,
+    create_engine,
+    execute_read,
+    pool_status,
+    warm_up_pool,
+)
+from app.core.shared_memory import SharedMemoryTable
+from app.models import Base
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_checkouts(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    try:
+        assert isinstance(engine.sync_engine.pool, InstrumentedQueuePool)
+
+        for _ in range(3):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        status = pool_status(engine)
+        assert status["checkouts"] == 3
+        assert status["connects"] == 1
+        assert status["checked_out"] == 0
+        assert status["timeouts"] == 0
+        assert status["wait_seconds_max"] >= 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_survive_dispose(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await engine.dispose()
+
+        assert pool_status(engine)["checkouts"] == 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections_up_front(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    try:
+        assert await warm_up_pool(engine, 3) == 3
+
+        status = pool_status(engine)
+        assert status["connects"] == 3
+        assert status["checked_in"] == 3
+        assert status["checked_out"] == 0
+    finally:
+        await engine.dispose()
+
+
+def test_memory_database_keeps_default_pool():
+    engine = create_engine("sqlite+aiosqlite:///:memory:")
+    assert "status" in pool_status(engine)
+
+
+async def _engine_with_user(path, full_name):
+    engine = create_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            User.__table__.insert().values(
+                email="a@example.com", full_name=full_name, hashed_password=b"x"
+            )
+        )
+    return engine
+
+
+@pytest.fixture
+async def replicated(tmp_path, monkeypatch):
+    primary = await _engine_with_user(tmp_path / "primary.db", "primary")
+    replicas = [
+        await _engine_with_user(tmp_path / f"replica{i}.db", f"replica{i}")
+        for i in range(2)
+    ]
+    monkeypatch.setattr(database, "replica_set", ReplicaSet(replicas))
+    monkeypatch.setattr(database, "recent_writes", RecentWrites(window_seconds=60))
+    yield sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+    )
+    for engine in [primary, *replicas]:
+        await engine.dispose()
+
+
+async def _read_full_name(session_factory, key="a@example.com"):
+    async with session_factory() as db:
+        result = await execute_read(
+            db, select(User.full_name).where(User.email == key), keys=(key,)
+        )
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_replicas(replicated):
+    names = [await _read_full_name(replicated) for _ in range(4)]
+
+    assert names == ["replica0", "replica1", "replica0", "replica1"]
+
+
+@pytest.mark.asyncio
+async def test_plain_execute_and_recent_writes_use_primary(replicated):
+    async with replicated() as db:
+        result = await db.execute(select(User.full_name))
+        assert result.scalar_one() == "primary"
+
+    database.recent_writes.mark("a@example.com")
+    assert await _read_full_name(replicated) == "primary"
+
+
+def test_recent_writes_are_seen_by_every_worker_sharing_the_table(tmp_path):
+    path = str(tmp_path / "recent.cache")
+    writer = RecentWrites(table=SharedMemoryTable(path, slots=64))
+    reader = RecentWrites(table=SharedMemoryTable(path, slots=64))
+
+    writer.mark("a@example.com")
+    assert reader.is_recent("a@example.com")
+    assert not reader.is_recent("b@example.com")
+
+    expired = RecentWrites(window_seconds=0, table=SharedMemoryTable(path, slots=64))
+    expired.mark("b@example.com")
+    assert not reader.is_recent("b@example.com")
+
+
+@pytest.mark.asyncio
+async def test_failed_replica_falls_back_to_primary(replicated, tmp_path):
+    broken = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}")
+    database.replica_set = ReplicaSet([broken], retry_seconds=60)
+
+    assert await _read_full_name(replicated) == "primary"
+    assert database.replica_set.choose() is None
+    assert database.replica_set.status()[0]["healthy"] is False
+
+
+@pytest.mark.asyncio
+async def test_session_stays_usable_after_replica_fallback(replicated, tmp_path):
+    # Connects, then drops the connection in the middle of the transaction
+    empty = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+
+    @event.listens_for(empty.sync_engine, "handle_error")
+    def _disconnect(context):
+        context.is_disconnect = True
+
+    database.replica_set = ReplicaSet([empty], retry_seconds=60)
+
+    async with replicated() as db:
+        result = await execute_read(
+            db, select(User.full_name).where(User.email == "a@example.com")
+        )
+        assert result.scalar_one() == "primary"
+        await db.execute(
+            update(User)
+            .where(User.email == "a@example.com")
+            .values(full_name="renamed")
+        )
+        await db.commit()
+
+    async with replicated() as db:
+        result = await db.execute(select(User.full_name))
+        assert result.scalar_one() == "renamed"
+    await empty.dispose()
@@ -0,0 +1,60 @@
+import pytest
+
+from app.core.jwt_engines import (
+    JWT_ENGINES,
+    InvalidTokenError,
+    TokenExpiredError,
+    create_jwt_engine,
+)
+
+ENGINE_NAMES = sorted(JWT_ENGINES)
+
+
+@pytest.mark.parametrize("encoder", ENGINE_NAMES)
+@pytest.mark.parametrize("decoder", ENGINE_NAMES)
+def test_shared_secret_tokens_are_interchangeable(encoder, decoder):
+    claims = {"sub": "a@example.com", "exp": 4102444800, "type": "access"}
+    token = create_jwt_engine(encoder).encode(claims)
+
+    assert create_jwt_engine(decoder).decode(token) == claims
+
+
+@pytest.mark.parametrize("name", ENGINE_NAMES)
+def test_expired_token(name):
+    engine = create_jwt_engine(name)
+    token = engine.encode({"sub": "a@example.com", "exp": 1})
+
+    with pytest.raises(TokenExpiredError):
+        engine.decode(token)
+
+
+@pytest.mark.parametrize("name", ENGINE_NAMES)
+def test_wrong_secret_is_rejected(name):
+    token = JWT_ENGINES[name](secret="another-secret").encode({"sub": "a"})
+
+    with pytest.raises(InvalidTokenError):
+        create_jwt_engine(name).decode(token)
+
+
+@pytest.mark.parametrize("name", ENGINE_NAMES)
+def test_garbage_is_rejected(name):
+    with pytest.raises(InvalidTokenError):
+        create_jwt_engine(name).decode("not.a.token")
+
+
+@pytest.mark.parametrize("name", ENGINE_NAMES)
+def test_only_the_canonical_encoding_of_a_token_is_accepted(name):
+    engine = create_jwt_engine(name)
+    token = engine.encode({"sub": "a@example.com", "exp": 4102444800})
+    signing_input, _, signature = token.rpartition(".")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    # Flipping the lowest bit of the last character only touches unused bits
+    last = alphabet[alphabet.index(signature[-1]) ^ 1]
+
+    for variant in (
+        f"{signing_input}.{signature[:5]}!!!!{signature[5:]}",
+        f"{signing_input}.{signature[:-1]}{last}",
+    ):
+        with pytest.raises(InvalidTokenError):
+            engine.decode(variant)
+    assert engine.decode(token)["sub"] == "a@example.com"
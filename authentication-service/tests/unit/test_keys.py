@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core.config import JWTKeyConfig
+from app.core.exceptions import AuthenticationException
+from app.core.jwt_engines import JWT_ENGINES, InvalidTokenError
+from app.core.keys import KeyRing, SigningKey
+from app.services.token_service import TokenService
+
+
+def _write_private_key(tmp_path, name, private_key):
+    path = tmp_path / f"{name}.pem"
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(path)
+
+
+def _write_public_key(tmp_path, name, private_key):
+    path = tmp_path / f"{name}.pub.pem"
+    path.write_bytes(
+        private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    return str(path)
+
+
+PRIVATE_KEYS = {
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "EdDSA": ed25519.Ed25519PrivateKey.generate,
+}
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+@pytest.mark.parametrize("algorithm", sorted(PRIVATE_KEYS))
+def test_sign_and_verify_with_kid(tmp_path, engine, algorithm):
+    private_key = PRIVATE_KEYS[algorithm]()
+    key = SigningKey.from_config(
+        JWTKeyConfig(
+            kid="k1",
+            algorithm=algorithm,
+            private_key_path=_write_private_key(tmp_path, "k1", private_key),
+        )
+    )
+    token_service = TokenService(JWT_ENGINES[engine](KeyRing([key])))
+
+    token = token_service.create_access_token(
+        {"sub": "a@example.com"}, timedelta(minutes=5)
+    )
+    payload = token_service.verify_token(token, token_type="access")
+
+    assert payload["sub"] == "a@example.com"
+    assert KeyRing([key]).jwks()["keys"][0]["kid"] == "k1"
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+def test_rotation_keeps_retired_key_verifiable(tmp_path, engine):
+    old_private = ec.generate_private_key(ec.SECP256R1())
+    old_config = JWTKeyConfig(
+        kid="old",
+        algorithm="ES256",
+        private_key_path=_write_private_key(tmp_path, "old", old_private),
+    )
+    new_config = JWTKeyConfig(
+        kid="new",
+        algorithm="EdDSA",
+        private_key_path=_write_private_key(
+            tmp_path, "new", ed25519.Ed25519PrivateKey.generate()
+        ),
+    )
+    old_token = TokenService(
+        JWT_ENGINES[engine](KeyRing([SigningKey.from_config(old_config)]))
+    ).create_access_token({"sub": "a@example.com"})
+
+    retired = JWTKeyConfig(
+        kid="old",
+        algorithm="ES256",
+        public_key_path=_write_public_key(tmp_path, "old", old_private),
+    )
+    ring = KeyRing(
+        [SigningKey.from_config(new_config), SigningKey.from_config(retired)],
+        active_kid="new",
+    )
+    token_service = TokenService(JWT_ENGINES[engine](ring))
+
+    assert token_service.verify_token(old_token)["sub"] == "a@example.com"
+    assert {jwk["kid"] for jwk in ring.jwks()["keys"]} == {"new", "old"}
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+def test_tampered_eddsa_token_is_rejected(tmp_path, engine):
+    key = SigningKey.from_config(
+        JWTKeyConfig(
+            kid="k1",
+            algorithm="EdDSA",
+            private_key_path=_write_private_key(
+                tmp_path, "k1", ed25519.Ed25519PrivateKey.generate()
+            ),
+        )
+    )
+    token_service = TokenService(JWT_ENGINES[engine](KeyRing([key])))
+    header, payload, signature = token_service.create_access_token(
+        {"sub": "a@example.com"}
+    ).split(".")
+
+    with pytest.raises(AuthenticationException):
+        token_service.verify_token(f"{header}.{payload}x.{signature}")
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+def test_expired_eddsa_token_is_rejected(tmp_path, engine):
+    key = SigningKey.from_config(
+        JWTKeyConfig(
+            kid="k1",
+            algorithm="EdDSA",
+            private_key_path=_write_private_key(
+                tmp_path, "k1", ed25519.Ed25519PrivateKey.generate()
+            ),
+        )
+    )
+    token_service = TokenService(JWT_ENGINES[engine](KeyRing([key])))
+    token = token_service.create_access_token(
+        {"sub": "a@example.com"}, timedelta(seconds=-1)
+    )
+
+    with pytest.raises(AuthenticationException, match="expired"):
+        token_service.verify_token(token)
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+def test_key_ring_with_asymmetric_default_algorithm(tmp_path, engine):
+    key = SigningKey.from_config(
+        JWTKeyConfig(
+            kid="k1",
+            algorithm="RS256",
+            private_key_path=_write_private_key(
+                tmp_path, "k1", PRIVATE_KEYS["RS256"]()
+            ),
+        )
+    )
+    jwt_engine = JWT_ENGINES[engine](KeyRing([key]), algorithm="RS256")
+    claims = {"sub": "a@example.com", "exp": 4102444800}
+
+    assert jwt_engine.decode(jwt_engine.encode(claims)) == claims
+    # Without a kid there is no key to check the token against
+    unsigned = JWT_ENGINES[engine](algorithm="HS256").encode(claims)
+    with pytest.raises(InvalidTokenError):
+        jwt_engine.decode(unsigned)
+    with pytest.raises(ValueError, match="JWT_SIGNING_KEYS"):
+        JWT_ENGINES[engine](algorithm="RS256")
+
+
+@pytest.mark.parametrize("engine", sorted(JWT_ENGINES))
+def test_tokens_without_kid_need_accept_legacy(tmp_path, engine):
+    key = SigningKey.from_config(
+        JWTKeyConfig(
+            kid="k1",
+            algorithm="ES256",
+            private_key_path=_write_private_key(
+                tmp_path, "k1", PRIVATE_KEYS["ES256"]()
+            ),
+        )
+    )
+    claims = {"sub": "a@example.com", "exp": 4102444800}
+    legacy = JWT_ENGINES[engine](algorithm="HS256").encode(claims)
+
+    with pytest.raises(InvalidTokenError):
+        JWT_ENGINES[engine](KeyRing([key]), algorithm="HS256").decode(legacy)
+    migrating = JWT_ENGINES[engine](
+        KeyRing([key]), algorithm="HS256", accept_legacy=True
+    )
+    assert migrating.decode(legacy) == claims
+
+
+@pytest.mark.parametrize(
+    "algorithm, private_key",
+    [
+        ("RS256", PRIVATE_KEYS["ES256"]),
+        ("ES256", PRIVATE_KEYS["RS256"]),
+        ("ES384", PRIVATE_KEYS["ES256"]),
+        ("EdDSA", PRIVATE_KEYS["ES256"]),
+    ],
+)
+def test_key_type_must_match_the_algorithm(tmp_path, algorithm, private_key):
+    key = private_key()
+    for paths in (
+        {"private_key_path": _write_private_key(tmp_path, "k1", key)},
+        {"public_key_path": _write_public_key(tmp_path, "k1", key)},
+    ):
+        with pytest.raises(ValueError, match=f"cannot be used with {algorithm}"):
+            SigningKey.from_config(JWTKeyConfig(kid="k1", algorithm=algorithm, **paths))
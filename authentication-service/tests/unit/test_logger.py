@@ -0,0 +1,66 @@
+import json
+import sys
+
+import pytest
+from loguru import logger
+
+from app.core.logger import LogConfig, LogSampler, log_sampler, setup_logging
+
+
+def _capture(sampler: LogSampler):
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}", filter=sampler)
+    return messages, handler_id
+
+
+def test_sampling_drops_routine_messages_but_keeps_warnings():
+    sampler = LogSampler(sampling={"token.validate": 0.0})
+    messages, handler_id = _capture(sampler)
+    category_logger = logger.bind(category="token.validate")
+
+    category_logger.info("Validating access token")
+    category_logger.warning("Token validation failed")
+    logger.info("Untagged message")
+    logger.remove(handler_id)
+
+    assert [m.strip() for m in messages] == [
+        "Token validation failed",
+        "Untagged message",
+    ]
+    assert sampler.dropped == {"token.validate": 1}
+
+
+def test_rate_limit_caps_messages_per_second():
+    sampler = LogSampler(rate_limits={"auth.login": 2})
+    messages, handler_id = _capture(sampler)
+    category_logger = logger.bind(category="auth.login")
+
+    for _ in range(5):
+        category_logger.info("Login successful")
+    logger.remove(handler_id)
+
+    assert len(messages) == 2
+    assert sampler.dropped["auth.login"] == 3
+
+
+@pytest.fixture
+def restore_logging():
+    # setup_logging replaces every handler; leave loguru's default behind
+    # instead of sinks writing to this test's tmp_path
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+def test_json_format(tmp_path, restore_logging):
+    log_file = tmp_path / "app.log"
+    setup_logging(LogConfig(JSON=True, ENQUEUE=False, FILE=str(log_file)))
+
+    logger.bind(category="auth.login").info("Login successful")
+    logger.complete()
+
+    entry = json.loads(log_file.read_text().strip().splitlines()[-1])
+    assert entry["msg"] == "Login successful"
+    assert entry["category"] == "auth.login"
+    assert entry["level"] == "INFO"
+    assert log_sampler.dropped == {}
@@ -0,0 +1,62 @@
+import pytest
+
+from app import main
+from app.services.user_import import get_import_executor
+
+
+class FakeService:
+    def __init__(self, events, name, fail=False):
+        self.events = events
+        self.name = name
+        self.fail = fail
+
+    async def start(self):
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed to start")
+        self.events.append(f"start {self.name}")
+
+    async def stop(self):
+        self.events.append(f"stop {self.name}")
+
+
+class FakeHasher:
+    def __init__(self, events):
+        self.events = events
+
+    def shutdown(self):
+        self.events.append("shutdown hasher")
+
+
+@pytest.mark.asyncio
+async def test_failed_startup_stops_what_already_started(monkeypatch):
+    events = []
+
+    async def dispose_engines():
+        events.append("dispose engines")
+
+    monkeypatch.setattr(main.settings, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(main, "init_services", lambda state: None)
+    monkeypatch.setattr(main, "get_password_hasher", lambda: FakeHasher(events))
+    monkeypatch.setattr(
+        main, "get_revocation_list", lambda: FakeService(events, "revocations")
+    )
+    monkeypatch.setattr(main, "get_refresh_token_families", lambda: None)
+    monkeypatch.setattr(
+        main, "get_token_versions", lambda: FakeService(events, "versions", True)
+    )
+    monkeypatch.setattr(main, "get_outbox", lambda: FakeService(events, "outbox"))
+    monkeypatch.setattr(main, "build_rpc_server", lambda auth_service: None)
+    monkeypatch.setattr(main, "dispose_engines", dispose_engines)
+    monkeypatch.setattr(main.app.state, "auth_service", None, raising=False)
+
+    with pytest.raises(RuntimeError, match="versions failed"):
+        async with main.lifespan(main.app):
+            pass
+
+    assert events == [
+        "start revocations",
+        "stop revocations",
+        "shutdown hasher",
+        "dispose engines",
+    ]
+    assert get_import_executor.cache_info().currsize == 0
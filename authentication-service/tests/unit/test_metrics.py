@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from app.core.metrics import (
+    MetricsMiddleware,
+    registry,
+    render_metrics,
+    time_phase,
+)
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def metrics_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="missing")
+        return {"id": item_id}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template(metrics_app):
+    ok = dict(method="GET", route="/items/{item_id}", status="200")
+    missing = dict(method="GET", route="/items/{item_id}", status="404")
+    ok_before = sample("http_requests_total", **ok)
+    missing_before = sample("http_requests_total", **missing)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=metrics_app), base_url="http://test"
+    ) as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/items/0")
+
+    assert sample("http_requests_total", **ok) == ok_before + 2
+    assert sample("http_requests_total", **missing) == missing_before + 1
+    assert sample("http_request_duration_seconds_count", **ok) >= 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_paths_share_one_label(metrics_app):
+    labels = dict(method="GET", route="unmatched", status="404")
+    before = sample("http_requests_total", **labels)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=metrics_app), base_url="http://test"
+    ) as client:
+        await client.get("/nope/1")
+        await client.get("/nope/2")
+
+    assert sample("http_requests_total", **labels) == before + 2
+
+
+def test_time_phase_observes_even_on_error():
+    before = sample("auth_phase_duration_seconds_count", phase="test_phase")
+
+    with time_phase("test_phase"):
+        pass
+    with pytest.raises(ValueError):
+        with time_phase("test_phase"):
+            raise ValueError
+
+    assert sample("auth_phase_duration_seconds_count", phase="test_phase") == (
+        before + 2
+    )
+    body, content_type = render_metrics()
+    assert b'auth_phase_duration_seconds_bucket{le="0.0001",phase="test_phase"}' in body
+    assert content_type.startswith("text/plain")
+
+
+def test_workers_sharing_a_multiprocess_dir_are_reported_together(tmp_path):
+    def run(code):
+        return subprocess.run(
+            [sys.executable, "-c", "from app.core import metrics\n" + code],
+            env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)},
+            capture_output=True,
+            check=True,
+        ).stdout
+
+    for _ in range(2):
+        run("metrics.observe_phase('worker_phase', 0.01)")
+    body = run("import sys; sys.stdout.buffer.write(metrics.render_metrics()[0])")
+
+    assert b'auth_phase_duration_seconds_count{phase="worker_phase"} 2.0' in body
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import DuplicateEntityException
+from app.models import OutboxEvent
+from app.schemas.user import UserCreate
+from app.services.outbox import (
+    EVENT_USER_DEACTIVATED,
+    EVENT_USER_LOGGED_IN,
+    EVENT_USER_REGISTERED,
+    InMemoryEventBroker,
+    Outbox,
+)
+from app.services.user_cache import InMemoryUserCacheBackend, UserCache
+from app.services.user_service import UserService
+from tests.unit.conftest import FakeHasher
+
+
+@pytest.fixture
+def broker():
+    return InMemoryEventBroker()
+
+
+@pytest.fixture
+def outbox(session_factory, broker):
+    return Outbox(session_factory, broker, batch_size=2)
+
+
+def _user_service(outbox) -> UserService:
+    return UserService(
+        FakeHasher(), UserCache(InMemoryUserCacheBackend()), outbox=outbox
+    )
+
+
+def _user(email: str = "a@example.com") -> UserCreate:
+    return UserCreate(email=email, password="strongpassword123", full_name="A")
+
+
+async def _stored(session_factory) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(func.count(OutboxEvent.id)))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_user_changes_commit_their_events(session_factory, outbox, broker):
+    user_service = _user_service(outbox)
+    async with session_factory() as db:
+        user = await user_service.register_user(db, _user())
+        with pytest.raises(DuplicateEntityException):
+            await _user_service(outbox).register_user(db, _user())
+        await user_service.deactivate_user(db, "a@example.com")
+        await user_service.deactivate_user(db, "missing@example.com")
+
+    assert await _stored(session_factory) == 2
+    assert await outbox.drain() == 2
+    assert await _stored(session_factory) == 0
+
+    registered, deactivated = broker.messages
+    assert registered["type"] == EVENT_USER_REGISTERED
+    assert registered["subject"] == "a@example.com"
+    assert registered["data"] == {"user_id": user.id, "full_name": "A"}
+    assert deactivated["type"] == EVENT_USER_DEACTIVATED
+    assert deactivated["id"] > registered["id"]
+
+
+@pytest.mark.asyncio
+async def test_buffered_events_are_written_and_published_in_batches(
+    session_factory, outbox, broker
+):
+    for i in range(5):
+        outbox.enqueue(EVENT_USER_LOGGED_IN, f"{i}@example.com", {"user_id": i})
+    assert outbox.stats.buffered == 5
+    assert await _stored(session_factory) == 0
+
+    assert await outbox.drain() == 5
+    assert [m["subject"] for m in broker.messages] == [
+        f"{i}@example.com" for i in range(5)
+    ]
+    assert outbox.stats.batches == 3
+    assert outbox.stats.buffered == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_retried_with_backoff(session_factory, broker):
+    outbox = Outbox(session_factory, broker, retry_base_seconds=60)
+    outbox.enqueue(EVENT_USER_LOGGED_IN, "a@example.com", {"user_id": 1})
+    broker.fail_next = 1
+
+    assert await outbox.drain() == 0
+    assert outbox.stats.publish_errors == 1
+    async with session_factory() as db:
+        event = (await db.execute(select(OutboxEvent))).scalar_one()
+    assert event.attempts == 1
+    assert (event.next_attempt_at - datetime.now()).total_seconds() > 50
+
+    # Not due yet
+    assert await outbox.drain() == 0
+    assert broker.messages == []
+
+    async with session_factory() as db:
+        event = await db.get(OutboxEvent, event.id)
+        event.next_attempt_at = datetime.now()
+        await db.commit()
+    assert await outbox.drain() == 1
+    assert broker.messages[0]["subject"] == "a@example.com"
+
+
+@pytest.mark.asyncio
+async def test_buffer_is_bounded(session_factory, broker):
+    outbox = Outbox(session_factory, broker, max_buffered=2)
+    for _ in range(3):
+        outbox.enqueue(EVENT_USER_LOGGED_IN, "a@example.com", {"user_id": 1})
+
+    assert outbox.stats.dropped == 1
+    await outbox.stop()
+    assert await _stored(session_factory) == 2
@@ -0,0 +1,140 @@
+import ipaddress
+import time
+
+import pytest
+
+from app.core.exceptions import RateLimitException
+from app.services.rate_limit import (
+    InMemoryRateLimitBackend,
+    LoginRateLimiter,
+    RedisRateLimitBackend,
+    client_ip,
+)
+
+
+class FakeRedis:
+    """Local stand-in implementing the subset of the Redis API the backend uses."""
+
+    def __init__(self):
+        self.store = {}
+
+    def _live(self, key):
+        value, expires_at = self.store.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None, None
+        return value, expires_at
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and self._live(key)[0] is not None:
+            return None
+        self.store[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    async def incr(self, key):
+        value, expires_at = self._live(key)
+        self.store[key] = ((value or 0) + 1, expires_at)
+        return self.store[key][0]
+
+    async def pttl(self, key):
+        value, expires_at = self._live(key)
+        if value is None:
+            return -2
+        return int((expires_at - time.monotonic()) * 1000)
+
+
+class BrokenRedis:
+    async def set(self, *args, **kwargs):
+        raise ConnectionError("connection refused")
+
+
+@pytest.mark.asyncio
+async def test_bucket_rejects_once_empty_and_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    backend = InMemoryRateLimitBackend()
+
+    for _ in range(3):
+        assert await backend.hit("key", limit=3, window_seconds=60) == 0
+    assert await backend.hit("key", limit=3, window_seconds=60) == pytest.approx(20)
+
+    now[0] += 20
+    assert await backend.hit("key", limit=3, window_seconds=60) == 0
+
+
+@pytest.mark.asyncio
+async def test_bucket_evicts_least_recently_used_keys():
+    backend = InMemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        await backend.hit(key, limit=1, window_seconds=60)
+
+    assert list(backend._buckets) == ["b", "c"]
+    assert await backend.hit("a", limit=1, window_seconds=60) == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_throttles_per_email_regardless_of_case():
+    limiter = LoginRateLimiter(InMemoryRateLimitBackend(), per_email=2, per_ip=100)
+    await limiter.check("a@example.com", "10.0.0.1")
+    await limiter.check("A@Example.com", "10.0.0.2")
+
+    with pytest.raises(RateLimitException) as exc_info:
+        await limiter.check("a@example.com", "10.0.0.3")
+    assert exc_info.value.retry_after == 30
+
+    await limiter.check("b@example.com", "10.0.0.3")
+    assert limiter.stats.snapshot() == {
+        "allowed": 3,
+        "rejected_email": 1,
+        "rejected_ip": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_limiter_throttles_per_client_ip():
+    limiter = LoginRateLimiter(InMemoryRateLimitBackend(), per_email=10, per_ip=2)
+    await limiter.check("a@example.com", "10.0.0.1")
+    await limiter.check("b@example.com", "10.0.0.1")
+
+    with pytest.raises(RateLimitException, match="address"):
+        await limiter.check("c@example.com", "10.0.0.1")
+    await limiter.check("c@example.com", "10.0.0.2")
+    assert limiter.stats.rejected_ip == 1
+
+
+@pytest.mark.asyncio
+async def test_per_ip_limit_is_off_by_default():
+    limiter = LoginRateLimiter(InMemoryRateLimitBackend(), per_email=2)
+    for i in range(5):
+        await limiter.check(f"{i}@example.com", "10.0.0.1")
+    assert limiter.stats.rejected_ip == 0
+
+
+def test_forwarded_address_is_only_trusted_from_proxies():
+    proxies = [ipaddress.ip_network("172.18.0.0/16")]
+
+    # The broker appends the address it saw to whatever the client sent
+    assert client_ip("172.18.0.5", "6.6.6.6, 203.0.113.7", proxies) == "203.0.113.7"
+    assert client_ip("172.18.0.5", "203.0.113.7, 172.18.0.9", proxies) == "203.0.113.7"
+    assert client_ip("203.0.113.7", "6.6.6.6", proxies) == "203.0.113.7"
+    assert client_ip("172.18.0.5", None, proxies) == "172.18.0.5"
+    assert client_ip("172.18.0.5", "6.6.6.6", []) == "172.18.0.5"
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_counts_within_a_shared_window():
+    client = FakeRedis()
+    first = LoginRateLimiter(RedisRateLimitBackend(client), per_email=2, per_ip=100)
+    second = LoginRateLimiter(RedisRateLimitBackend(client), per_email=2, per_ip=100)
+
+    await first.check("a@example.com", None)
+    await second.check("a@example.com", None)
+    with pytest.raises(RateLimitException) as exc_info:
+        await first.check("a@example.com", None)
+    assert 0 < exc_info.value.retry_after <= 60
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_allows_attempts_when_unreachable():
+    backend = RedisRateLimitBackend(BrokenRedis())
+    assert await backend.hit("key", limit=1, window_seconds=60) == 0
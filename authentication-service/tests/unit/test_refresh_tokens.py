@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import AuthenticationException
+from app.models import RefreshTokenFamily
+from app.services.auth_service import AuthService
+from app.services.refresh_tokens import FamilyState, RefreshTokenFamilies
+from app.services.revocation import RevocationList
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from tests.unit.conftest import FakeUserService, make_snapshot
+
+
+@pytest.fixture
+def families(session_factory):
+    return RefreshTokenFamilies(session_factory)
+
+
+@pytest.fixture
+def auth_service(session_factory, families):
+    return AuthService(
+        FakeUserService(make_snapshot(1, "a@example.com")),
+        TokenService(),
+        TokenValidationCache(),
+        RevocationList(session_factory),
+        families,
+    )
+
+
+def _expires(days: float = 7) -> datetime:
+    return datetime.now() + timedelta(days=days)
+
+
+def _token(subject: str, claims: dict) -> dict:
+    return {"sub": subject, "exp": int(_expires().timestamp()), **claims}
+
+
+async def _stored(session_factory, family_id):
+    async with session_factory() as db:
+        return await db.get(RefreshTokenFamily, family_id)
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_and_old_token_reuse_kills_family(
+    session_factory, auth_service
+):
+    first = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))
+
+    async with session_factory() as db:
+        second = await auth_service.refresh_tokens(db, first["refresh_token"])
+        third = await auth_service.refresh_tokens(db, second["refresh_token"])
+
+        with pytest.raises(AuthenticationException, match="already been used"):
+            await auth_service.refresh_tokens(db, first["refresh_token"])
+        # The legitimate newest token dies with its family
+        with pytest.raises(AuthenticationException, match="revoked"):
+            await auth_service.refresh_tokens(db, third["refresh_token"])
+
+    assert auth_service.refresh_families.stats.reuse_detected == 1
+
+
+@pytest.mark.asyncio
+async def test_new_families_are_written_behind_in_one_batch(session_factory, families):
+    claims = [families.start_family(f"u{i}@example.com", _expires()) for i in range(3)]
+    assert await _stored(session_factory, claims[1]["fid"]) is None
+
+    # A rotation is written through, including its not yet flushed family
+    async with session_factory() as db:
+        await families.rotate(db, _token("u0@example.com", claims[0]), _expires())
+    stored = await _stored(session_factory, claims[0]["fid"])
+    assert stored.generation == 1
+    assert not stored.revoked
+
+    assert await families.flush() == 2
+    assert families.stats.flushes == 1
+    assert await _stored(session_factory, claims[1]["fid"]) is not None
+
+
+@pytest.mark.asyncio
+async def test_other_process_sees_flushed_state(session_factory, families):
+    claims = families.start_family("a@example.com", _expires())
+    async with session_factory() as db:
+        rotated = await families.rotate(db, _token("a@example.com", claims), _expires())
+    await families.flush()
+
+    other = RefreshTokenFamilies(session_factory)
+    async with session_factory() as db:
+        with pytest.raises(AuthenticationException, match="already been used"):
+            await other.rotate(db, _token("a@example.com", claims), _expires())
+    assert other.stats.db_loads == 1
+    assert (await _stored(session_factory, rotated["fid"])).revoked
+
+
+@pytest.mark.asyncio
+async def test_processes_sharing_a_database_agree_on_every_rotation(
+    session_factory,
+):
+    a, b = RefreshTokenFamilies(session_factory), RefreshTokenFamilies(session_factory)
+    claims = a.start_family("a@example.com", _expires())
+    await a.flush()
+    token = _token("a@example.com", claims)
+
+    async with session_factory() as db:
+        await a.rotate(db, token, _expires())
+        # Already consumed through the other process: a replay
+        with pytest.raises(AuthenticationException, match="already been used"):
+            await b.rotate(db, token, _expires())
+        with pytest.raises(AuthenticationException, match="revoked"):
+            await a.rotate(db, {**token, "gen": 1}, _expires())
+
+    assert (await _stored(session_factory, claims["fid"])).revoked
+
+
+@pytest.mark.asyncio
+async def test_unflushed_family_is_rotated_once_across_processes(session_factory):
+    a, b = RefreshTokenFamilies(session_factory), RefreshTokenFamilies(session_factory)
+    claims = a.start_family("a@example.com", _expires())
+    token = _token("a@example.com", claims)
+
+    async with session_factory() as db:
+        assert await b.rotate(db, token, _expires()) == {**claims, "gen": 1}
+        with pytest.raises(AuthenticationException, match="already been used"):
+            await a.rotate(db, token, _expires())
+
+    # The late flush of the start does not resurrect the family
+    await a.flush()
+    stored = await _stored(session_factory, claims["fid"])
+    assert stored.revoked and stored.generation == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_never_moves_a_family_backwards(session_factory, families):
+    claims = families.start_family("a@example.com", _expires())
+    async with session_factory() as db:
+        for generation in range(3):
+            await families.rotate(
+                db, _token("a@example.com", {**claims, "gen": generation}), _expires()
+            )
+    await families.flush()
+
+    stale = RefreshTokenFamilies(session_factory)
+    stale._mark_dirty(claims["fid"], FamilyState("a@example.com", 0, _expires()))
+    await stale.flush()
+
+    assert (await _stored(session_factory, claims["fid"])).generation == 3
+
+
+@pytest.mark.asyncio
+async def test_reaper_purges_expired_families(session_factory, families):
+    live = families.start_family("a@example.com", _expires())
+    families.start_family("b@example.com", _expires(days=-1))
+    await families.flush()
+
+    assert await families.reap() == 1
+    async with session_factory() as db:
+        count = (
+            await db.execute(select(func.count(RefreshTokenFamily.family_id)))
+        ).scalar()
+    assert count == 1
+    assert await _stored(session_factory, live["fid"]) is not None
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_the_refresh_family(session_factory, auth_service):
+    tokens = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))
+
+    async with session_factory() as db:
+        await auth_service.revoke_tokens(
+            db, tokens["access_token"], tokens["refresh_token"]
+        )
+        payload = auth_service.token_service.verify_token(tokens["refresh_token"])
+
+    assert (await _stored(session_factory, payload["fid"])).revoked
@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.responses import json_response, model_response
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+
+def _user(email: str = "a@example.com") -> User:
+    now = datetime(2025, 2, 1, 12, 30)
+    return User(
+        id=1,
+        email=email,
+        full_name="A",
+        hashed_password=b"hash",
+        is_active=True,
+        is_superuser=False,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def test_model_response_matches_the_default_encoding():
+    response = model_response(UserResponse, _user(), status_code=201)
+
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == jsonable_encoder(
+        UserResponse.model_validate(_user())
+    )
+    assert b"hash" not in response.body
+
+
+def test_response_validation_can_be_turned_back_on(monkeypatch):
+    # Trusted rows are copied as-is by default
+    model_response(UserResponse, _user(email="not-an-email"))
+
+    monkeypatch.setattr(settings, "RESPONSE_VALIDATION", True)
+    with pytest.raises(ValidationError):
+        model_response(UserResponse, _user(email="not-an-email"))
+
+
+def test_json_response_encodes_plain_payloads():
+    response = json_response({"valid": True, "user_id": 1, "full_name": "Zoë"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == {
+        "valid": True,
+        "user_id": 1,
+        "full_name": "Zoë",
+    }
@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.exceptions import AuthenticationException
+from app.models import RevokedToken
+from app.services.auth_service import AuthService
+from app.services.revocation import BloomFilter, RevocationList
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from tests.unit.conftest import FakeUserService, make_snapshot
+
+
+def _payload(jti: str, expires_in: float = 3600) -> dict:
+    return {"sub": "a@example.com", "jti": jti, "exp": int(time.time() + expires_in)}
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for i in range(10_000):
+        bloom.add(f"revoked-{i}")
+
+    assert all(f"revoked-{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"active-{i}" in bloom for i in range(10_000))
+    assert false_positives < 250
+
+
+@pytest.mark.asyncio
+async def test_unrevoked_tokens_never_reach_the_database(session_factory):
+    revocations = RevocationList(session_factory)
+
+    async with session_factory() as db:
+        await revocations.revoke(db, _payload("revoked"))
+        assert await revocations.is_revoked(db, "revoked")
+        assert not await revocations.is_revoked(db, "active")
+        assert not await revocations.is_revoked(db, None)
+
+    assert revocations.stats.db_lookups == 1
+    assert revocations.stats.filter_misses == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_picks_up_revocations_from_other_processes(session_factory):
+    writer = RevocationList(session_factory)
+    reader = RevocationList(session_factory)
+    async with session_factory() as db:
+        await writer.revoke(db, _payload("elsewhere"))
+        await writer.revoke(db, _payload("expired", expires_in=-60))
+
+        assert not await reader.is_revoked(db, "elsewhere")
+        await reader.sync()
+        assert await reader.is_revoked(db, "elsewhere")
+        assert "expired" not in reader.filter
+
+
+@pytest.mark.asyncio
+async def test_prune_deletes_expired_revocations(session_factory):
+    revocations = RevocationList(session_factory)
+    async with session_factory() as db:
+        await revocations.revoke(db, _payload("live"))
+        await revocations.revoke(db, _payload("expired", expires_in=-60))
+
+    assert await revocations.prune() == 1
+    async with session_factory() as db:
+        remaining = (await db.execute(select(func.count(RevokedToken.jti)))).scalar()
+    assert remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_revoked_tokens_fail_validation_and_refresh(session_factory):
+    token_service = TokenService()
+    auth_service = AuthService(
+        FakeUserService(make_snapshot(1, "a@example.com")),
+        token_service,
+        TokenValidationCache(),
+        RevocationList(session_factory),
+    )
+    access_token = token_service.create_access_token(
+        {"sub": "a@example.com"}, timedelta(minutes=5)
+    )
+    refresh_token = token_service.create_refresh_token(
+        {"sub": "a@example.com"}, timedelta(days=1)
+    )
+
+    async with session_factory() as db:
+        await auth_service.validate_access_token(db, access_token)
+        assert await auth_service.revoke_tokens(db, access_token, refresh_token) == 2
+
+        with pytest.raises(AuthenticationException, match="revoked"):
+            await auth_service.validate_access_token(db, access_token)
+        with pytest.raises(AuthenticationException, match="revoked"):
+            await auth_service.refresh_tokens(db, refresh_token)
+        [result] = await auth_service.validate_access_tokens(db, [access_token])
+        assert result == {"valid": False, "detail": "Token has been revoked"}
+
+        stored = await db.get(
+            RevokedToken, token_service.verify_token(access_token)["jti"]
+        )
+        assert stored.expires_at > datetime.now()
+
+
+@pytest.mark.asyncio
+async def test_cached_tokens_are_rejected_once_another_worker_revokes_them(
+    session_factory,
+):
+    token_service = TokenService()
+    user_service = FakeUserService(make_snapshot(1, "a@example.com"))
+    revoking = AuthService(
+        user_service,
+        token_service,
+        TokenValidationCache(),
+        RevocationList(session_factory),
+    )
+    other_revocations = RevocationList(session_factory)
+    other = AuthService(
+        user_service, token_service, TokenValidationCache(), other_revocations
+    )
+    access_token = token_service.create_access_token(
+        {"sub": "a@example.com"}, timedelta(minutes=5)
+    )
+
+    async with session_factory() as db:
+        await other.validate_access_token(db, access_token)
+        await revoking.revoke_tokens(db, access_token)
+        await other_revocations.sync()
+
+        with pytest.raises(AuthenticationException, match="revoked"):
+            await other.validate_access_token(db, access_token)
+        [result] = await other.validate_access_tokens(db, [access_token])
+        assert result == {"valid": False, "detail": "Token has been revoked"}
+    assert other.token_cache.lookup(access_token) is None
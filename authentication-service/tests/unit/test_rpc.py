@@ -0,0 +1,119 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app.core.exceptions import RPCCallException
+from app.rpc.client import AuthRPCClient
+from app.rpc.protocol import encode_frame, read_frame
+from app.rpc.server import AuthRPCServer
+from app.services.auth_service import AuthService
+from app.services.refresh_tokens import RefreshTokenFamilies
+from app.services.revocation import RevocationList
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from tests.unit.conftest import FakeUserService, make_snapshot
+
+
+@pytest.fixture
+def auth_service(session_factory):
+    return AuthService(
+        FakeUserService(make_snapshot(1, "a@example.com")),
+        TokenService(),
+        TokenValidationCache(),
+        RevocationList(session_factory),
+        RefreshTokenFamilies(session_factory),
+    )
+
+
+@pytest.fixture
+async def server(auth_service, session_factory):
+    server = AuthRPCServer(auth_service, session_factory, host="127.0.0.1", port=0)
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def client(server):
+    async with AuthRPCClient("127.0.0.1", server.port) as client:
+        yield client
+
+
+def make_access_token(email: str = "a@example.com") -> str:
+    return TokenService().create_access_token(
+        data={"sub": email}, expires_delta=timedelta(minutes=5)
+    )
+
+
+@pytest.mark.asyncio
+async def test_validate_and_batch_validate(client):
+    token = make_access_token()
+
+    result = await client.validate(token)
+    assert result["valid"] is True
+    assert result["email"] == "a@example.com"
+
+    results = await client.validate_batch([token, "garbage"])
+    assert [r["valid"] for r in results] == [True, False]
+
+    with pytest.raises(RPCCallException) as error:
+        await client.validate("garbage")
+    assert error.value.status == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_tokens(client, auth_service):
+    issued = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))
+
+    refreshed = await client.refresh(issued["refresh_token"])
+    assert refreshed["refresh_token"] != issued["refresh_token"]
+
+    with pytest.raises(RPCCallException) as error:
+        await client.refresh(issued["refresh_token"])
+    assert error.value.status == 401
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_connection(client):
+    tokens = [make_access_token() for _ in range(20)]
+
+    results = await asyncio.gather(
+        *(client.validate(token) for token in tokens), client.ping()
+    )
+
+    assert all(result["valid"] for result in results[:-1])
+    assert results[-1] == "pong"
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_get_400_and_bad_frames_close_the_connection(server):
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+
+    writer.write(encode_frame([1, "nope", None]) + encode_frame([2, "validate", 7]))
+    assert await read_frame(reader, 1024) == [1, 400, "Unknown operation: nope"]
+    assert await read_frame(reader, 1024) == [2, 400, "Access token is required"]
+
+    writer.write(b"\xff\xff\xff\xff")
+    assert await read_frame(reader, 1024) is None
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_stop_answers_in_flight_requests_then_drops_slow_ones(server):
+    async def slow_ping(argument):
+        await asyncio.sleep(argument)
+        return "pong"
+
+    server._handlers["ping"] = slow_ping
+    server.shutdown_timeout = 0.5
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    writer.write(encode_frame([1, "ping", 0.1]) + encode_frame([2, "ping", 60]))
+    await writer.drain()
+    await asyncio.sleep(0.05)
+
+    await asyncio.wait_for(server.stop(), timeout=5)
+
+    assert await read_frame(reader, 1024) == [1, 200, "pong"]
+    assert await read_frame(reader, 1024) is None
+    writer.close()
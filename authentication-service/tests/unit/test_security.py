@@ -0,0 +1,151 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core import security
+from app.core.exceptions import ServiceUnavailableException
+from app.core.security import Argon2Scheme, BcryptScheme, PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_roundtrip():
+    hasher = PasswordHasher(max_workers=2)
+    hashed = await hasher.hash("strongpassword123")
+
+    assert await hasher.verify("strongpassword123", hashed)
+    assert not await hasher.verify("wrongpassword", hashed)
+    assert hasher.stats.completed == 3
+    assert hasher.stats.hash_seconds_total > 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_event_loop():
+    hasher = PasswordHasher(max_workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    await hasher.hash("strongpassword123")
+    task.cancel()
+
+    assert ticks > 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected():
+    hasher = PasswordHasher(max_workers=1, queue_size=1, queue_timeout=None)
+    tasks = [asyncio.create_task(hasher.hash("strongpassword123")) for _ in range(3)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    rejected = [r for r in results if isinstance(r, ServiceUnavailableException)]
+    assert len(rejected) == 1
+    assert hasher.stats.rejected == 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout():
+    hasher = PasswordHasher(max_workers=1, queue_size=10, queue_timeout=0.001)
+    tasks = [asyncio.create_task(hasher.hash("strongpassword123")) for _ in range(2)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert any(isinstance(r, ServiceUnavailableException) for r in results)
+    assert hasher.stats.timed_out == 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_waits_never_leak_a_slot():
+    hasher = PasswordHasher(max_workers=1, queue_size=50, queue_timeout=0.002)
+    tasks = [asyncio.create_task(hasher.hash("strongpassword123")) for _ in range(20)]
+    for task in tasks[::3]:
+        await asyncio.sleep(0)
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert hasher._slots._value == 1
+    assert await hasher.hash("strongpassword123")
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_under_a_new_bcrypt_cost():
+    old = PasswordHasher(scheme=BcryptScheme(rounds=4), max_workers=1)
+    hashed = await old.hash("strongpassword123")
+    assert not old.needs_rehash(hashed)
+
+    new = PasswordHasher(scheme=BcryptScheme(rounds=5), max_workers=1)
+    assert new.needs_rehash(hashed)
+    assert await new.verify_and_update("wrongpassword", hashed) == (False, None)
+
+    matches, new_hash = await new.verify_and_update("strongpassword123", hashed)
+    assert matches
+    assert new_hash.startswith(b"$2b$05$")
+    assert await new.verify_and_update("strongpassword123", new_hash) == (True, None)
+    assert new.stats.rehashed == 1
+    old.shutdown()
+    new.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_switching_to_argon2_still_verifies_bcrypt_hashes():
+    bcrypt_hash = await PasswordHasher(scheme=BcryptScheme(rounds=4)).hash(
+        "strongpassword123"
+    )
+    hasher = PasswordHasher(
+        scheme=Argon2Scheme(time_cost=1, memory_cost=1024, parallelism=1)
+    )
+
+    assert await hasher.verify("strongpassword123", bcrypt_hash)
+    matches, argon2_hash = await hasher.verify_and_update(
+        "strongpassword123", bcrypt_hash
+    )
+    assert matches
+    assert argon2_hash.startswith(b"$argon2id$")
+    assert await hasher.verify("strongpassword123", argon2_hash)
+    assert not await hasher.verify("wrongpassword", argon2_hash)
+    assert not hasher.needs_rehash(argon2_hash)
+    hasher.shutdown()
+
+
+def test_calibration_stays_within_bounds_and_target(monkeypatch):
+    timings = {10: 0.05}
+    monkeypatch.setattr(security, "_time_hash", lambda scheme: timings[scheme.rounds])
+
+    assert BcryptScheme().calibrated(0.25).rounds == 12
+    assert BcryptScheme().calibrated(0.01).rounds == 10
+    assert BcryptScheme().calibrated(60).rounds == 16
+
+
+@pytest.mark.asyncio
+async def test_warm_up_starts_every_worker():
+    hasher = PasswordHasher(max_workers=3)
+    await hasher.warm_up()
+
+    assert len(hasher.executor._threads) == 3
+    hasher.shutdown()
+
+
+def test_workers_inherit_the_policy_calibrated_once(monkeypatch):
+    timings = {10: 0.05}
+    monkeypatch.setattr(security, "_time_hash", lambda scheme: timings[scheme.rounds])
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_SCHEME", "bcrypt")
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_TARGET_SECONDS", 0.25)
+    for name in ("BCRYPT_ROUNDS", "PASSWORD_HASH_TARGET_SECONDS"):
+        monkeypatch.delenv(name, raising=False)
+
+    assert security.calibrate_for_workers().rounds == 12
+    assert os.environ["BCRYPT_ROUNDS"] == "12"
+    assert os.environ["PASSWORD_HASH_TARGET_SECONDS"] == "0"
+
+    worker_settings = type(security.settings)()
+    assert worker_settings.BCRYPT_ROUNDS == 12
+    assert not worker_settings.PASSWORD_HASH_TARGET_SECONDS
@@ -0,0 +1,148 @@
+import os
+import threading
+
+import pytest
+
+from app.cli import serve
+from app.cli.serve import ServerOptions, Supervisor, available_cpus, load_hook
+
+
+class FakeProcess:
+    def __init__(self, pid, alive=True, exitcode=None):
+        self.pid = pid
+        self.alive = alive
+        self.exitcode = exitcode
+        self.terminated = False
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        self.terminated = True
+
+
+class FakeSupervisor(Supervisor):
+    def __init__(self, **overrides):
+        options = ServerOptions(
+            host="127.0.0.1",
+            port=0,
+            workers=1,
+            reuse_port=True,
+            loop="asyncio",
+            http="h11",
+            max_requests=None,
+            max_requests_jitter=0,
+            max_rss_mb=None,
+            graceful_timeout=5,
+            startup_hook=None,
+        )
+        for name, value in overrides.items():
+            setattr(options, name, value)
+        super().__init__(options)
+        self.next_pid = 100
+
+    def spawn(self, worker_id):
+        self.next_pid += 1
+        self.workers[worker_id] = FakeProcess(self.next_pid)
+        self.ready[worker_id] = threading.Event()
+        self.started_at[worker_id] = serve.time.monotonic()
+
+
+@pytest.mark.parametrize(
+    "cpu_max, expected",
+    [("max 100000", None), ("150000 100000", 2), ("50000 100000", 1)],
+)
+def test_available_cpus_honours_the_cgroup_quota(tmp_path, cpu_max, expected):
+    path = tmp_path / "cpu.max"
+    path.write_text(cpu_max)
+    unrestricted = len(os.sched_getaffinity(0))
+
+    assert available_cpus(str(path)) == min(unrestricted, expected or unrestricted)
+    assert available_cpus(str(tmp_path / "missing")) == unrestricted
+
+
+def test_load_hook_requires_module_and_function():
+    assert load_hook("os.path:join") is os.path.join
+    with pytest.raises(ValueError):
+        load_hook("os.path")
+
+
+def test_worker_crashing_on_startup_is_restarted_with_backoff():
+    supervisor = FakeSupervisor()
+    supervisor.spawn(0)
+
+    for attempt, delay in enumerate([1, 3, 7]):
+        supervisor.workers[0].alive = False
+        supervisor.workers[0].exitcode = 1
+        supervisor.check_workers()
+        scheduled = supervisor.restart_at[0] - serve.time.monotonic()
+        assert scheduled == pytest.approx(delay, abs=0.1)
+
+        supervisor.restart_at[0] = 0
+        supervisor.check_workers()
+        assert 0 not in supervisor.restart_at
+        assert supervisor.workers[0].pid == 102 + attempt
+
+
+def test_worker_over_the_rss_limit_stops_once_its_replacement_is_ready(monkeypatch):
+    rss = {101: 600 * 1024 * 1024}
+    monkeypatch.setattr(serve, "rss_bytes", lambda pid: rss.get(pid, 0))
+    supervisor = FakeSupervisor(max_rss_mb=512)
+    supervisor.spawn(0)
+    old = supervisor.workers[0]
+
+    supervisor.check_workers()
+    assert supervisor.workers[0] is not old
+    assert not old.terminated
+
+    # The old worker keeps serving until its replacement is ready
+    supervisor.check_workers()
+    assert not old.terminated
+    supervisor.ready[0].set()
+    supervisor.check_workers()
+    assert old.terminated
+    assert old in supervisor.retiring
+
+    old.alive = False
+    supervisor.check_workers()
+    assert not supervisor.retiring
+
+
+def test_metrics_dir_is_only_set_up_for_several_workers(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    assert serve.prepare_metrics_dir(1) is None
+    assert "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+
+    created = serve.prepare_metrics_dir(2)
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == created
+    assert os.path.isdir(created)
+    os.rmdir(created)
+
+    stale = tmp_path / "counter_123.db"
+    stale.write_bytes(b"")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert serve.prepare_metrics_dir(2) is None
+    assert not stale.exists()
+
+
+@pytest.mark.asyncio
+async def test_ready_is_signalled_after_startup_unless_it_failed():
+    class FakeServer:
+        should_exit = False
+
+        async def startup(self, sockets=None):
+            pass
+
+    server = FakeServer()
+    ready = threading.Event()
+    serve.signal_when_serving(server, ready)
+    server.should_exit = True
+    await server.startup()
+    assert not ready.is_set()
+
+    server.should_exit = False
+    await server.startup()
+    assert ready.is_set()
@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app.core import shared_memory
+from app.core.shared_memory import SharedMemoryTable, digest, tag_for
+from app.services.token_cache import SharedTokenValidationCache
+from app.services.user_cache import SharedMemoryUserCacheBackend, UserSnapshot
+
+
+def _table(tmp_path, **kwargs) -> SharedMemoryTable:
+    return SharedMemoryTable(str(tmp_path / "table.cache"), **kwargs)
+
+
+def _write_and_exit(path: str, key: bytes) -> None:
+    table = SharedMemoryTable(path, slots=64)
+    table.set(key, b"from another process", time.time() + 60)
+
+
+def _lock_and_die(path: str, key: bytes) -> None:
+    table = SharedMemoryTable(path, slots=64)
+    bucket_offset = table._bucket_offset(key)
+    table._locked(bucket_offset, table.bucket_bytes).__enter__()
+    os._exit(1)
+
+
+def test_entries_are_visible_to_every_opener(tmp_path):
+    writer = _table(tmp_path, slots=64)
+    reader = _table(tmp_path, slots=64)
+
+    writer.set(digest("a"), b"value", time.time() + 60)
+
+    assert reader.get(digest("a")) == b"value"
+    assert reader.get(digest("b")) is None
+    assert reader.delete(digest("a"))
+    assert writer.get(digest("a")) is None
+
+
+def test_entries_expire_and_oversized_values_are_skipped(tmp_path, monkeypatch):
+    table = _table(tmp_path, slots=64, slot_bytes=64)
+    table.set(digest("a"), b"value", time.time() + 10)
+
+    monkeypatch.setattr(shared_memory.time, "time", lambda: 2 * 10**10)
+    assert table.get(digest("a")) is None
+    assert table.stats.expired_reads == 1
+
+    assert not table.set(digest("b"), b"x" * 64, 3 * 10**10)
+    assert table.stats.oversized == 1
+
+
+def test_full_bucket_evicts_the_entry_closest_to_expiry(tmp_path):
+    table = _table(tmp_path, slots=2, ways=2)
+    now = time.time()
+    table.set(digest("a"), b"a", now + 30)
+    table.set(digest("b"), b"b", now + 10)
+    table.set(digest("c"), b"c", now + 20)
+
+    assert table.get(digest("b")) is None
+    assert table.get(digest("a")) == b"a"
+    assert table.get(digest("c")) == b"c"
+    assert table.stats.evictions == 1
+
+
+def test_layout_mismatch_is_rejected(tmp_path):
+    _table(tmp_path, slots=64)
+    with pytest.raises(ValueError):
+        _table(tmp_path, slots=64, slot_bytes=256)
+
+
+def test_delete_tagged_removes_only_that_tag(tmp_path):
+    table = _table(tmp_path, slots=64)
+    expires_at = time.time() + 60
+    table.set(digest("a1"), b"1", expires_at, tag=tag_for("a@example.com"))
+    table.set(digest("a2"), b"2", expires_at, tag=tag_for("a@example.com"))
+    table.set(digest("b1"), b"3", expires_at, tag=tag_for("b@example.com"))
+
+    assert table.delete_tagged(tag_for("a@example.com")) == 2
+    assert table.get(digest("a1")) is None
+    assert table.get(digest("b1")) == b"3"
+    assert table.status()["entries"] == 1
+
+
+def test_slot_left_mid_write_reads_as_empty_until_rewritten(tmp_path):
+    table = _table(tmp_path, slots=64)
+    key = digest("a")
+    table.set(key, b"value", time.time() + 60)
+    offset = table._claim_slot(table._bucket_offset(key), key)
+
+    # Simulate a writer that died after marking the slot busy
+    shared_memory._SEQ.pack_into(table._mm, offset, 3)
+    assert table.get(key) is None
+
+    table.set(key, b"new value", time.time() + 60)
+    assert table.get(key) == b"new value"
+
+
+def test_other_processes_share_the_table_and_their_locks_die_with_them(tmp_path):
+    path = str(tmp_path / "table.cache")
+    table = SharedMemoryTable(path, slots=64)
+    context = multiprocessing.get_context("spawn")
+
+    for target in (_write_and_exit, _lock_and_die):
+        process = context.Process(target=target, args=(path, digest("a")))
+        process.start()
+        process.join(30)
+
+    assert table.get(digest("a")) == b"from another process"
+    # Would block forever if the dead process still held the bucket lock
+    table.set(digest("a"), b"after the crash", time.time() + 60)
+    assert table.get(digest("a")) == b"after the crash"
+
+
+def test_shared_token_cache_invalidation_reaches_other_workers(tmp_path):
+    details = {
+        "user_id": 1,
+        "email": "a@example.com",
+        "full_name": "Test User",
+        "is_superuser": False,
+        "token_expires": int(time.time() + 600),
+    }
+    worker_a = SharedTokenValidationCache(_table(tmp_path, slots=64))
+    worker_b = SharedTokenValidationCache(_table(tmp_path, slots=64))
+
+    worker_a.set("token-a", details)
+    assert worker_b.get("token-a") == details
+
+    worker_b.invalidate_user("a@example.com")
+    assert worker_a.get("token-a") is None
+    assert worker_a.stats.hits == 0 and worker_a.stats.misses == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("full_name", ["Zoë User", None])
+async def test_shared_user_backend_roundtrip(tmp_path, full_name):
+    backend = SharedMemoryUserCacheBackend(_table(tmp_path, slots=64))
+    snapshot = UserSnapshot(
+        id=7,
+        email="a@example.com",
+        full_name=full_name,
+        is_active=True,
+        is_superuser=False,
+        hashed_password=b"$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA",
+    )
+
+    await backend.set(snapshot, ttl=60)
+    assert await backend.get("a@example.com") == snapshot
+
+    await backend.delete("a@example.com")
+    assert await backend.get("a@example.com") is None
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from app.core.exceptions import AuthenticationException
+from app.core.singleflight import SingleFlight
+from app.services.auth_service import AuthService
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from tests.unit.conftest import FakeUserService, make_access_token, make_snapshot
+
+
+class SlowLookup:
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    lookup = SlowLookup(result={"id": 1})
+
+    tasks = [asyncio.create_task(flight.do("key", lookup)) for _ in range(5)]
+    await asyncio.sleep(0)
+    lookup.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert lookup.calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats.snapshot() == {
+        "executed": 1,
+        "coalesced": 4,
+        "leader_cancelled": 0,
+        "in_flight": 0,
+    }
+
+    # Nothing is remembered once the call finishes
+    await flight.do("key", lookup)
+    assert lookup.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_exceptions_are_shared_and_different_keys_run_separately():
+    flight = SingleFlight("test")
+    failing = SlowLookup(error=AuthenticationException(detail="User not found"))
+    other = SlowLookup(result="other")
+
+    tasks = [asyncio.create_task(flight.do("key", failing)) for _ in range(3)]
+    separate = asyncio.create_task(flight.do("other", other))
+    await asyncio.sleep(0)
+    failing.release.set()
+    other.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, AuthenticationException) for result in results)
+    assert await separate == "other"
+    assert failing.calls == 1
+    assert other.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_when_the_leader_is_cancelled():
+    flight = SingleFlight("test")
+    lookup = SlowLookup(result="value")
+
+    leader = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    lookup.release.set()
+
+    assert await waiter == "value"
+    assert lookup.calls == 2
+    assert flight.stats.leader_cancelled == 1
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+    lookup = SlowLookup(result="value")
+
+    leader = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", lookup))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    lookup.release.set()
+
+    assert await leader == "value"
+    assert lookup.calls == 1
+
+
+class SlowUserService(FakeUserService):
+    async def get_user_by_email(self, db, email):
+        await asyncio.sleep(0.01)
+        return await super().get_user_by_email(db, email)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_validations_of_one_token_query_the_user_once():
+    token_service = TokenService()
+    user_service = SlowUserService(make_snapshot(1, "a@example.com"))
+    auth_service = AuthService(
+        user_service,
+        token_service,
+        TokenValidationCache(),
+        validation_flight=SingleFlight("token_validation"),
+    )
+    access_token = make_access_token(token_service, "a@example.com")
+
+    results = await asyncio.gather(
+        *(auth_service.validate_access_token(None, access_token) for _ in range(10))
+    )
+
+    assert user_service.queries == 1
+    assert all(result["email"] == "a@example.com" for result in results)
+    assert auth_service.validation_flight.stats.coalesced == 9
@@ -0,0 +1,67 @@
+import time
+
+from app.services.token_cache import TokenValidationCache
+
+
+def _details(email: str, expires_in: float = 600) -> dict:
+    return {
+        "user_id": 1,
+        "email": email,
+        "full_name": "Test User",
+        "is_superuser": False,
+        "token_expires": int(time.time() + expires_in),
+    }
+
+
+def test_hit_and_miss_counters():
+    cache = TokenValidationCache()
+    assert cache.get("token-a") is None
+
+    details = _details("a@example.com")
+    cache.set("token-a", details)
+
+    assert cache.get("token-a") is details
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_entry_ttl_is_capped_by_token_exp():
+    cache = TokenValidationCache(ttl_seconds=600)
+    cache.set("expired", _details("a@example.com", expires_in=-1))
+    assert cache.get("expired") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_on_entry_limit():
+    cache = TokenValidationCache(max_entries=2)
+    cache.set("token-a", _details("a@example.com"))
+    cache.set("token-b", _details("b@example.com"))
+    cache.get("token-a")
+    cache.set("token-c", _details("c@example.com"))
+
+    assert cache.get("token-b") is None
+    assert cache.get("token-a") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_memory_cap_evicts_entries():
+    cache = TokenValidationCache(max_bytes=2000)
+    for i in range(50):
+        cache.set(f"token-{i}", _details(f"user{i}@example.com"))
+
+    assert cache.stats.bytes <= 2000
+    assert cache.stats.evictions > 0
+
+
+def test_invalidate_user_drops_all_tokens():
+    cache = TokenValidationCache()
+    cache.set("token-a", _details("a@example.com"))
+    cache.set("token-b", _details("a@example.com"))
+    cache.set("token-c", _details("c@example.com"))
+
+    cache.invalidate_user("a@example.com")
+
+    assert cache.get("token-a") is None
+    assert cache.get("token-b") is None
+    assert cache.get("token-c") is not None
+    assert cache.stats.invalidations == 2
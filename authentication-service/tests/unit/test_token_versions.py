@@ -0,0 +1,195 @@
+from dataclasses import replace
+
+import pytest
+
+from app.core.exceptions import AuthenticationException, UserUpdateException
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+from app.services.token_cache import TokenValidationCache
+from app.services.token_service import TokenService
+from app.services.token_versions import TokenVersions
+from app.services.user_cache import InMemoryUserCacheBackend, UserCache
+from app.services.user_service import UserService
+from tests.unit.conftest import FakeHasher, FakeUserService, make_snapshot
+
+
+def _auth_service(user_service, token_versions, token_cache=None) -> AuthService:
+    return AuthService(
+        user_service,
+        TokenService(),
+        token_cache,
+        token_versions=token_versions,
+        embed_claims=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_user_changes_bump_the_token_version(session_factory):
+    user_service = UserService(FakeHasher(), UserCache(InMemoryUserCacheBackend()))
+    async with session_factory() as db:
+        await user_service.register_user(
+            db, UserCreate(email="a@example.com", password="strongpassword123")
+        )
+        assert await user_service.change_password(db, "a@example.com", "newpass1234")
+        assert await user_service.set_superuser(db, "a@example.com", True)
+        assert not await user_service.deactivate_user(db, "missing@example.com")
+
+        user = await user_service.get_user_by_email(db, "a@example.com")
+    assert user.token_version == 2
+    assert user.is_superuser
+    assert user.hashed_password == b"hashed:newpass1234"
+
+
+@pytest.mark.asyncio
+async def test_sync_loads_bumps_and_drops_cached_tokens(session_factory):
+    user_service = UserService(FakeHasher(), UserCache(InMemoryUserCacheBackend()))
+    token_cache = TokenValidationCache()
+    token_versions = TokenVersions(
+        session_factory, window_seconds=60, token_cache=token_cache
+    )
+    async with session_factory() as db:
+        for email in ("a@example.com", "b@example.com"):
+            await user_service.register_user(
+                db, UserCreate(email=email, password="strongpassword123")
+            )
+        await user_service.deactivate_user(db, "a@example.com")
+
+    token_cache.set("cached-token", {"email": "a@example.com", "token_expires": None})
+    await token_versions.sync()
+
+    assert token_versions.is_fresh()
+    assert token_versions.current("a@example.com") == 1
+    assert token_versions.current("b@example.com") == 0
+    assert token_cache.get("cached-token") is None
+
+
+@pytest.mark.asyncio
+async def test_embedded_claims_validate_without_a_user_lookup(session_factory):
+    user_service = FakeUserService(make_snapshot(1, "a@example.com"))
+    token_versions = TokenVersions(session_factory, window_seconds=60)
+    auth_service = _auth_service(user_service, token_versions)
+    token = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))["access_token"]
+
+    # Versions never synced: the claims cannot be trusted yet
+    details = await auth_service.validate_access_token(None, token)
+    assert user_service.queries == 1
+
+    await token_versions.sync()
+    fresh, other = (
+        auth_service.issue_tokens(make_snapshot(1, "a@example.com"))["access_token"]
+        for _ in range(2)
+    )
+    from_claims = await auth_service.validate_access_token(None, fresh)
+    assert {**from_claims, "token_expires": None} == {**details, "token_expires": None}
+    [result] = await auth_service.validate_access_tokens(None, [other])
+    assert result["valid"] and result["user_id"] == 1
+    assert user_service.queries == 1
+    assert token_versions.stats.validated_from_claims == 2
+
+
+@pytest.mark.asyncio
+async def test_tokens_issued_before_a_bump_are_rejected(session_factory):
+    user_service = FakeUserService(make_snapshot(1, "a@example.com"))
+    token_versions = TokenVersions(session_factory, window_seconds=60)
+    await token_versions.sync()
+    auth_service = _auth_service(user_service, token_versions)
+    tokens = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))
+
+    token_versions.record("a@example.com", 1)
+
+    with pytest.raises(AuthenticationException, match="invalidated"):
+        await auth_service.validate_access_token(None, tokens["access_token"])
+    with pytest.raises(AuthenticationException, match="invalidated"):
+        await auth_service.refresh_tokens(None, tokens["refresh_token"])
+    [result] = await auth_service.validate_access_tokens(None, [tokens["access_token"]])
+    assert result == {"valid": False, "detail": "Token has been invalidated"}
+    assert token_versions.stats.rejected == 3
+
+
+@pytest.mark.asyncio
+async def test_user_record_version_rejects_tokens_without_tracking():
+    user_service = FakeUserService(make_snapshot(1, "a@example.com"))
+    auth_service = AuthService(user_service, TokenService())
+    token = auth_service.issue_tokens(make_snapshot(1, "a@example.com"))["access_token"]
+
+    user_service.users["a@example.com"] = replace(
+        make_snapshot(1, "a@example.com"), token_version=1
+    )
+
+    with pytest.raises(AuthenticationException, match="invalidated"):
+        await auth_service.validate_access_token(None, token)
+
+
+@pytest.mark.asyncio
+async def test_bumps_from_another_process_apply_without_embedded_claims(
+    session_factory,
+):
+    def process():
+        user_cache = UserCache(InMemoryUserCacheBackend())
+        token_cache = TokenValidationCache()
+        token_versions = TokenVersions(
+            session_factory,
+            window_seconds=60,
+            token_cache=token_cache,
+            user_cache=user_cache,
+        )
+        user_service = UserService(FakeHasher(), user_cache)
+        auth_service = AuthService(
+            user_service,
+            TokenService(),
+            token_cache,
+            token_versions=token_versions,
+            embed_claims=False,
+        )
+        return user_service, auth_service, token_versions
+
+    user_service, auth_service, token_versions = process()
+    other_user_service, _, _ = process()
+    async with session_factory() as db:
+        await user_service.register_user(
+            db, UserCreate(email="a@example.com", password="strongpassword123")
+        )
+        user = await user_service.get_user_by_email(db, "a@example.com")
+        token = auth_service.issue_tokens(user)["access_token"]
+        assert await auth_service.validate_access_token(db, token)
+
+        await other_user_service.change_password(db, "a@example.com", "newpass1234")
+        await token_versions.sync()
+
+        with pytest.raises(AuthenticationException, match="invalidated"):
+            await auth_service.validate_access_token(db, token)
+    assert user_service.user_cache.stats.invalidations == 1
+
+
+class FailingOutbox:
+    async def add(self, db, event_type, key, data):
+        raise RuntimeError("outbox unavailable")
+
+
+@pytest.mark.asyncio
+async def test_failed_user_change_rolls_back_and_keeps_sessions(session_factory):
+    token_cache = TokenValidationCache()
+    token_versions = TokenVersions(session_factory, window_seconds=60)
+    user_service = UserService(
+        FakeHasher(),
+        UserCache(InMemoryUserCacheBackend()),
+        token_cache=token_cache,
+        token_versions=token_versions,
+    )
+    token_cache.set("cached-token", {"email": "a@example.com", "token_expires": None})
+    async with session_factory() as db:
+        await user_service.register_user(
+            db, UserCreate(email="a@example.com", password="strongpassword123")
+        )
+        user_service.outbox = FailingOutbox()
+
+        with pytest.raises(UserUpdateException, match="outbox unavailable"):
+            await user_service.deactivate_user(db, "a@example.com")
+        user = await user_service.get_user_by_email(db, "a@example.com")
+        assert user.is_active and user.token_version == 0
+        assert token_cache.get("cached-token") is not None
+
+        user_service.outbox = None
+        assert await user_service.deactivate_user(db, "a@example.com")
+    assert token_cache.get("cached-token") is None
+    assert token_versions.current("a@example.com") == 1
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.user_cache import (
+    InMemoryUserCacheBackend,
+    RedisUserCacheBackend,
+    UserCache,
+    UserSnapshot,
+)
+
+
+class FakeRedis:
+    """Local stand-in implementing the subset of the Redis API the backend uses."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        value, expires_at = self.store.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    async def set(self, key, value, px=None):
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self.store[key] = (value, expires_at)
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+def _snapshot(email: str = "a@example.com") -> UserSnapshot:
+    return UserSnapshot(
+        id=1,
+        email=email,
+        full_name="Test User",
+        is_active=True,
+        is_superuser=False,
+        hashed_password=b"$2b$12$abcdefghijklmnopqrstuuQ6RkTWc7O7wMmG4bS1nC6W2aUe1yZ7u",
+    )
+
+
+def test_snapshot_roundtrip():
+    snapshot = _snapshot()
+    assert UserSnapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "backend_factory",
+    [InMemoryUserCacheBackend, lambda: RedisUserCacheBackend(FakeRedis())],
+)
+async def test_read_through_and_invalidation(backend_factory):
+    cache = UserCache(backend_factory(), ttl_seconds=60)
+    assert await cache.get("a@example.com") is None
+
+    await cache.set(_snapshot())
+    assert await cache.get("a@example.com") == _snapshot()
+
+    await cache.invalidate("a@example.com")
+    assert await cache.get("a@example.com") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "backend_factory",
+    [InMemoryUserCacheBackend, lambda: RedisUserCacheBackend(FakeRedis())],
+)
+async def test_entries_expire(backend_factory):
+    cache = UserCache(backend_factory(), ttl_seconds=0.01)
+    await cache.set(_snapshot())
+    await asyncio.sleep(0.02)
+    assert await cache.get("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_degrade_to_misses():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("connection refused")
+
+    cache = UserCache(RedisUserCacheBackend(BrokenRedis()))
+    assert await cache.get("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_read_before_an_invalidation_is_not_written_back():
+    cache = UserCache(InMemoryUserCacheBackend(), max_invalidations=1)
+    generation = cache.generation()
+    await cache.invalidate("a@example.com")
+
+    await cache.set(_snapshot(), generation)
+    await cache.set(_snapshot("b@example.com"), generation)
+    assert await cache.get("a@example.com") is None
+    assert await cache.get("b@example.com") is not None
+
+    # Once a@ is forgotten, older generations are stale for every user
+    await cache.invalidate("c@example.com")
+    await cache.set(_snapshot("d@example.com"), generation)
+    assert await cache.get("d@example.com") is None
+    assert cache.stats.stale_writes == 2
+
+    await cache.set(_snapshot(), cache.generation())
+    assert await cache.get("a@example.com") == _snapshot()
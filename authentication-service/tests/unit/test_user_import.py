@@ -0,0 +1,144 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import pytest
+from sqlalchemy import func, select
+
+from app.models.user import User
+from app.services.user_import import ImportCheckpoint, UserImporter, iter_records
+
+HASHED = bcrypt.hashpw(b"imported-password", bcrypt.gensalt(4)).decode("ascii")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(2) as executor:
+        yield executor
+
+
+def _ndjson(*records) -> io.StringIO:
+    return io.StringIO(
+        "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records)
+    )
+
+
+async def _count_users(engine) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(select(func.count(User.id)))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_import_counts_inserted_duplicate_and_invalid(engine, executor):
+    stream = _ndjson(
+        {"email": "a@example.com", "hashed_password": HASHED},
+        {"email": "b@example.com", "password": "plaintext-password"},
+        {"email": "a@example.com", "hashed_password": HASHED},
+        {"email": "not-an-email", "hashed_password": HASHED},
+        {"email": "c@example.com"},
+        "{broken json",
+    )
+    importer = UserImporter(engine, batch_size=2, executor=executor)
+
+    report = await importer.run(iter_records(stream, "ndjson"))
+
+    assert (report.records, report.inserted, report.duplicates, report.invalid) == (
+        6,
+        2,
+        1,
+        3,
+    )
+    assert report.hashed == 1
+    assert len(report.errors) == 3
+    async with engine.connect() as conn:
+        rows = dict(
+            (await conn.execute(select(User.email, User.hashed_password))).all()
+        )
+    assert rows["a@example.com"] == HASHED.encode("ascii")
+    assert bcrypt.checkpw(b"plaintext-password", rows["b@example.com"])
+
+
+@pytest.mark.asyncio
+async def test_import_reads_csv(engine, executor):
+    stream = io.StringIO(
+        "email,full_name,hashed_password,is_superuser\n"
+        f"csv1@example.com,One,{HASHED},false\n"
+        f"csv2@example.com,,{HASHED},true\n"
+    )
+    importer = UserImporter(engine, executor=executor)
+
+    report = await importer.run(iter_records(stream, "csv"))
+
+    assert report.inserted == 2
+    async with engine.connect() as conn:
+        superuser = (
+            await conn.execute(
+                select(User.is_superuser).where(User.email == "csv2@example.com")
+            )
+        ).scalar_one()
+    assert superuser is True
+
+
+@pytest.mark.asyncio
+async def test_import_resumes_from_checkpoint(engine, executor, tmp_path):
+    checkpoint_path = str(tmp_path / "import.ckpt")
+    records = [
+        {"email": f"user{i}@example.com", "hashed_password": HASHED} for i in range(5)
+    ]
+    ImportCheckpoint(records=3, inserted=3).save(checkpoint_path)
+    importer = UserImporter(engine, batch_size=2, executor=executor)
+
+    report = await importer.run(
+        iter_records(_ndjson(*records), "ndjson"), checkpoint_path=checkpoint_path
+    )
+
+    assert report.resumed_from == 3
+    assert report.records == 2
+    assert report.inserted == 5
+    assert await _count_users(engine) == 2
+    assert ImportCheckpoint.load(checkpoint_path).records == 5
+
+
+@pytest.mark.asyncio
+async def test_existing_users_are_skipped_before_hashing(engine, executor):
+    first = _ndjson({"email": "dup@example.com", "hashed_password": HASHED})
+    await UserImporter(engine, executor=executor).run(iter_records(first, "ndjson"))
+
+    second = _ndjson({"email": "dup@example.com", "password": "plaintext-password"})
+    report = await UserImporter(engine, executor=executor).run(
+        iter_records(second, "ndjson")
+    )
+
+    assert report.duplicates == 1
+    assert report.hashed == 0
+    assert await _count_users(engine) == 1
+
+
+@pytest.mark.asyncio
+async def test_rows_lost_to_a_concurrent_insert_count_as_duplicates(
+    engine, executor, monkeypatch
+):
+    importer = UserImporter(engine, executor=executor)
+    hash_rows = importer._hash_rows
+
+    async def hash_rows_then_race(users, executor, report):
+        rows = await hash_rows(users, executor, report)
+        async with engine.begin() as conn:
+            await conn.execute(
+                User.__table__.insert().values(
+                    email="race@example.com", hashed_password=b"x"
+                )
+            )
+        return rows
+
+    monkeypatch.setattr(importer, "_hash_rows", hash_rows_then_race)
+    stream = _ndjson(
+        {"email": "race@example.com", "hashed_password": HASHED},
+        {"email": "new@example.com", "hashed_password": HASHED},
+    )
+
+    report = await importer.run(iter_records(stream, "ndjson"))
+
+    assert (report.inserted, report.duplicates) == (1, 1)
+    assert await _count_users(engine) == 2
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import DuplicateEntityException
+from app.core.security import BcryptScheme, PasswordHasher
+from app.schemas.user import UserCreate
+from app.services import user_service
+from app.services.user_cache import InMemoryUserCacheBackend, UserCache
+from app.services.user_service import UserService
+from tests.unit.conftest import FakeHasher
+
+
+def _user_service(user_cache=None) -> UserService:
+    return UserService(
+        password_hasher=FakeHasher(),
+        user_cache=user_cache or UserCache(InMemoryUserCacheBackend()),
+    )
+
+
+def _user(email: str = "new@example.com") -> UserCreate:
+    return UserCreate(email=email, password="strongpassword123", full_name="New")
+
+
+@pytest.mark.asyncio
+async def test_registration_is_a_single_statement(engine):
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        user = await _user_service().register_user(db, _user())
+
+    assert user.id is not None
+    assert user.created_at is not None
+    assert user.hashed_password == b"hashed:strongpassword123"
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT INTO users")
+    assert "ON CONFLICT" in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_duplicate_email_conflict_is_reported(engine):
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await _user_service().register_user(db, _user())
+
+    # A fresh cache forces the duplicate to be caught by the INSERT itself
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        with pytest.raises(DuplicateEntityException):
+            await _user_service().register_user(db, _user())
+
+
+@pytest.mark.asyncio
+async def test_duplicate_is_reported_without_on_conflict(engine, monkeypatch):
+    monkeypatch.setattr(user_service, "conflict_free_inserts", {})
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await _user_service().register_user(db, _user())
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        with pytest.raises(DuplicateEntityException):
+            await _user_service().register_user(db, _user())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registrations_create_one_user(engine):
+    async def register():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            return await _user_service().register_user(db, _user("race@example.com"))
+
+    results = await asyncio.gather(
+        *(register() for _ in range(4)), return_exceptions=True
+    )
+
+    created = [r for r in results if not isinstance(r, Exception)]
+    duplicates = [r for r in results if isinstance(r, DuplicateEntityException)]
+    assert len(created) == 1
+    assert len(duplicates) == 3
+
+
+@pytest.mark.asyncio
+async def test_login_replaces_a_hash_made_under_an_old_policy(engine):
+    user_cache = UserCache(InMemoryUserCacheBackend())
+    old = UserService(PasswordHasher(scheme=BcryptScheme(rounds=4)), user_cache)
+    new = UserService(PasswordHasher(scheme=BcryptScheme(rounds=5)), user_cache)
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        await old.register_user(db, _user())
+        snapshot = await new.get_user_by_email(db, "new@example.com")
+
+        assert not await new.check_password(db, snapshot, "wrongpassword")
+        assert await new.check_password(db, snapshot, "strongpassword123")
+
+        updated = await new.get_user_by_email(db, "new@example.com")
+        assert updated.hashed_password.startswith(b"$2b$05$")
+        assert await new.check_password(db, updated, "strongpassword123")
+        assert new.password_hasher.stats.rehashed == 1
+
+
+@pytest.mark.asyncio
+async def test_registration_cannot_grant_privileges(engine):
+    user_create = UserCreate.model_validate(
+        {
+            "email": "sneaky@example.com",
+            "password": "strongpassword123",
+            "is_superuser": True,
+            "is_active": False,
+        }
+    )
+
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        user = await _user_service().register_user(db, user_create)
+
+    assert user.is_active
+    assert not user.is_superuser
@@ -7,6 +7,8 @@ import (
 type Config struct {
 	ServerPort     string
 	AuthServiceURL string
+	// host:port of the auth service's internal protocol; HTTP is used when empty
+	AuthRPCAddr    string
 	LoggingEnabled bool
 }
 
@@ -14,6 +16,7 @@ func Load() (*Config, error) {
 	return &Config{
 		ServerPort:     os.Getenv("BROKER_PORT"),
 		AuthServiceURL: os.Getenv("AUTH_SERVICE_URL"),
+		AuthRPCAddr:    os.Getenv("AUTH_RPC_ADDR"),
 		LoggingEnabled: true,
 	}, nil
 }
@@ -2,6 +2,7 @@ package handlers
 
 import (
 	"fmt"
+	"net"
 	"net/http"
 	"time"
 
@@ -32,6 +33,7 @@ func (h *Handlers) HandleSubmission(w http.ResponseWriter, r *http.Request) {
 		Auth         models.AuthPayload `json:"auth,omitempty"`
 		Register     models.UserPayload `json:"register,omitempty"`
 		RefreshToken string             `json:"refresh_token,omitempty"`
+		AccessToken  string             `json:"access_token,omitempty"`
 	}
 
 	err := jsoniter.NewDecoder(r.Body).Decode(&requestPayload)
@@ -42,9 +44,11 @@ func (h *Handlers) HandleSubmission(w http.ResponseWriter, r *http.Request) {
 
 	switch requestPayload.Action {
 	case "auth":
-		h.authenticate(w, requestPayload.Auth)
+		h.authenticate(w, requestPayload.Auth, forwardedFor(r))
 	case "refresh":
 		h.refreshToken(w, requestPayload.RefreshToken)
+	case "validate":
+		h.validateToken(w, requestPayload.AccessToken)
 	case "register":
 		h.registerUser(w, requestPayload.Register)
 	default:
@@ -78,8 +82,21 @@ func (h *Handlers) errorJSON(w http.ResponseWriter, err error, status ...int) er
 	})
 }
 
-func (h *Handlers) authenticate(w http.ResponseWriter, auth models.AuthPayload) {
-	authResponse, err := h.brokerService.HandleAuthRequest(auth)
+// forwardedFor appends the caller's address to any X-Forwarded-For chain
+// the request arrived with.
+func forwardedFor(r *http.Request) string {
+	host, _, err := net.SplitHostPort(r.RemoteAddr)
+	if err != nil {
+		host = r.RemoteAddr
+	}
+	if prior := r.Header.Get("X-Forwarded-For"); prior != "" {
+		return prior + ", " + host
+	}
+	return host
+}
+
+func (h *Handlers) authenticate(w http.ResponseWriter, auth models.AuthPayload, forwarded string) {
+	authResponse, err := h.brokerService.HandleAuthRequest(auth, forwarded)
 	if err != nil {
 		h.errorJSON(w, err, http.StatusUnauthorized)
 		return
@@ -123,6 +140,27 @@ func (h *Handlers) refreshToken(w http.ResponseWriter, refreshToken string) {
 	h.writeJSON(w, http.StatusOK, response)
 }
 
+func (h *Handlers) validateToken(w http.ResponseWriter, accessToken string) {
+	if accessToken == "" {
+		h.errorJSON(w, fmt.Errorf("access token is required"), http.StatusBadRequest)
+		return
+	}
+
+	validation, err := h.brokerService.HandleValidateToken(accessToken)
+	if err != nil {
+		h.errorJSON(w, err, http.StatusUnauthorized)
+		return
+	}
+
+	response := Response{
+		Error:   false,
+		Message: "Token is valid",
+		Data:    validation,
+	}
+
+	h.writeJSON(w, http.StatusOK, response)
+}
+
 func (h *Handlers) registerUser(w http.ResponseWriter, user models.UserPayload) {
 	userResponse, err := h.brokerService.HandleRegisterRequest(user)
 	if err != nil {
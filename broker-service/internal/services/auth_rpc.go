@@ -0,0 +1,385 @@
+package services
+
+import (
+	"encoding/binary"
+	"errors"
+	"fmt"
+	"io"
+	"math"
+	"net"
+	"sync/atomic"
+	"time"
+
+	"github.com/pedromussi0/broker-service/internal/models"
+)
+
+// AuthRPCClient talks to the auth service's internal protocol: 4-byte
+// big-endian length-prefixed msgpack frames over persistent TCP
+// connections. Requests are [id, op, argument], responses [id, status, body].
+type AuthRPCClient struct {
+	addr    string
+	timeout time.Duration
+	idle    chan net.Conn
+	nextID  atomic.Uint32
+}
+
+type AuthRPCError struct {
+	Status int
+	Detail string
+}
+
+func (e *AuthRPCError) Error() string {
+	return fmt.Sprintf("auth service returned %d: %s", e.Status, e.Detail)
+}
+
+const maxFrameBytes = 16 << 20
+
+func NewAuthRPCClient(addr string, maxIdle int, timeout time.Duration) *AuthRPCClient {
+	return &AuthRPCClient{
+		addr:    addr,
+		timeout: timeout,
+		idle:    make(chan net.Conn, maxIdle),
+	}
+}
+
+func (c *AuthRPCClient) ValidateToken(accessToken string) (map[string]any, error) {
+	body, err := c.call("validate", accessToken)
+	if err != nil {
+		return nil, err
+	}
+	result, ok := body.(map[string]any)
+	if !ok {
+		return nil, fmt.Errorf("unexpected validate response: %T", body)
+	}
+	return result, nil
+}
+
+func (c *AuthRPCClient) ValidateTokens(accessTokens []string) ([]any, error) {
+	body, err := c.call("validate_batch", accessTokens)
+	if err != nil {
+		return nil, err
+	}
+	results, ok := body.([]any)
+	if !ok {
+		return nil, fmt.Errorf("unexpected validate_batch response: %T", body)
+	}
+	return results, nil
+}
+
+func (c *AuthRPCClient) RefreshToken(refreshToken string) (*models.TokenPayload, error) {
+	body, err := c.call("refresh", refreshToken)
+	if err != nil {
+		return nil, err
+	}
+	tokens, ok := body.(map[string]any)
+	if !ok {
+		return nil, fmt.Errorf("unexpected refresh response: %T", body)
+	}
+	return &models.TokenPayload{
+		AccessToken:  stringField(tokens, "access_token"),
+		RefreshToken: stringField(tokens, "refresh_token"),
+		TokenType:    stringField(tokens, "token_type"),
+	}, nil
+}
+
+func (c *AuthRPCClient) call(op string, argument any) (any, error) {
+	id := int64(c.nextID.Add(1))
+	frame, err := encodeFrame([]any{id, op, argument})
+	if err != nil {
+		return nil, err
+	}
+
+	conn, err := c.get()
+	if err != nil {
+		return nil, fmt.Errorf("error connecting to auth service: %w", err)
+	}
+	conn.SetDeadline(time.Now().Add(c.timeout))
+
+	if _, err := conn.Write(frame); err != nil {
+		conn.Close()
+		return nil, fmt.Errorf("error sending to auth service: %w", err)
+	}
+	message, err := readFrame(conn)
+	if err != nil {
+		conn.Close()
+		return nil, fmt.Errorf("error reading from auth service: %w", err)
+	}
+
+	response, ok := message.([]any)
+	if !ok || len(response) != 3 || response[0] != id {
+		conn.Close()
+		return nil, errors.New("malformed response from auth service")
+	}
+	c.put(conn)
+
+	if status, _ := response[1].(int64); status != 200 {
+		detail, _ := response[2].(string)
+		return nil, &AuthRPCError{Status: int(status), Detail: detail}
+	}
+	return response[2], nil
+}
+
+func (c *AuthRPCClient) get() (net.Conn, error) {
+	select {
+	case conn := <-c.idle:
+		return conn, nil
+	default:
+		return net.DialTimeout("tcp", c.addr, c.timeout)
+	}
+}
+
+func (c *AuthRPCClient) put(conn net.Conn) {
+	select {
+	case c.idle <- conn:
+	default:
+		conn.Close()
+	}
+}
+
+func stringField(m map[string]any, key string) string {
+	value, _ := m[key].(string)
+	return value
+}
+
+func encodeFrame(message any) ([]byte, error) {
+	body, err := appendValue(make([]byte, 4, 256), message)
+	if err != nil {
+		return nil, err
+	}
+	binary.BigEndian.PutUint32(body, uint32(len(body)-4))
+	return body, nil
+}
+
+func readFrame(r io.Reader) (any, error) {
+	var header [4]byte
+	if _, err := io.ReadFull(r, header[:]); err != nil {
+		return nil, err
+	}
+	length := binary.BigEndian.Uint32(header[:])
+	if length > maxFrameBytes {
+		return nil, fmt.Errorf("frame of %d bytes is too large", length)
+	}
+	body := make([]byte, length)
+	if _, err := io.ReadFull(r, body); err != nil {
+		return nil, err
+	}
+	d := decoder{b: body}
+	return d.value()
+}
+
+// The msgpack subset the protocol needs. Requests only carry ints, strings
+// and lists; responses decode to nil, bool, int64, float64, string, []any
+// and map[string]any.
+
+func appendValue(b []byte, v any) ([]byte, error) {
+	switch v := v.(type) {
+	case nil:
+		return append(b, 0xc0), nil
+	case bool:
+		if v {
+			return append(b, 0xc3), nil
+		}
+		return append(b, 0xc2), nil
+	case int64:
+		if v >= -32 && v <= 0x7f {
+			return append(b, byte(int8(v))), nil
+		}
+		return binary.BigEndian.AppendUint64(append(b, 0xd3), uint64(v)), nil
+	case string:
+		return appendString(b, v), nil
+	case []string:
+		b = appendArrayHeader(b, len(v))
+		for _, s := range v {
+			b = appendString(b, s)
+		}
+		return b, nil
+	case []any:
+		b = appendArrayHeader(b, len(v))
+		for _, item := range v {
+			var err error
+			if b, err = appendValue(b, item); err != nil {
+				return nil, err
+			}
+		}
+		return b, nil
+	default:
+		return nil, fmt.Errorf("cannot encode %T", v)
+	}
+}
+
+func appendString(b []byte, s string) []byte {
+	switch n := len(s); {
+	case n < 32:
+		b = append(b, 0xa0|byte(n))
+	case n <= math.MaxUint8:
+		b = append(b, 0xd9, byte(n))
+	case n <= math.MaxUint16:
+		b = binary.BigEndian.AppendUint16(append(b, 0xda), uint16(n))
+	default:
+		b = binary.BigEndian.AppendUint32(append(b, 0xdb), uint32(n))
+	}
+	return append(b, s...)
+}
+
+func appendArrayHeader(b []byte, n int) []byte {
+	switch {
+	case n < 16:
+		return append(b, 0x90|byte(n))
+	case n <= math.MaxUint16:
+		return binary.BigEndian.AppendUint16(append(b, 0xdc), uint16(n))
+	default:
+		return binary.BigEndian.AppendUint32(append(b, 0xdd), uint32(n))
+	}
+}
+
+type decoder struct {
+	b   []byte
+	pos int
+}
+
+var errShortFrame = errors.New("truncated msgpack frame")
+
+func (d *decoder) next(n int) ([]byte, error) {
+	if n < 0 || d.pos+n > len(d.b) {
+		return nil, errShortFrame
+	}
+	chunk := d.b[d.pos : d.pos+n]
+	d.pos += n
+	return chunk, nil
+}
+
+func (d *decoder) uint(size int) (uint64, error) {
+	chunk, err := d.next(size)
+	if err != nil {
+		return 0, err
+	}
+	switch size {
+	case 1:
+		return uint64(chunk[0]), nil
+	case 2:
+		return uint64(binary.BigEndian.Uint16(chunk)), nil
+	case 4:
+		return uint64(binary.BigEndian.Uint32(chunk)), nil
+	default:
+		return binary.BigEndian.Uint64(chunk), nil
+	}
+}
+
+func (d *decoder) value() (any, error) {
+	prefix, err := d.next(1)
+	if err != nil {
+		return nil, err
+	}
+	c := prefix[0]
+	switch {
+	case c <= 0x7f:
+		return int64(c), nil
+	case c >= 0xe0:
+		return int64(int8(c)), nil
+	case c&0xe0 == 0xa0:
+		return d.str(int(c & 0x1f))
+	case c&0xf0 == 0x90:
+		return d.array(int(c & 0x0f))
+	case c&0xf0 == 0x80:
+		return d.dict(int(c & 0x0f))
+	}
+
+	switch c {
+	case 0xc0:
+		return nil, nil
+	case 0xc2:
+		return false, nil
+	case 0xc3:
+		return true, nil
+	case 0xcc, 0xcd, 0xce, 0xcf:
+		n, err := d.uint(1 << (c - 0xcc))
+		return int64(n), err
+	case 0xd0:
+		n, err := d.uint(1)
+		return int64(int8(n)), err
+	case 0xd1:
+		n, err := d.uint(2)
+		return int64(int16(n)), err
+	case 0xd2:
+		n, err := d.uint(4)
+		return int64(int32(n)), err
+	case 0xd3:
+		n, err := d.uint(8)
+		return int64(n), err
+	case 0xca:
+		n, err := d.uint(4)
+		return float64(math.Float32frombits(uint32(n))), err
+	case 0xcb:
+		n, err := d.uint(8)
+		return math.Float64frombits(n), err
+	case 0xd9, 0xda, 0xdb:
+		n, err := d.uint(1 << (c - 0xd9))
+		if err != nil {
+			return nil, err
+		}
+		return d.str(int(n))
+	case 0xc4, 0xc5, 0xc6:
+		n, err := d.uint(1 << (c - 0xc4))
+		if err != nil {
+			return nil, err
+		}
+		return d.str(int(n))
+	case 0xdc, 0xdd:
+		n, err := d.uint(2 << (c - 0xdc))
+		if err != nil {
+			return nil, err
+		}
+		return d.array(int(n))
+	case 0xde, 0xdf:
+		n, err := d.uint(2 << (c - 0xde))
+		if err != nil {
+			return nil, err
+		}
+		return d.dict(int(n))
+	}
+	return nil, fmt.Errorf("unsupported msgpack type 0x%x", c)
+}
+
+func (d *decoder) str(n int) (any, error) {
+	chunk, err := d.next(n)
+	if err != nil {
+		return nil, err
+	}
+	return string(chunk), nil
+}
+
+func (d *decoder) array(n int) (any, error) {
+	if n > len(d.b)-d.pos {
+		return nil, errShortFrame
+	}
+	items := make([]any, n)
+	for i := range items {
+		item, err := d.value()
+		if err != nil {
+			return nil, err
+		}
+		items[i] = item
+	}
+	return items, nil
+}
+
+func (d *decoder) dict(n int) (any, error) {
+	if n > len(d.b)-d.pos {
+		return nil, errShortFrame
+	}
+	m := make(map[string]any, n)
+	for i := 0; i < n; i++ {
+		key, err := d.value()
+		if err != nil {
+			return nil, err
+		}
+		name, ok := key.(string)
+		if !ok {
+			return nil, fmt.Errorf("unsupported map key %T", key)
+		}
+		if m[name], err = d.value(); err != nil {
+			return nil, err
+		}
+	}
+	return m, nil
+}
@@ -5,6 +5,7 @@ import (
 	"fmt"
 	"io"
 	"net/http"
+	"time"
 
 	jsoniter "github.com/json-iterator/go"
 	"github.com/pedromussi0/broker-service/internal/config"
@@ -13,6 +14,7 @@ import (
 
 type BrokerService struct {
 	client *http.Client
+	rpc    *AuthRPCClient
 	config *config.Config
 }
 
@@ -28,19 +30,40 @@ type UserResponse struct {
 	Error interface{} `json:"detail,omitempty"`
 }
 
+type ValidationResponse struct {
+	Valid        bool    `json:"valid"`
+	UserID       int64   `json:"user_id"`
+	Email        string  `json:"email"`
+	FullName     *string `json:"full_name"`
+	IsSuperUser  bool    `json:"is_superuser"`
+	TokenExpires int64   `json:"token_expires"`
+	Error        string  `json:"detail,omitempty"`
+}
+
 type RefreshTokenRequest struct {
 	RefreshToken string `json:"refresh_token"`
 }
 
+type ValidateTokenRequest struct {
+	AccessToken string `json:"access_token"`
+}
+
 func NewBrokerService() *BrokerService {
 	cfg, _ := config.Load()
-	return &BrokerService{
+	service := &BrokerService{
 		client: &http.Client{},
 		config: cfg,
 	}
+	if cfg.AuthRPCAddr != "" {
+		service.rpc = NewAuthRPCClient(cfg.AuthRPCAddr, 32, 5*time.Second)
+	}
+	return service
 }
 
-func (s *BrokerService) HandleAuthRequest(auth models.AuthPayload) (*AuthResponse, error) {
+// HandleAuthRequest logs a user in. forwardedFor is the X-Forwarded-For
+// chain ending with the broker's caller, so the auth service can throttle
+// per client address instead of per broker.
+func (s *BrokerService) HandleAuthRequest(auth models.AuthPayload, forwardedFor string) (*AuthResponse, error) {
 	jsonData, err := jsoniter.Marshal(auth)
 	if err != nil {
 		return nil, fmt.Errorf("error marshaling auth payload: %w", err)
@@ -56,6 +79,9 @@ func (s *BrokerService) HandleAuthRequest(auth models.AuthPayload) (*AuthRespons
 	}
 
 	request.Header.Set("Content-Type", "application/json")
+	if forwardedFor != "" {
+		request.Header.Set("X-Forwarded-For", forwardedFor)
+	}
 
 	response, err := s.client.Do(request)
 	if err != nil {
@@ -84,6 +110,14 @@ func (s *BrokerService) HandleAuthRequest(auth models.AuthPayload) (*AuthRespons
 }
 
 func (s *BrokerService) HandleRefreshToken(refreshToken string) (*AuthResponse, error) {
+	if s.rpc != nil {
+		tokens, err := s.rpc.RefreshToken(refreshToken)
+		if err != nil {
+			return nil, fmt.Errorf("token refresh failed: %w", err)
+		}
+		return &AuthResponse{TokenPayload: *tokens, Valid: true}, nil
+	}
+
 	tokenRequest := RefreshTokenRequest{
 		RefreshToken: refreshToken,
 	}
@@ -130,6 +164,67 @@ func (s *BrokerService) HandleRefreshToken(refreshToken string) (*AuthResponse,
 	return &authResponse, nil
 }
 
+func (s *BrokerService) HandleValidateToken(accessToken string) (*ValidationResponse, error) {
+	if s.rpc != nil {
+		result, err := s.rpc.ValidateToken(accessToken)
+		if err != nil {
+			return nil, fmt.Errorf("token validation failed: %w", err)
+		}
+		validation := &ValidationResponse{
+			Valid:       result["valid"] == true,
+			Email:       stringField(result, "email"),
+			IsSuperUser: result["is_superuser"] == true,
+		}
+		validation.UserID, _ = result["user_id"].(int64)
+		validation.TokenExpires, _ = result["token_expires"].(int64)
+		if fullName, ok := result["full_name"].(string); ok {
+			validation.FullName = &fullName
+		}
+		return validation, nil
+	}
+
+	jsonData, err := jsoniter.Marshal(ValidateTokenRequest{AccessToken: accessToken})
+	if err != nil {
+		return nil, fmt.Errorf("error marshaling validate token request: %w", err)
+	}
+
+	request, err := http.NewRequest(
+		"POST",
+		s.config.AuthServiceURL+"/validate-token",
+		bytes.NewBuffer(jsonData),
+	)
+	if err != nil {
+		return nil, fmt.Errorf("error creating validate token request: %w", err)
+	}
+
+	request.Header.Set("Content-Type", "application/json")
+
+	response, err := s.client.Do(request)
+	if err != nil {
+		return nil, fmt.Errorf("error making validate token request: %w", err)
+	}
+	defer response.Body.Close()
+
+	body, err := io.ReadAll(response.Body)
+	if err != nil {
+		return nil, fmt.Errorf("error reading validate token response: %w", err)
+	}
+
+	var validation ValidationResponse
+	if err := jsoniter.Unmarshal(body, &validation); err != nil {
+		return nil, fmt.Errorf("error unmarshaling validate token response: %w", err)
+	}
+
+	if response.StatusCode != http.StatusOK {
+		if validation.Error != "" {
+			return &validation, fmt.Errorf("token validation failed: %s", validation.Error)
+		}
+		return &validation, fmt.Errorf("token validation failed with status code: %d", response.StatusCode)
+	}
+
+	return &validation, nil
+}
+
 func (s *BrokerService) HandleRegisterRequest(user models.UserPayload) (*UserResponse, error) {
 	jsonData, err := jsoniter.Marshal(user)
 	if err != nil {